@@ -1,27 +1,59 @@
 """Package REST API."""
+import importlib
 import os
-from typing import Dict
+from typing import Any, Dict, Optional
 
 from fastapi import FastAPI
 from mangum import Mangum
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 from starlette.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from sentiment_flanders.api.routers import (
-    impressions_daily,
-    impressions_hourly,
-    impressions_monthly,
-)
+from sentiment_flanders.api.utils import query_cache
+from sentiment_flanders.config import COLD_START_BUDGET
+
+# Prefix of every router and its module
+ROUTERS = {
+    "/api/v1/impressions/hourly":  "sentiment_flanders.api.routers.impressions_hourly",
+    "/api/v1/impressions/daily":   "sentiment_flanders.api.routers.impressions_daily",
+    "/api/v1/impressions/weekly":  "sentiment_flanders.api.routers.impressions_weekly",
+    "/api/v1/impressions/monthly": "sentiment_flanders.api.routers.impressions_monthly",
+    "/api/v1/impressions/yearly":  "sentiment_flanders.api.routers.impressions_yearly",
+    "/api/v1/impressions/bundle":  "sentiment_flanders.api.routers.impressions_bundle",
+}
 
 app = FastAPI(
         title="Sentiment Flanders",
         description="Visualisations of the global sentiment of the Flemish population",
 )
+_included = set()
+
+
+def include_routers(path: Optional[str] = None) -> None:
+    """Import the routers the path may be routed to and include them in the app, all of them if no path is given."""
+    every = path is None or path in (app.openapi_url, app.docs_url, app.redoc_url)
+    for prefix, module in ROUTERS.items():
+        if prefix in _included or not (every or path == prefix or path.startswith(prefix + "/")): continue
+        app.include_router(importlib.import_module(module).router, prefix=prefix)  # type: ignore
+        _included.add(prefix)
+
+
+class LazyRouters:
+    """Include the routers of a request in the app before it is routed, see `include_routers`."""
 
-# Add routers.
-app.include_router(impressions_hourly.router, prefix="/api/v1/impressions/hourly")
-app.include_router(impressions_daily.router, prefix="/api/v1/impressions/daily")
-app.include_router(impressions_monthly.router, prefix="/api/v1/impressions/monthly")
+    def __init__(self, app: ASGIApp) -> None:
+        """Wrap the app."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Include the routers of the request's path and handle the request."""
+        if scope["type"] == "http": include_routers(scope["path"])
+        await self.app(scope, receive, send)
+
+
+# Add routers, on first use in cold start budget mode as every router takes a part of the import time.
+if not COLD_START_BUDGET:
+    include_routers()
 
 # Add middleware.
 app.add_middleware(
@@ -32,6 +64,7 @@ app.add_middleware(
         allow_headers=["*"],
 )
 app.add_middleware(SentryAsgiMiddleware)
+if COLD_START_BUDGET: app.add_middleware(LazyRouters)
 api_handler = Mangum(app) if os.environ.get("AWS_EXECUTION_ENV") else None
 
 
@@ -41,6 +74,12 @@ def root() -> Dict[str, str]:
     """Get demo."""
     return {"message": "Hello World"}
 
+
+@app.get("/api/v1/cache/")
+def cache_stats() -> Dict[str, Any]:
+    """Get the hit rate and size of the query cache of this instance."""
+    return query_cache.stats()
+
 # TODO: Prefer HTTPException without handle, currently nothing must be handled
 # # Add exception handlers.
 # @app.exception_handler(StarletteHTTPException)
@@ -1,4 +1,12 @@
 """API classes."""
-from .statistic import DateStatistic, DateStatisticSeries
+from .bundle import BundleRequest, BundleSpec, DateStatisticBundle
+from .statistic import DateStatistic, DateStatisticPage, DateStatisticSeries
 
-__all__ = ["DateStatistic", "DateStatisticSeries"]
+__all__ = [
+    "DateStatistic",
+    "DateStatisticSeries",
+    "DateStatisticPage",
+    "BundleSpec",
+    "BundleRequest",
+    "DateStatisticBundle",
+]
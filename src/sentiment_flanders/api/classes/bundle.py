@@ -0,0 +1,37 @@
+"""Data classes of the bundle of statistics of several granularities, requested at once."""
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field, root_validator
+
+from .statistic import DateStatisticSeries
+
+
+class BundleSpec(BaseModel):
+    """Statistics of a single granularity, of a single date, of a period or of the most recent periods."""
+
+    granularity: str = Field(..., regex="^(hourly|daily|weekly|monthly|yearly)$")
+    date: Optional[str] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    recent: Optional[int] = Field(None, ge=1)
+
+    @root_validator(skip_on_failure=True)
+    def check_selection(cls, values: Dict[str, Any]) -> Dict[str, Any]:  # noqa: N805
+        """Check that exactly one of a date, a period (start) or a number of recent periods is given."""
+        if sum(values.get(field) is not None for field in ("date", "start", "recent")) != 1:
+            raise ValueError("exactly one of date, start or recent must be given")
+        if values.get("end") is not None and values.get("start") is None:
+            raise ValueError("end requires start")
+        return values
+
+
+class BundleRequest(BaseModel):
+    """Statistics to get in a single request, by the name they are returned with."""
+
+    specs: Dict[str, BundleSpec]
+
+
+class DateStatisticBundle(BaseModel):
+    """Series of every requested name, a single date results in a series of at most one statistic."""
+
+    results: Dict[str, DateStatisticSeries]
@@ -1,5 +1,5 @@
 """Statistical specific data classes."""
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -23,3 +23,9 @@ class DateStatisticSeries(BaseModel):
     """Series of DayStatistic data objects."""
 
     series: List[DateStatistic]
+
+
+class DateStatisticPage(DateStatisticSeries):
+    """Page of a series of DayStatistic data objects, with the cursor of the next page."""
+
+    next_cursor: Optional[str] = None
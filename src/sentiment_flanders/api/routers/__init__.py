@@ -1,6 +1,19 @@
-"""REST API routers."""
-from .impressions_daily import get_impressions_daily
-from .impressions_hourly import get_impressions_hourly
-from .impressions_monthly import get_impressions_monthly
+"""REST API routers, of which the modules are imported on first use."""
+import importlib
+from typing import Any
 
-__all__ = ["get_impressions_hourly", "get_impressions_daily", "get_impressions_monthly"]
+__all__ = [
+    "get_impressions_hourly",
+    "get_impressions_daily",
+    "get_impressions_weekly",
+    "get_impressions_monthly",
+    "get_impressions_yearly",
+    "get_impressions_bundle",
+]
+
+
+def __getattr__(name: str) -> Any:
+    """Import the router module of the requested route on first use."""
+    if name not in __all__: raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".impressions_{name.rsplit('_', 1)[-1]}", __name__)
+    return getattr(module, name)
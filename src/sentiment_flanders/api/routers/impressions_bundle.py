@@ -0,0 +1,58 @@
+"""API router for the sentiment impressions of several granularities at once."""
+import asyncio
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+from fastapi import APIRouter, HTTPException
+
+from sentiment_flanders.api.classes import BundleRequest, BundleSpec, DateStatisticBundle
+from sentiment_flanders.api.utils import query_dates, query_range, run_query
+
+router = APIRouter()
+
+# Hyper-parameters
+MAX_SPECS = 50  # Maximum number of statistics requested in a single bundle, its dates fit one BatchGetItem request
+
+# Number of days offset (the delay there exists before fetching the data)
+OFFSET = 2
+
+# Starting date of the n most recent periods of every granularity, as with the recent route of the granularity
+RECENT = {
+    "hourly":  lambda now, n: f"{now - relativedelta(hours=n, days=OFFSET):%Y-%m-%d:%H}",
+    "daily":   lambda now, n: f"{now - relativedelta(days=n + max(OFFSET - 1, 0)):%Y-%m-%d}",
+    "weekly":  lambda now, n: "%04d-W%02d" % (now - relativedelta(weeks=n, days=OFFSET)).isocalendar()[:2],
+    "monthly": lambda now, n: f"{now - relativedelta(months=n, days=OFFSET):%Y-%m}",
+    "yearly":  lambda now, n: f"{now - relativedelta(years=n, days=OFFSET):%Y}",
+}
+
+
+def get_range(spec: BundleSpec, now: datetime) -> Tuple[str, str, Optional[str]]:
+    """Get the granularity, starting and (optional) ending date of the period of the spec."""
+    if spec.recent is not None: return spec.granularity, RECENT[spec.granularity](now, spec.recent), None
+    return spec.granularity, spec.start, spec.end
+
+
+@router.post("", response_model=DateStatisticBundle)
+async def get_impressions_bundle(bundle: BundleRequest) -> Any:
+    """
+    Get the sentiment impressions of several granularities, dates and periods in a single request.
+
+    The single dates are fetched together with BatchGetItem requests, while the periods are queried concurrently.
+    Every spec is returned as a series under its own name, a date without impressions results in an empty series.
+    """
+    if len(bundle.specs) > MAX_SPECS:
+        raise HTTPException(
+                status_code=400,
+                detail=f"Bad request, at most {MAX_SPECS} specs can be requested at once",
+        )
+    now = datetime.now()
+    dates = {name: (spec.granularity, spec.date) for name, spec in bundle.specs.items() if spec.date is not None}
+    ranges = {name: get_range(spec, now) for name, spec in bundle.specs.items() if spec.date is None}
+    statistics, *series = await asyncio.gather(
+            run_query(query_dates, list(dates.values())),
+            *(run_query(query_range, *period) for period in ranges.values()),
+    )
+    results = {name: [statistics[key]] if key in statistics else [] for name, key in dates.items()}
+    results.update(zip(ranges, series))
+    return {"results": {name: {"series": results[name]} for name in bundle.specs}}
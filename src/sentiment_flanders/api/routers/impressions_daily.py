@@ -4,10 +4,18 @@ from datetime import datetime
 from typing import Any, Optional
 
 from dateutil.relativedelta import relativedelta
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 
-from sentiment_flanders.api.classes import DateStatistic, DateStatisticSeries
-from sentiment_flanders.api.utils import query_daily, query_day
+from sentiment_flanders.api.classes import DateStatistic, DateStatisticPage, DateStatisticSeries
+from sentiment_flanders.api.utils import (
+    cache_response,
+    get_period,
+    is_settled,
+    query_daily,
+    query_day,
+    run_query,
+)
+from sentiment_flanders.api.utils.period import MAX_LIMIT
 
 router = APIRouter()
 
@@ -16,50 +24,71 @@ OFFSET = 2
 
 
 @router.get("/last_week/", response_model=DateStatisticSeries)
-async def get_last_weeks_impressions(date: str, ) -> Any:  # noqa: B008
-    """Get the daily sentiment impressions for the past 7 days. Date attribute is added to circumvent cache."""
+async def get_last_weeks_impressions(request: Request, response: Response, date: str, ) -> Any:  # noqa: B008
+    """Get the daily sentiment impressions for the past 7 days. The date versions the URL by day."""
     if not re.match(r"^\d{4}-\d{2}-\d{2}$", date):
         raise HTTPException(
                 status_code=400,
                 detail="Bad request, date must be in format YYYY-MM-DD",
         )
-    return await get_impressions_daily(n=7)
+    return await get_impressions_daily(request, response, n=7)
 
 
 @router.get("/last_month/", response_model=DateStatisticSeries)
-async def get_last_months_impressions(date: str, ) -> Any:  # noqa: B008
-    """Get the daily sentiment impressions for the past 31 days. Date attribute is added to circumvent cache."""
+async def get_last_months_impressions(request: Request, response: Response, date: str, ) -> Any:  # noqa: B008
+    """Get the daily sentiment impressions for the past 31 days. The date versions the URL by day."""
     if not re.match(r"^\d{4}-\d{2}-\d{2}$", date):
         raise HTTPException(
                 status_code=400,
                 detail="Bad request, date must be in format YYYY-MM-DD",
         )
-    return await get_impressions_daily(n=31)
+    return await get_impressions_daily(request, response, n=31)
 
 
 @router.get("/recent/", response_model=DateStatisticSeries)
-async def get_impressions_daily(n: int = Query(7, ge=1), ) -> Any:  # noqa: B008
+async def get_impressions_daily(request: Request, response: Response, n: int = Query(7, ge=1), ) -> Any:  # noqa: B008
     """Get the daily sentiment impressions for the past n days."""
     start = datetime.now() - relativedelta(days=n + max(OFFSET - 1, 0))
-    impressions = query_daily(date_from=start.strftime("%Y-%m-%d"))
-    return {"series": impressions}
+    impressions = await run_query(query_daily, date_from=start.strftime("%Y-%m-%d"))
+    return cache_response(request, response, {"series": impressions}, settled=False)
 
 
-@router.get("/period/", response_model=DateStatisticSeries)
+@router.get("/period/", response_model=DateStatisticPage)
 async def get_impressions_period(
-        start: str, end: Optional[str] = Query(None, title="ending date"),  # noqa: B008
+        request: Request,
+        response: Response,
+        start: str,
+        end: Optional[str] = Query(None, title="ending date"),  # noqa: B008
+        limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT),  # noqa: B008
+        cursor: Optional[str] = None,
+        stream: bool = False,
+        format: str = Query("json", regex="^(json|ndjson)$"),  # noqa: B008
 ) -> Any:
     """
     Get the daily sentiment impressions in between a period of time, start and end are inclusive.
 
     :param start: Starting date (inclusive) in YYYY-MM-DD format
     :param end: Ending date (inclusive) in YYYY-MM-DD format
+    :param limit: Maximum number of impressions, the response contains the cursor of the next page if there are more
+    :param cursor: Cursor of the page to get, as returned with the previous page
+    :param stream: Stream the impressions as they are queried, for long periods
+    :param format: Format of the response, json or ndjson (an impression per line, always streamed)
     """
-    impressions = query_daily(date_from=start, date_to=end)
-    return {"series": impressions}
+    return await get_period(
+            request,
+            response,
+            "daily",
+            start,
+            end,
+            limit=limit,
+            cursor=cursor,
+            stream=stream,
+            format=format,
+    )
 
 
 @router.get("/date/{date}", response_model=DateStatistic)
-async def get_impressions_date(date: str, ) -> Any:
+async def get_impressions_date(request: Request, response: Response, date: str, ) -> Any:
     """Get the sentiment impressions of the given date."""
-    return query_day(date)
+    impression = await run_query(query_day, date)
+    return cache_response(request, response, impression, settled=is_settled(date))
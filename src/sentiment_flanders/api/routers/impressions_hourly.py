@@ -2,44 +2,74 @@
 import re
 from typing import Any, Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 
-from sentiment_flanders.api.classes import DateStatistic, DateStatisticSeries
-from sentiment_flanders.api.utils import query_hour, query_hourly
+from sentiment_flanders.api.classes import DateStatistic, DateStatisticPage, DateStatisticSeries
+from sentiment_flanders.api.utils import (
+    cache_response,
+    get_period,
+    is_settled,
+    query_hour,
+    query_hourly,
+    run_query,
+)
+from sentiment_flanders.api.utils.period import MAX_LIMIT
 
 router = APIRouter()
 
 
 @router.get("/recent/", response_model=DateStatisticSeries)
-async def get_impressions_hourly(date: str, ) -> Any:  # noqa: B008
+async def get_impressions_hourly(request: Request, response: Response, date: str, ) -> Any:  # noqa: B008
     """Get the hourly sentiment impressions of the requested day, which is at least the day before yesterday.."""
     if not re.match(r"^\d{4}-\d{2}-\d{2}$", date):
         raise HTTPException(
                 status_code=400,
                 detail="Bad request, date must be in format YYYY-MM-DD",
         )
-    impressions = query_hourly(
+    impressions = await run_query(
+            query_hourly,
             date_from=f"{date}:00",
             date_to=f"{date}:24"
     )
-    return {"series": impressions}
+    return cache_response(request, response, {"series": impressions}, settled=is_settled(date))
 
 
-@router.get("/period/", response_model=DateStatisticSeries)
+@router.get("/period/", response_model=DateStatisticPage)
 async def get_impressions_period(
-        start: str, end: Optional[str] = Query(None, title="ending date"),  # noqa: B008
+        request: Request,
+        response: Response,
+        start: str,
+        end: Optional[str] = Query(None, title="ending date"),  # noqa: B008
+        limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT),  # noqa: B008
+        cursor: Optional[str] = None,
+        stream: bool = False,
+        format: str = Query("json", regex="^(json|ndjson)$"),  # noqa: B008
 ) -> Any:
     """
     Get the daily sentiment impressions in between a period of time, start and end are inclusive.
 
     :param start: Starting date (inclusive) in YYYY-MM-DD:HH format
     :param end: Ending date (inclusive) in YYYY-MM-DD:HH format
+    :param limit: Maximum number of impressions, the response contains the cursor of the next page if there are more
+    :param cursor: Cursor of the page to get, as returned with the previous page
+    :param stream: Stream the impressions as they are queried, for long periods
+    :param format: Format of the response, json or ndjson (an impression per line, always streamed)
     """
-    impressions = query_hourly(date_from=start, date_to=end)
-    return {"series": impressions}
+    return await get_period(
+            request,
+            response,
+            "hourly",
+            start,
+            end,
+            limit=limit,
+            cursor=cursor,
+            stream=stream,
+            format=format,
+    )
 
 
 @router.get("/date/{date}", response_model=DateStatistic)
-async def get_impressions_date(date: str, ) -> Any:
+async def get_impressions_date(request: Request, response: Response, date: str, ) -> Any:
     """Get the sentiment impressions of the given date."""
-    return query_hour(date)
+    impression = await run_query(query_hour, date)
+    return cache_response(request, response, impression, settled=is_settled(date))
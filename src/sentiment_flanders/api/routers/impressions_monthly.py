@@ -4,10 +4,18 @@ from datetime import datetime
 from typing import Any, Optional
 
 from dateutil.relativedelta import relativedelta
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 
-from sentiment_flanders.api.classes import DateStatistic, DateStatisticSeries
-from sentiment_flanders.api.utils import query_month, query_monthly
+from sentiment_flanders.api.classes import DateStatistic, DateStatisticPage, DateStatisticSeries
+from sentiment_flanders.api.utils import (
+    cache_response,
+    get_period,
+    is_settled,
+    query_month,
+    query_monthly,
+    run_query,
+)
+from sentiment_flanders.api.utils.period import MAX_LIMIT
 
 router = APIRouter()
 
@@ -16,39 +24,64 @@ OFFSET = 2
 
 
 @router.get("/last_year/", response_model=DateStatisticSeries)
-async def get_last_years_impressions(date: str, ) -> Any:  # noqa: B008
-    """Get the monthly sentiment impressions for the past 12 months. Date attribute is added to circumvent cache."""
+async def get_last_years_impressions(request: Request, response: Response, date: str, ) -> Any:  # noqa: B008
+    """Get the monthly sentiment impressions for the past 12 months. The date versions the URL by month."""
     if not re.match(r"^\d{4}-\d{2}$", date):
         raise HTTPException(
                 status_code=400,
                 detail="Bad request, date must be in format YYYY-MM",
         )
-    return await get_impressions_monthly(n=12)
+    return await get_impressions_monthly(request, response, n=12)
 
 
 @router.get("/recent/", response_model=DateStatisticSeries)
-async def get_impressions_monthly(n: int = Query(12, ge=1), ) -> Any:  # noqa: B008
+async def get_impressions_monthly(
+        request: Request,
+        response: Response,
+        n: int = Query(12, ge=1),  # noqa: B008
+) -> Any:
     """Get the monthly sentiment impressions for the past n months."""
     start = datetime.now() - relativedelta(months=n, days=OFFSET)
-    impressions = query_monthly(date_from=start.strftime("%Y-%m"))
-    return {"series": impressions}
+    impressions = await run_query(query_monthly, date_from=start.strftime("%Y-%m"))
+    return cache_response(request, response, {"series": impressions}, settled=False)
 
 
-@router.get("/period/", response_model=DateStatisticSeries)
+@router.get("/period/", response_model=DateStatisticPage)
 async def get_impressions_period(
-        start: str, end: Optional[str] = Query(None, title="ending date"),  # noqa: B008
+        request: Request,
+        response: Response,
+        start: str,
+        end: Optional[str] = Query(None, title="ending date"),  # noqa: B008
+        limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT),  # noqa: B008
+        cursor: Optional[str] = None,
+        stream: bool = False,
+        format: str = Query("json", regex="^(json|ndjson)$"),  # noqa: B008
 ) -> Any:
     """
     Get the daily sentiment impressions in between a period of time, start and end are inclusive.
 
     :param start: Starting date (inclusive) in YYYY-MM-DD format
     :param end: Ending date (inclusive) in YYYY-MM-DD format
+    :param limit: Maximum number of impressions, the response contains the cursor of the next page if there are more
+    :param cursor: Cursor of the page to get, as returned with the previous page
+    :param stream: Stream the impressions as they are queried, for long periods
+    :param format: Format of the response, json or ndjson (an impression per line, always streamed)
     """
-    impressions = query_monthly(date_from=start, date_to=end)
-    return {"series": impressions}
+    return await get_period(
+            request,
+            response,
+            "monthly",
+            start,
+            end,
+            limit=limit,
+            cursor=cursor,
+            stream=stream,
+            format=format,
+    )
 
 
 @router.get("/date/{date}", response_model=DateStatistic)
-async def get_impressions_date(date: str, ) -> Any:
+async def get_impressions_date(request: Request, response: Response, date: str, ) -> Any:
     """Get the sentiment impressions of the given date."""
-    return query_month(date)
+    impression = await run_query(query_month, date)
+    return cache_response(request, response, impression, settled=is_settled(date))
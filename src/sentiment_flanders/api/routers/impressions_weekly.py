@@ -0,0 +1,71 @@
+"""API router for weekly sentiment impressions."""
+from datetime import datetime
+from typing import Any, Optional
+
+from dateutil.relativedelta import relativedelta
+from fastapi import APIRouter, Query, Request, Response
+
+from sentiment_flanders.api.classes import DateStatistic, DateStatisticPage, DateStatisticSeries
+from sentiment_flanders.api.utils import (
+    cache_response,
+    get_period,
+    is_settled,
+    query_week,
+    query_weekly,
+    run_query,
+)
+from sentiment_flanders.api.utils.period import MAX_LIMIT
+
+router = APIRouter()
+
+# Number of days offset (the delay there exists before fetching the data)
+OFFSET = 2
+
+
+@router.get("/recent/", response_model=DateStatisticSeries)
+async def get_impressions_weekly(request: Request, response: Response, n: int = Query(12, ge=1), ) -> Any:  # noqa: B008
+    """Get the weekly sentiment impressions for the past n (ISO) weeks."""
+    start = datetime.now() - relativedelta(weeks=n, days=OFFSET)
+    impressions = await run_query(query_weekly, date_from="%04d-W%02d" % start.isocalendar()[:2])
+    return cache_response(request, response, {"series": impressions}, settled=False)
+
+
+@router.get("/period/", response_model=DateStatisticPage)
+async def get_impressions_period(
+        request: Request,
+        response: Response,
+        start: str,
+        end: Optional[str] = Query(None, title="ending date"),  # noqa: B008
+        limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT),  # noqa: B008
+        cursor: Optional[str] = None,
+        stream: bool = False,
+        format: str = Query("json", regex="^(json|ndjson)$"),  # noqa: B008
+) -> Any:
+    """
+    Get the weekly sentiment impressions in between a period of time, start and end are inclusive.
+
+    :param start: Starting week (inclusive) in YYYY-Www format
+    :param end: Ending week (inclusive) in YYYY-Www format
+    :param limit: Maximum number of impressions, the response contains the cursor of the next page if there are more
+    :param cursor: Cursor of the page to get, as returned with the previous page
+    :param stream: Stream the impressions as they are queried, for long periods
+    :param format: Format of the response, json or ndjson (an impression per line, always streamed)
+    """
+    return await get_period(
+            request,
+            response,
+            "weekly",
+            start,
+            end,
+            limit=limit,
+            cursor=cursor,
+            stream=stream,
+            format=format,
+    )
+
+
+@router.get("/date/{date}", response_model=DateStatistic)
+async def get_impressions_date(request: Request, response: Response, date: str, ) -> Any:
+    """Get the sentiment impressions of the given week."""
+    impression = await run_query(query_week, date)
+    return cache_response(request, response, impression, settled=is_settled(date))
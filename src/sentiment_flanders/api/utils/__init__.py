@@ -1,11 +1,41 @@
 """DynamoDB queries."""
+from .cache import is_settled, query_cache
 from .dynamodb_get import (
     query_daily,
+    query_dates,
     query_day,
     query_hour,
     query_hourly,
     query_month,
     query_monthly,
+    query_page,
+    query_range,
+    query_week,
+    query_weekly,
+    query_year,
+    query_yearly,
+    run_query,
 )
+from .http_cache import cache_response
+from .period import get_period
 
-__all__ = ["query_hourly", "query_hour", "query_daily", "query_day", "query_monthly", "query_month"]
+__all__ = [
+    "query_hourly",
+    "query_hour",
+    "query_daily",
+    "query_day",
+    "query_weekly",
+    "query_week",
+    "query_monthly",
+    "query_month",
+    "query_yearly",
+    "query_year",
+    "query_range",
+    "query_dates",
+    "query_page",
+    "run_query",
+    "query_cache",
+    "is_settled",
+    "cache_response",
+    "get_period",
+]
@@ -0,0 +1,129 @@
+"""In-process cache of the DynamoDB query results, kept alive in between the requests handled by a warm Lambda."""
+import inspect
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timedelta, timezone
+from functools import wraps
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from sentiment_flanders.granularity import GRANULARITIES
+
+# Hyper-parameters
+CACHE_SIZE = 512  # Maximum number of cached query results, the least recently used result is evicted first
+TTL_SETTLED = 24 * 60 * 60  # Seconds a result of settled dates is kept, only rewritten by a historical rerun
+TTL_RECENT = 5 * 60  # Seconds a result of recent dates or open-ended ranges is kept, may still change
+SETTLED_AFTER = 2  # Number of days the batch job lags behind, a run writes the day this many days before it
+BATCH_START = time(10, 15)  # Daily start (UTC) of the batch job, see terraform/modules/scheduled_batch_job
+BATCH_DURATION = timedelta(hours=1)  # Time the batch job takes to write the statistics of the day
+
+
+def get_last_update(now: Optional[datetime] = None) -> datetime:
+    """Get the moment the latest batch run finished writing its statistics."""
+    now = now or datetime.now(timezone.utc)
+    update = datetime.combine(now.date(), BATCH_START, tzinfo=timezone.utc) + BATCH_DURATION
+    return update if update <= now else update - timedelta(days=1)
+
+
+def is_settled(date: Optional[str], now: Optional[datetime] = None) -> bool:
+    """
+    Check if the period of the given date (of any granularity) no longer changes.
+
+    A period is settled once the batch run that writes its last day has finished, e.g. the hours of November 16th are
+    settled after the run of November 18th.
+
+    :param date: Date of any granularity, e.g. 2020-11-16:00 or 2020-W46
+    :param now: Current (UTC) time
+    """
+    if not date: return False
+    cutoff = datetime.combine(get_last_update(now).date(), time()) - timedelta(days=SETTLED_AFTER - 1)
+    for granularity in GRANULARITIES:
+        if re.match(granularity.pattern, date): return date < granularity.format(cutoff)
+    return False
+
+
+class TTLCache:
+    """Size-bounded LRU cache of which every entry expires after its own time-to-live, safe to share among threads."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE, clock: Callable[[], float] = monotonic) -> None:
+        """
+        Initialise an empty cache.
+
+        :param maxsize: Maximum number of entries
+        :param clock: Clock (in seconds) the expiry of the entries is measured with
+        """
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Get whether the key is cached (and not expired) and its value."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if not entry:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """Cache the value for the given number of seconds, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries, the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the size of the cache and its hit, miss, eviction and expiration counters."""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'size':        len(self._entries),
+                'maxsize':     self.maxsize,
+                'hits':        self.hits,
+                'misses':      self.misses,
+                'hit_rate':    round(self.hits / requests, 4) if requests else 0.,
+                'evictions':   self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+query_cache = TTLCache()
+
+
+def cached(function: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Cache the results of a query function, of which the last argument is the (ending) date of the queried period.
+
+    Results of settled dates are kept for `TTL_SETTLED` seconds, results of recent dates or open-ended ranges for
+    `TTL_RECENT` seconds. Raised exceptions (e.g. 404) are not cached. The results are shared, and must not be mutated.
+    """
+    signature = inspect.signature(function)
+
+    @wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (function.__name__, *bound.arguments.values())
+        hit, value = query_cache.get(key)
+        if hit: return value
+        value = function(*args, **kwargs)
+        query_cache.set(key, value, ttl=TTL_SETTLED if is_settled(key[-1]) else TTL_RECENT)
+        return value
+
+    return wrapper
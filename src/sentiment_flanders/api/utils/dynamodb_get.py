@@ -1,119 +1,264 @@
 """Query DynamoDB."""
+import asyncio
+import base64
+import json
 import re
-from typing import Any, Dict, List, Union
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import boto3
 from boto3.dynamodb.conditions import Key
+from botocore.config import Config
 from fastapi import HTTPException
 
+from sentiment_flanders.dynamodb import batch_get
+from sentiment_flanders.granularity import BY_NAME
+
+from .cache import cached
+
+# Hyper-parameters
+QUERY_WORKERS = 32  # Number of queries in flight, each worker thread has its own connection in the shared pool
+PAGE_SIZE = 1000  # Default number of items of a cursor page, DynamoDB ends every page at 1 MB of items anyway
+BATCH_GET_RETRIES = 5  # Number of retries of the keys left unprocessed (throttled) by a BatchGetItem request
+TABLE = "sentiment-flanders-impressions"
+
+_executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="dynamodb")
+
+
+@lru_cache(maxsize=None)
+def get_table() -> Any:
+    """Get the DynamoDB table, shared by all queries (and threads) of this process."""
+    ddb = boto3.session.Session().resource("dynamodb", config=Config(max_pool_connections=QUERY_WORKERS))
+    return ddb.Table(TABLE)
+
+
+def get_client() -> Any:
+    """Get the (thread-safe) low-level client of the shared DynamoDB table."""
+    return get_table().meta.client
+
+
+def query_pages(
+        expression,
+        page_size: Optional[int] = None,
+        start_key: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]]:
+    """
+    Query DynamoDB with the given expression page by page, following the key the previous page ended with.
+
+    :param expression: Key condition expression
+    :param page_size: Maximum number of items of a page, only limited to 1 MB by DynamoDB if not provided
+    :param start_key: Key to start after, as returned with the previous page
+    :return: Items of every page and the key to continue from, None for the last page
+    """
+    while True:
+        kwargs = {
+            **({"ExclusiveStartKey": start_key} if start_key else {}),
+            **({"Limit": page_size} if page_size else {}),
+        }
+        response = get_table().query(
+                KeyConditionExpression=expression,
+                ProjectionExpression="#d, #s",  # Only the DateStatistic, not the key or the applied statistics
+                ExpressionAttributeNames={"#d": "date", "#s": "statistic"},
+                **kwargs,
+        )
+        start_key = response.get("LastEvaluatedKey")
+        yield response["Items"], start_key
+        if not start_key: return
+
 
 def query(expression) -> List[Dict[str, Any]]:
-    """Query DynamoDB with the given expression."""
-    ddb = boto3.resource("dynamodb")
-    table = ddb.Table("sentiment-flanders-impressions")
-    response = table.query(KeyConditionExpression=expression)
-    return response["Items"]
+    """Query DynamoDB with the given expression, all pages are fetched."""
+    return [item for items, _ in query_pages(expression) for item in items]
 
 
-def query_hourly(date_from: str, date_to: Union[str, None] = None) -> List[Dict[str, Any]]:
+async def run_query(function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a (blocking) query function in the query thread pool, such that the event loop is not blocked meanwhile."""
+    return await asyncio.get_running_loop().run_in_executor(_executor, partial(function, *args, **kwargs))
+
+
+def get_range_expression(granularity: str, date_from: str, date_to: Union[str, None] = None):
     """
-    Query hourly sentiments ranging from a certain date until a certain date (inclusive).
+    Get the key condition of the statistics of the given granularity ranging from a certain date until a certain date.
 
-    :param date_from: Starting date in YYYY-MM-DD:HH (inclusive)
-    :param date_to: Ending date YYYY-MM-DD:HH (inclusive), optional
+    :param granularity: Granularity of the statistics, e.g. hourly
+    :param date_from: Starting date (inclusive)
+    :param date_to: Ending date (inclusive), optional
     """
+    date_format, pattern = BY_NAME[granularity].date_format, BY_NAME[granularity].pattern
     if date_to and date_from > date_to:
         raise HTTPException(
                 status_code=400,
                 detail="Bad request, starting date cannot be greater than ending date",
         )
-    if (not re.match(r"^\d{4}-\d{2}-\d{2}:\d{2}$", date_from)) or (
-            date_to and not re.match(r"^\d{4}-\d{2}-\d{2}:\d{2}$", date_to)
+    if (not re.match(pattern, date_from)) or (
+            date_to and not re.match(pattern, date_to)
     ):
         raise HTTPException(
                 status_code=400,
-                detail="Bad request, date must be in YYYY-MM-DD:HH format",
+                detail=f"Bad request, date must be in {date_format} format",
         )
 
     # Shared expression
-    expression = Key("statistic_id").eq("sentiment_impressions_hourly")
+    expression = Key("statistic_id").eq(f"sentiment_impressions_{granularity}")
 
     # Define expression to use
     if date_to:
         expression = expression & Key("date").between(date_from, date_to)
     else:
         expression = expression & Key("date").gte(date_from)
+    return expression
 
-    # Perform query and return result
-    return query(expression=expression)
 
+def encode_cursor(key: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Encode the key a page ended with as an opaque cursor."""
+    if not key: return None
+    return base64.urlsafe_b64encode(json.dumps(key, sort_keys=True).encode("utf-8")).decode("ascii")
 
-def query_daily(date_from: str, date_to: Union[str, None] = None) -> List[Dict[str, Any]]:
-    """
-    Query daily sentiments ranging from a certain date until a certain date (inclusive).
 
-    :param date_from: Starting date in YYYY-MM-DD (inclusive)
-    :param date_to: Ending date YYYY-MM-DD (inclusive), optional
-    """
-    if date_to and date_from > date_to:
+def decode_cursor(cursor: str, granularity: str) -> Dict[str, Any]:
+    """Decode the cursor of the given granularity into the key to start after."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(key, dict) or set(key) != {"statistic_id", "date"}: raise ValueError("Invalid key")
+        if key["statistic_id"] != f"sentiment_impressions_{granularity}": raise ValueError("Invalid statistic ID")
+        if not re.match(BY_NAME[granularity].pattern, key["date"]): raise ValueError("Invalid date")
+    except (TypeError, ValueError):
         raise HTTPException(
                 status_code=400,
-                detail="Bad request, starting date cannot be greater than ending date",
+                detail="Bad request, invalid cursor",
         )
-    if (not re.match(r"^\d{4}-\d{2}-\d{2}$", date_from)) or (
-            date_to and not re.match(r"^\d{4}-\d{2}-\d{2}$", date_to)
-    ):
+    return key
+
+
+def query_page(
+        granularity: str,
+        date_from: str,
+        date_to: Union[str, None] = None,
+        limit: int = PAGE_SIZE,
+        cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Query a single page of the statistics of the given granularity ranging from a certain date until a certain date.
+
+    :param granularity: Granularity of the statistics, e.g. hourly
+    :param date_from: Starting date (inclusive)
+    :param date_to: Ending date (inclusive), optional
+    :param limit: Maximum number of statistics of the page
+    :param cursor: Cursor of the previous page, the first page is queried if not provided
+    :return: Statistics of the page and the cursor of the next page, None if this is the last page
+    """
+    expression = get_range_expression(granularity, date_from, date_to)
+    start_key = decode_cursor(cursor, granularity) if cursor else None
+    items, key = next(query_pages(expression, page_size=limit, start_key=start_key))
+    return items, encode_cursor(key)
+
+
+def iter_range(
+        granularity: str,
+        date_from: str,
+        date_to: Union[str, None] = None,
+        page_size: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Iterate over the statistics of the given granularity in the range, querying the next page once needed."""
+    expression = get_range_expression(granularity, date_from, date_to)
+    for items, _ in query_pages(expression, page_size=page_size):
+        yield from items
+
+
+def query_dates(keys: List[Tuple[str, str]], retries: int = BATCH_GET_RETRIES) -> Dict[Tuple[str, str], Any]:
+    """
+    Get the statistics of the given granularity and date pairs, using BatchGetItem requests of 100 keys.
+
+    :param keys: Granularity (e.g. daily) and date of every requested statistic
+    :param retries: Number of retries of the keys left unprocessed (throttled) by a BatchGetItem request
+    :return: Statistic of every requested granularity and date that has one
+    :raise HTTPException: 503 if keys are still left unprocessed after the last retry
+    """
+    for granularity, date in keys:
+        date_format, pattern = BY_NAME[granularity].date_format, BY_NAME[granularity].pattern
+        if not re.match(pattern, date):
+            raise HTTPException(
+                    status_code=400,
+                    detail=f"Bad request, date must be in format {date_format}",
+            )
+    request_keys: List[Dict[str, Any]] = [
+        {"statistic_id": {"S": f"sentiment_impressions_{granularity}"}, "date": {"S": date}}
+        for granularity, date in dict.fromkeys(keys)
+    ]
+    try:
+        items = batch_get(get_client(), TABLE, request_keys, retries=retries)
+    except RuntimeError:
         raise HTTPException(
-                status_code=400,
-                detail="Bad request, date must be in YYYY-MM-DD format",
+                status_code=503,
+                detail="Service unavailable, the statistics are throttled, please try again later",
         )
+    return {(item["statistic_id"][len("sentiment_impressions_"):], item["date"]): item for item in items}
 
-    # Shared expression
-    expression = Key("statistic_id").eq("sentiment_impressions_daily")
 
-    # Define expression to use
-    if date_to:
-        expression = expression & Key("date").between(date_from, date_to)
-    else:
-        expression = expression & Key("date").gte(date_from)
+@cached
+def query_range(granularity: str, date_from: str, date_to: Union[str, None] = None) -> List[Dict[str, Any]]:
+    """
+    Query the sentiments of the given granularity ranging from a certain date until a certain date (inclusive).
 
-    # Perform query and return result
-    return query(expression=expression)
+    :param granularity: Granularity of the statistics, e.g. hourly
+    :param date_from: Starting date (inclusive)
+    :param date_to: Ending date (inclusive), optional
+    """
+    return query(expression=get_range_expression(granularity, date_from, date_to))
 
 
-def query_monthly(date_from: str, date_to: Union[str, None] = None) -> List[Dict[str, Any]]:
+def query_hourly(date_from: str, date_to: Union[str, None] = None) -> List[Dict[str, Any]]:
+    """
+    Query hourly sentiments ranging from a certain date until a certain date (inclusive).
+
+    :param date_from: Starting date YYYY-MM-DD:HH (inclusive)
+    :param date_to: Ending date YYYY-MM-DD:HH (inclusive), optional
+    """
+    return query_range("hourly", date_from, date_to)
+
+
+def query_daily(date_from: str, date_to: Union[str, None] = None) -> List[Dict[str, Any]]:
     """
     Query daily sentiments ranging from a certain date until a certain date (inclusive).
 
+    :param date_from: Starting date YYYY-MM-DD (inclusive)
+    :param date_to: Ending date YYYY-MM-DD (inclusive), optional
+    """
+    return query_range("daily", date_from, date_to)
+
+
+def query_weekly(date_from: str, date_to: Union[str, None] = None) -> List[Dict[str, Any]]:
+    """
+    Query weekly sentiments ranging from a certain date until a certain date (inclusive).
+
+    :param date_from: Starting date YYYY-Www (inclusive)
+    :param date_to: Ending date YYYY-Www (inclusive), optional
+    """
+    return query_range("weekly", date_from, date_to)
+
+
+def query_monthly(date_from: str, date_to: Union[str, None] = None) -> List[Dict[str, Any]]:
+    """
+    Query monthly sentiments ranging from a certain date until a certain date (inclusive).
+
     :param date_from: Starting date YYYY-MM (inclusive)
     :param date_to: Ending date YYYY-MM (inclusive), optional
     """
-    if date_to and date_from > date_to:
-        raise HTTPException(
-                status_code=400,
-                detail="Bad request, starting date cannot be greater than ending date",
-        )
-    if (not re.match(r"^\d{4}-\d{2}$", date_from)) or (
-            date_to and not re.match(r"^\d{4}-\d{2}$", date_to)
-    ):
-        raise HTTPException(
-                status_code=400,
-                detail="Bad request, date must be in YYYY-MM format",
-        )
+    return query_range("monthly", date_from, date_to)
 
-    # Shared expression
-    expression = Key("statistic_id").eq("sentiment_impressions_monthly")
 
-    # Define expression to use
-    if date_to:
-        expression = expression & Key("date").between(date_from, date_to)
-    else:
-        expression = expression & Key("date").gte(date_from)
+def query_yearly(date_from: str, date_to: Union[str, None] = None) -> List[Dict[str, Any]]:
+    """
+    Query yearly sentiments ranging from a certain date until a certain date (inclusive).
 
-    # Perform query and return result
-    return query(expression=expression)
+    :param date_from: Starting date YYYY (inclusive)
+    :param date_to: Ending date YYYY (inclusive), optional
+    """
+    return query_range("yearly", date_from, date_to)
 
 
+@cached
 def query_hour(date: str) -> Dict[str, Any]:
     """Query the impressions of a single day."""
     if not re.match(r"^\d{4}-\d{2}-\d{2}:\d{2}$", date):
@@ -135,6 +280,7 @@ def query_hour(date: str) -> Dict[str, Any]:
     return response[0]
 
 
+@cached
 def query_day(date: str) -> Dict[str, Any]:
     """Query the impressions of a single day."""
     if not re.match(r"^\d{4}-\d{2}-\d{2}$", date):
@@ -156,6 +302,29 @@ def query_day(date: str) -> Dict[str, Any]:
     return response[0]
 
 
+@cached
+def query_week(date: str) -> Dict[str, Any]:
+    """Query the impressions of a single ISO week."""
+    if not re.match(r"^\d{4}-W\d{2}$", date):
+        raise HTTPException(
+                status_code=400,
+                detail="Bad request, date must be in format YYYY-Www",
+        )
+
+    # Define expression to use
+    expression = Key("statistic_id").eq("sentiment_impressions_weekly") & Key("date").eq(date)
+
+    # Perform query and return result
+    response = query(expression=expression)
+    if len(response) == 0:
+        raise HTTPException(
+                status_code=404,
+                detail="Not found, no information for the requested date",
+        )
+    return response[0]
+
+
+@cached
 def query_month(date: str) -> Dict[str, Any]:
     """Query the impressions of a single month."""
     if not re.match(r"^\d{4}-\d{2}$", date):
@@ -175,3 +344,25 @@ def query_month(date: str) -> Dict[str, Any]:
                 detail="Not found, no information for the requested date",
         )
     return response[0]
+
+
+@cached
+def query_year(date: str) -> Dict[str, Any]:
+    """Query the impressions of a single year."""
+    if not re.match(r"^\d{4}$", date):
+        raise HTTPException(
+                status_code=400,
+                detail="Bad request, date must be in format YYYY",
+        )
+
+    # Define expression to use
+    expression = Key("statistic_id").eq("sentiment_impressions_yearly") & Key("date").eq(date)
+
+    # Perform query and return result
+    response = query(expression=expression)
+    if len(response) == 0:
+        raise HTTPException(
+                status_code=404,
+                detail="Not found, no information for the requested date",
+        )
+    return response[0]
@@ -0,0 +1,65 @@
+"""HTTP caching headers of the impressions, such that browsers and CloudFront can serve repeated requests."""
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .cache import get_last_update
+
+# Hyper-parameters
+MAX_AGE_SETTLED = 365 * 24 * 60 * 60  # Seconds a response of settled dates may be cached
+
+
+def get_etag(content: Any) -> str:
+    """Get the (weak) entity tag of the JSON content."""
+    data = json.dumps(jsonable_encoder(content), sort_keys=True, separators=(',', ':'))
+    return f'W/"{hashlib.sha1(data.encode("utf-8")).hexdigest()[:20]}"'
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Check if the copy of the client is still valid, the entity tag takes precedence over the modification date."""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        tags = {tag.strip().replace('W/', '', 1) for tag in if_none_match.split(',')}
+        return '*' in tags or etag.replace('W/', '', 1) in tags
+    if_modified_since = request.headers.get('if-modified-since')
+    if not if_modified_since: return False
+    try:
+        return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def cache_response(request: Request, response: Response, content: Any, settled: bool) -> Any:
+    """
+    Set the caching headers of the content, or answer with 304 if the client's copy is still valid.
+
+    Settled dates no longer change and are cached for a year, recent dates and windows expire once the next batch run
+    wrote its statistics.
+
+    :param request: Request, of which the conditional headers are checked
+    :param response: Response the headers are added to
+    :param content: Content of the response
+    :param settled: Whether the content only contains settled dates, see `is_settled`
+    :return: Content, or an empty response if not modified
+    """
+    now = datetime.now(timezone.utc)
+    last_modified = get_last_update(now)
+    if settled:
+        cache_control = f"public, max-age={MAX_AGE_SETTLED}, immutable"
+    else:
+        max_age = int((last_modified + timedelta(days=1) - now).total_seconds())
+        cache_control = f"public, max-age={max_age}, must-revalidate"
+    headers = {
+        'Cache-Control': cache_control,
+        'ETag':          get_etag(content),
+        'Last-Modified': format_datetime(last_modified, usegmt=True),
+    }
+    if is_not_modified(request, headers['ETag'], last_modified): return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return content
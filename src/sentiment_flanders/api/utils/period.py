@@ -0,0 +1,68 @@
+"""Responses of the statistics in between a period of time, in full, page by page, or streamed."""
+import json
+from decimal import Decimal
+from typing import Any, Iterator, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from .cache import is_settled
+from .dynamodb_get import get_range_expression, iter_range, query_page, query_range, run_query
+from .http_cache import cache_response
+
+# Hyper-parameters
+MAX_LIMIT = 5000  # Maximum number of statistics of a single page
+
+
+def encode_decimal(value: Any) -> int:
+    """Encode the (integer) DynamoDB numbers, any other type that is not JSON serialisable is an error."""
+    if isinstance(value, Decimal): return int(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def stream_json(granularity: str, date_from: str, date_to: Optional[str], ndjson: bool) -> Iterator[str]:
+    """Serialise the statistics in the range as they are queried, as a series or as a statistic per line (NDJSON)."""
+    if not ndjson: yield '{"series":['
+    for i, item in enumerate(iter_range(granularity, date_from, date_to)):
+        statistic = {"date": item["date"], "statistic": item["statistic"]}  # As the response model of the series
+        data = json.dumps(statistic, default=encode_decimal, separators=(",", ":"))
+        yield data + "\n" if ndjson else ("," if i else "") + data
+    if not ndjson: yield "]}"
+
+
+async def get_period(
+        request: Request,
+        response: Response,
+        granularity: str,
+        start: str,
+        end: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        stream: bool = False,
+        format: str = "json",
+) -> Any:
+    """
+    Get the statistics of the given granularity in between a period of time, start and end are inclusive.
+
+    :param request: Request, of which the conditional headers are checked
+    :param response: Response the caching headers are added to
+    :param granularity: Granularity of the statistics, e.g. hourly
+    :param start: Starting date (inclusive)
+    :param end: Ending date (inclusive), optional
+    :param limit: Maximum number of statistics, the response contains the cursor of the next page if there are more
+    :param cursor: Cursor of the page to get, as returned with the previous page
+    :param stream: Stream the statistics as they are queried, rather than collecting all of them first
+    :param format: Format of the response, json or ndjson (a statistic per line, always streamed)
+    """
+    if stream or format == "ndjson":
+        get_range_expression(granularity, start, end)  # Validate the dates before the response starts
+        media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+        return StreamingResponse(stream_json(granularity, start, end, ndjson=format == "ndjson"), media_type=media_type)
+    if limit or cursor:
+        items, next_cursor = await run_query(
+                query_page, granularity, start, end, limit=limit or MAX_LIMIT, cursor=cursor,
+        )
+        content = {"series": items, "next_cursor": next_cursor}
+    else:
+        content = {"series": await run_query(query_range, granularity, start, end), "next_cursor": None}
+    return cache_response(request, response, content, settled=is_settled(end))
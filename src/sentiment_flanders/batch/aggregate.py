@@ -0,0 +1,140 @@
+"""Vectorised aggregation of predicted tweets into hourly sentiment statistics."""
+from datetime import datetime
+from typing import Any, Dict, Iterable, Sequence
+
+import numpy as np
+
+from .tweet import Tweet
+
+# Sentiment labels as predicted by the model and their corresponding key in the statistics
+PREDICTIONS = ('POSITIVE', 'NEUTRAL', 'NEGATIVE')
+LABELS = ('positive', 'neutral', 'negative')
+
+
+def to_columns(processed: Sequence[Tweet]) -> Dict[str, np.ndarray]:
+    """Transform the processed tweets into column arrays, containing only the fields used for aggregation."""
+    return {
+        'created_at':     np.array([t.created_at for t in processed], dtype=np.int64).astype('datetime64[s]'),
+        'favorite_count': np.array([t.favorite_count for t in processed], dtype=np.float64),
+        'reply_count':    np.array([t.reply_count for t in processed], dtype=np.float64),
+        'retweet_count':  np.array([t.retweet_count for t in processed], dtype=np.float64),
+        'user_followers': np.array([t.user_followers or 0 for t in processed], dtype=np.float64),
+    }
+
+
+def get_points(
+        columns: Dict[str, np.ndarray],
+        adder_favorites: float,
+        adder_replies: float,
+        adder_retweets: float,
+        followers_log: float,
+) -> np.ndarray:
+    """
+    Get the (integer) points of every tweet, every tweet is worth one point before adding its engagement.
+
+    :param columns: Column arrays as created by `to_columns`
+    :param adder_favorites: Additional points for every "favorite" the tweet receives
+    :param adder_replies: Additional points for every "reply" the tweet has
+    :param adder_retweets: Additional points for every "retweet" the tweet has
+    :param followers_log: Additional points for every follower the user has, logarithmic
+    """
+    points = np.ones(len(columns['created_at']), dtype=np.float64)
+    if adder_favorites: points += adder_favorites * columns['favorite_count']
+    if adder_replies: points += adder_replies * columns['reply_count']
+    if adder_retweets: points += adder_retweets * columns['retweet_count']
+    if followers_log:
+        followers = columns['user_followers']
+        has_followers = followers > 0
+        points[has_followers] += followers_log * np.log10(followers[has_followers])
+    return np.round(points).astype(np.int64)  # Round to be integer (DynamoDB does not accept floats)
+
+
+def bucket_by_hour(
+        processed: Sequence[Tweet],
+        predictions: Sequence[str],
+        adder_favorites: float,
+        adder_replies: float,
+        adder_retweets: float,
+        followers_log: float,
+) -> Dict[datetime, Dict[str, int]]:
+    """
+    Sum the points of the processed tweets per hour and per predicted sentiment.
+
+    :param processed: Processed tweets
+    :param predictions: Predicted sentiment of every processed tweet
+    :param adder_favorites: Additional points for every "favorite" the tweet receives
+    :param adder_replies: Additional points for every "reply" the tweet has
+    :param adder_retweets: Additional points for every "retweet" the tweet has
+    :param followers_log: Additional points for every follower the user has, logarithmic
+    :return: Statistic for every hour that contains at least one tweet, sorted chronologically
+    """
+    assert len(predictions) == len(processed)
+    if not processed: return {}
+    columns = to_columns(processed)
+    points = get_points(
+            columns,
+            adder_favorites=adder_favorites,
+            adder_replies=adder_replies,
+            adder_retweets=adder_retweets,
+            followers_log=followers_log,
+    )
+
+    # Map every prediction on its label index
+    predicted = np.asarray(predictions)
+    labels = np.full(len(predicted), -1, dtype=np.int64)
+    for i, prediction in enumerate(PREDICTIONS): labels[predicted == prediction] = i
+    assert (labels >= 0).all(), f"Unknown predictions: {set(predicted[labels < 0])}"
+
+    # Sum the points per hour and label
+    hours, hour_index = np.unique(columns['created_at'].astype('datetime64[h]'), return_inverse=True)
+    sums = np.zeros((len(hours), len(LABELS)), dtype=np.int64)
+    np.add.at(sums, (hour_index.ravel(), labels), points)
+    return {
+        hour.astype(datetime): {label: int(s) for label, s in zip(LABELS, row)}
+        for hour, row in zip(hours.astype('datetime64[s]'), sums)
+    }
+
+
+class HourlyBuckets:
+    """Hourly statistics that are updated incrementally, as chunks of predicted tweets arrive."""
+
+    def __init__(
+            self,
+            adder_favorites: float,
+            adder_replies: float,
+            adder_retweets: float,
+            followers_log: float,
+    ) -> None:
+        """
+        Initialise empty buckets, see `bucket_by_hour` for the meaning of the parameters.
+
+        :param adder_favorites: Additional points for every "favorite" the tweet receives
+        :param adder_replies: Additional points for every "reply" the tweet has
+        :param adder_retweets: Additional points for every "retweet" the tweet has
+        :param followers_log: Additional points for every follower the user has, logarithmic
+        """
+        self.weights = {
+            'adder_favorites': adder_favorites,
+            'adder_replies':   adder_replies,
+            'adder_retweets':  adder_retweets,
+            'followers_log':   followers_log,
+        }
+        self._buckets: Dict[datetime, Dict[str, int]] = {}
+
+    def add(self, processed: Sequence[Tweet], predictions: Sequence[str]) -> None:
+        """Add the points of the given chunk of processed tweets and their predicted sentiment."""
+        for hour, statistic in bucket_by_hour(processed, predictions, **self.weights).items():
+            bucket = self._buckets.setdefault(hour, {label: 0 for label in LABELS})
+            for label in LABELS: bucket[label] += statistic[label]
+
+    def get(self) -> Dict[datetime, Dict[str, int]]:
+        """Get the statistic for every hour that contains at least one tweet, sorted chronologically."""
+        return dict(sorted(self._buckets.items()))
+
+
+def sum_statistics(statistics: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """Sum the given statistics."""
+    total = {label: 0 for label in LABELS}
+    for statistic in statistics:
+        for label in LABELS: total[label] += int(statistic[label])
+    return total
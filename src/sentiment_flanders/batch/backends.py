@@ -0,0 +1,189 @@
+"""Pluggable CPU inference backends for the sentiment classifier, and a harness to compare them."""
+import argparse
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from twitter_sentiment_classifier import SentimentModel, batch_predict
+
+from .prediction_cache import get_model_id
+
+# Hyper-parameters
+BACKEND = os.environ.get('INFERENCE_BACKEND', 'reference')  # Backend used by the batch jobs
+ONNX_PATH = Path(os.environ.get('ONNX_MODEL_PATH', Path.home() / '.cache' / 'sentiment_flanders' / 'model.onnx'))
+
+
+def get_backend_model_id(name: str = BACKEND) -> str:
+    """Get the identifier of the predictions of the given backend, used to key cached predictions and the manifest."""
+    return get_model_id() if name == 'reference' else f"{get_model_id()}+{name}"
+
+
+def find_attribute(model: Any, cls: Any) -> str:
+    """Find the name of the attribute of the model that is an instance of the given class."""
+    for name, value in vars(model).items():
+        if isinstance(value, cls): return name
+    raise AttributeError(f"{type(model).__name__} has no attribute of type {cls.__name__}")
+
+
+class InferenceBackend(ABC):
+    """Backend predicting the sentiment (NEGATIVE, NEUTRAL or POSITIVE) of texts."""
+
+    name = 'base'
+
+    @abstractmethod
+    def predict(self, texts: List[str]) -> List[str]:
+        """Predict the sentiment of every text."""
+
+    def __call__(self, texts: List[str]) -> List[str]:
+        """Predict the sentiment of every text."""
+        return self.predict(texts)
+
+
+class ReferenceBackend(InferenceBackend):
+    """Reference backend, the (fp32) SentimentModel as shipped by twitter_sentiment_classifier."""
+
+    name = 'reference'
+
+    def __init__(self) -> None:
+        """Load the model."""
+        self.model = SentimentModel()
+
+    def predict(self, texts: List[str]) -> List[str]:
+        """Predict the sentiment of every text."""
+        return batch_predict(texts, model=self.model)
+
+
+class QuantizedBackend(ReferenceBackend):
+    """SentimentModel of which all linear layers are dynamically quantised to int8."""
+
+    name = 'int8'
+
+    def __init__(self) -> None:
+        """Load the model and quantise every torch module it holds, raise if it holds none."""
+        import torch
+        super().__init__()
+        modules = [name for name, value in vars(self.model).items() if isinstance(value, torch.nn.Module)]
+        if not modules:
+            raise AttributeError(f"{type(self.model).__name__} has no attribute of type Module to quantise")
+        for name in modules:
+            module = getattr(self.model, name)
+            setattr(self.model, name, torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8))
+
+
+def export_onnx(path: Path = ONNX_PATH) -> None:
+    """
+    Export the transformer of the SentimentModel to ONNX.
+
+    The model is expected to hold a `transformers` model and tokenizer, which are looked up by their type.
+    """
+    import torch
+    from transformers import PreTrainedModel, PreTrainedTokenizerBase
+
+    model = SentimentModel()
+    network = getattr(model, find_attribute(model, PreTrainedModel)).eval()
+    tokenizer = getattr(model, find_attribute(model, PreTrainedTokenizerBase))
+    inputs = tokenizer(["Dit is een voorbeeld"], return_tensors='pt')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    torch.onnx.export(
+            network,
+            (inputs['input_ids'], inputs['attention_mask']),
+            str(path),
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['logits'],
+            dynamic_axes={
+                'input_ids':      {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'logits':         {0: 'batch'},
+            },
+            opset_version=12,
+    )
+    tokenizer.save_pretrained(str(path.parent))
+    labels = [network.config.id2label[i].upper() for i in range(network.config.num_labels)]
+    (path.parent / 'labels.txt').write_text("\n".join(labels))
+
+
+class OnnxBackend(InferenceBackend):
+    """Transformer of the SentimentModel exported to ONNX (see `export_onnx`), run by ONNX Runtime."""
+
+    name = 'onnx'
+
+    def __init__(self, path: Path = ONNX_PATH, threads: Optional[int] = None) -> None:
+        """
+        Load the exported model, its tokenizer and labels.
+
+        :param path: Path of the exported model, the tokenizer and labels are stored in the same directory
+        :param threads: Number of threads used by ONNX Runtime, all cores if not provided
+        """
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The onnx backend requires onnxruntime, install it with `pip install onnxruntime`") from e
+        from transformers import AutoTokenizer
+
+        options = onnxruntime.SessionOptions()
+        if threads: options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(str(path), options)
+        self.tokenizer = AutoTokenizer.from_pretrained(str(path.parent))
+        self.labels = (path.parent / 'labels.txt').read_text().split()
+
+    def predict(self, texts: List[str]) -> List[str]:
+        """Predict the sentiment of every text."""
+        inputs = self.tokenizer(texts, padding=True, truncation=True, return_tensors='np')
+        logits = self.session.run(['logits'], {
+            'input_ids':      inputs['input_ids'].astype('int64'),
+            'attention_mask': inputs['attention_mask'].astype('int64'),
+        })[0]
+        return [self.labels[i] for i in logits.argmax(axis=-1)]
+
+
+BACKENDS = {backend.name: backend for backend in (ReferenceBackend, QuantizedBackend, OnnxBackend)}
+
+
+def get_backend(name: str = BACKEND) -> InferenceBackend:
+    """Load the inference backend with the given name, configured by the INFERENCE_BACKEND environment variable."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+def compare_backends(texts: Sequence[str], names: Sequence[str], reference: str = 'reference') -> Dict[str, Any]:
+    """
+    Compare the label agreement and throughput of the given backends against the reference backend.
+
+    :param texts: Texts to predict the sentiment of
+    :param names: Names of the backends to compare
+    :param reference: Name of the backend the others are compared against
+    :return: Throughput (tweets/second) and agreement with the reference of every backend
+    """
+    texts = list(texts)
+    predictions = {}
+    results: Dict[str, Any] = {}
+    for name in [reference] + [n for n in names if n != reference]:
+        backend = get_backend(name)
+        backend(texts[:8])  # Warm up
+        start = perf_counter()
+        predictions[name] = backend(texts)
+        seconds = perf_counter() - start
+        agreement = sum(a == b for a, b in zip(predictions[name], predictions[reference])) / max(len(texts), 1)
+        results[name] = {'tweets_per_second': len(texts) / seconds, 'agreement': agreement}
+        print(f"{name:>10}: {len(texts) / seconds:8.1f} tweets/s, {agreement:.2%} agreement with {reference}")
+    return results
+
+
+if __name__ == '__main__':
+    import boto3
+
+    from .backup import open_backup, read_columns
+    from .update_historical import BUCKET, list_backups
+
+    parser = argparse.ArgumentParser(description="Compare inference backends on the tweets of a backed up day.")
+    parser.add_argument('day', help="backed up day to predict, YYYY-MM-DD")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--export', action='store_true', help="export the model to ONNX first")
+    args = parser.parse_args()
+    if args.export: export_onnx()
+    bucket = boto3.resource('s3').Bucket(BUCKET)
+    key, = list_backups(bucket, date_from=args.day, date_to=args.day)
+    compare_backends(read_columns(open_backup(bucket.Object(key)), columns=['text'])['text'], names=args.backends)
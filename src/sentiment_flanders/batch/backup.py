@@ -0,0 +1,113 @@
+"""Columnar, compressed backups of the processed tweets of a single day."""
+import io
+import json
+import pickle
+import zipfile
+from typing import Any, Dict, List, Optional, Sequence
+
+from .tweet import Tweet, from_columns, to_columns
+
+# Hyper-parameters
+BACKUP_SUFFIX = '.columns.zip'
+LEGACY_SUFFIX = '.pickle'
+META_MEMBER = '_meta.json'
+FORMAT_VERSION = 1
+READ_BUFFER = 1024 * 1024  # Size of a single ranged request when reading backups directly from S3
+
+
+def write_backup(processed: Sequence[Tweet]) -> bytes:
+    """
+    Write the processed tweets to a columnar backup.
+
+    The backup is a ZIP archive with one LZMA-compressed JSON array per column, such that every column can be read
+    (and downloaded) without touching the others. Timestamps are stored as integer epochs.
+    """
+    columns = to_columns(processed)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_LZMA) as archive:
+        for column, values in columns.items():
+            archive.writestr(f'{column}.json', json.dumps(values, ensure_ascii=False))
+        archive.writestr(META_MEMBER, json.dumps({
+            'version': FORMAT_VERSION,
+            'length':  len(processed),
+            'columns': list(columns),
+        }))
+    return buffer.getvalue()
+
+
+class _RestrictedUnpickler(pickle.Unpickler):
+    """Unpickler that refuses to load any global, legacy backups only consist of builtin containers and scalars."""
+
+    def find_class(self, module: str, name: str) -> Any:
+        """Refuse every global, which would otherwise allow arbitrary code execution."""
+        raise pickle.UnpicklingError(f"Global '{module}.{name}' is forbidden in a backup")
+
+
+def read_columns(backup: Any, columns: Optional[Sequence[str]] = None) -> Dict[str, List[Any]]:
+    """
+    Read the requested columns from a (columnar or legacy pickle) backup.
+
+    :param backup: Content of the backup or a seekable binary file (e.g. `S3File`) containing it
+    :param columns: Columns to read, all columns if not provided
+    :return: Values of every requested column
+    """
+    file = io.BytesIO(backup) if isinstance(backup, bytes) else backup
+    if not zipfile.is_zipfile(file):
+        file.seek(0)
+        processed = _RestrictedUnpickler(file).load()
+        columns = columns or (list(processed[0].keys()) if processed else [])
+        return {column: [p[column] for p in processed] for column in columns}
+    with zipfile.ZipFile(file) as archive:
+        meta = json.loads(archive.read(META_MEMBER))
+        assert meta['version'] <= FORMAT_VERSION, f"Unsupported backup version {meta['version']}"
+        return {column: json.loads(archive.read(f'{column}.json')) for column in columns or meta['columns']}
+
+
+def read_backup(backup: Any, columns: Optional[Sequence[str]] = None) -> List[Tweet]:
+    """Read the processed tweets from a (columnar or legacy pickle) backup, fields not read get their default value."""
+    return from_columns(read_columns(backup, columns=columns))
+
+
+class S3File(io.RawIOBase):
+    """Seekable, read-only file over an S3 object, only downloading the byte ranges that are read."""
+
+    def __init__(self, obj: Any) -> None:
+        """Wrap the given S3 Object."""
+        super().__init__()
+        self.obj = obj
+        self.size = obj.content_length
+        self.position = 0
+
+    def seekable(self) -> bool:
+        """Indicate the file supports random access."""
+        return True
+
+    def readable(self) -> bool:
+        """Indicate the file supports reading."""
+        return True
+
+    def tell(self) -> int:
+        """Get the current position."""
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Move to the given position."""
+        if whence == io.SEEK_SET: self.position = offset
+        elif whence == io.SEEK_CUR: self.position += offset
+        elif whence == io.SEEK_END: self.position = self.size + offset
+        return self.position
+
+    def readinto(self, buffer: Any) -> int:
+        """Read the next bytes into the given buffer using a single ranged request."""
+        end = min(self.position + len(buffer), self.size)
+        if end <= self.position: return 0
+        data = self.obj.get(Range=f'bytes={self.position}-{end - 1}')['Body'].read()
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def open_backup(obj: Any) -> Any:
+    """Open the backup stored in the given S3 Object, columnar backups are read lazily using ranged requests."""
+    if obj.key.endswith(LEGACY_SUFFIX): return obj.get()['Body'].read()
+    return io.BufferedReader(S3File(obj), buffer_size=READ_BUFFER)
@@ -0,0 +1,98 @@
+"""Checkpoints of the stages of a single run, such that a failed run resumes where it stopped."""
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import boto3
+
+# Hyper-parameters
+CHECKPOINT_ROOT = os.environ.get('CHECKPOINT_ROOT', 's3://default-twittersentiment-data/checkpoint')
+
+
+class Checkpoint:
+    """
+    Outputs of the completed stages of the run of a single day, stored locally or on S3.
+
+    Every stage is stored as a single (gzip compressed) object under `<root>/<run>/<stage>`, which is only written once
+    the stage completed. A stage that has an object is thus complete and never recomputed.
+    """
+
+    def __init__(self, run: str, root: str = CHECKPOINT_ROOT) -> None:
+        """
+        Initialise the checkpoint.
+
+        :param run: Identifier of the run, the day (YYYY-MM-DD) that is processed
+        :param root: Local directory or S3 prefix (s3://bucket/prefix) under which the checkpoints are stored
+        """
+        self.run = run
+        self.root = root.rstrip('/')
+        if self.root.startswith('s3://'):
+            bucket, _, prefix = self.root[len('s3://'):].partition('/')
+            self.bucket = boto3.resource('s3').Bucket(bucket)
+            self.prefix = f"{prefix}/{run}/" if prefix else f"{run}/"
+        else:
+            self.bucket = None
+            self.path = Path(self.root) / run
+
+    def exists(self, stage: str) -> bool:
+        """Check if the given stage completed."""
+        if self.bucket is not None:
+            key = self.prefix + stage
+            return any(obj.key == key for obj in self.bucket.objects.filter(Prefix=key))
+        return (self.path / stage).is_file()
+
+    def read(self, stage: str) -> Optional[bytes]:
+        """Read the output of the given stage, None if the stage did not complete yet."""
+        if self.bucket is not None:
+            try:
+                data = self.bucket.Object(self.prefix + stage).get()['Body'].read()
+            except self.bucket.meta.client.exceptions.NoSuchKey:
+                return None
+        else:
+            if not (self.path / stage).is_file(): return None
+            data = (self.path / stage).read_bytes()
+        return gzip.decompress(data)
+
+    def write(self, stage: str, data: bytes) -> None:
+        """Write the output of the given stage, marking it as complete."""
+        data = gzip.compress(data)
+        if self.bucket is not None:
+            self.bucket.Object(self.prefix + stage).put(Body=data)
+        else:
+            self.path.mkdir(parents=True, exist_ok=True)
+            temporary = self.path / f'.{stage}.tmp'
+            temporary.write_bytes(data)
+            temporary.replace(self.path / stage)  # Atomic, a crash never leaves a partial stage behind
+
+    def stage(
+            self,
+            stage: str,
+            compute: Callable[[], Any],
+            dump: Callable[[Any], bytes] = lambda x: json.dumps(x).encode('utf-8'),
+            load: Callable[[bytes], Any] = json.loads,
+    ) -> Any:
+        """
+        Get the output of the given stage, only computing (and storing) it if the stage did not complete before.
+
+        :param stage: Name of the stage
+        :param compute: Function computing the output of the stage
+        :param dump: Function serialising the output, JSON by default
+        :param load: Function deserialising the output, JSON by default
+        """
+        data = self.read(stage)
+        if data is not None:
+            print(f"Resuming from checkpoint of stage '{stage}' ({self.run})")
+            return load(data)
+        output = compute()
+        self.write(stage, dump(output))
+        return output
+
+    def clear(self) -> None:
+        """Remove the checkpoints of the run, once it completed successfully."""
+        if self.bucket is not None:
+            self.bucket.objects.filter(Prefix=self.prefix).delete()
+        elif self.path.is_dir():
+            for file in self.path.iterdir(): file.unlink()
+            self.path.rmdir()
@@ -1,52 +1,217 @@
 """Functionality to put elements in DynamoDB."""
-import re
+import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List
+from functools import lru_cache
+from time import sleep
+from typing import Any, Dict, List, Optional
 
 import boto3
 from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeSerializer
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from sentiment_flanders.dynamodb import batch_get
+
+from .granularity import get_granularity
+
+# Hyper-parameters
+REGION = 'eu-west-1'
+TABLE = 'sentiment-flanders-impressions'
+BATCH_SIZE = 25  # Maximum number of items in a single BatchWriteItem request
+WRITE_WORKERS = 8  # Number of BatchWriteItem requests in flight
+WRITE_RETRIES = 8  # Number of retries of the items left unprocessed (throttled) by a BatchWriteItem request
+WRITE_BACKOFF = .05  # Initial backoff in seconds, doubled on every retry
+
+_serializer = TypeSerializer()
+
+
+@lru_cache(maxsize=None)
+def get_resource() -> Any:
+    """Create the DynamoDB resource, shared by all writes, with a connection for every concurrent request."""
+    return boto3.resource('dynamodb', region_name=REGION, config=Config(
+            max_pool_connections=max(WRITE_WORKERS, 10),
+            retries={'max_attempts': 10, 'mode': 'adaptive'},
+    ))
+
+
+def get_client() -> Any:
+    """Get the (thread-safe) low-level client of the shared DynamoDB resource."""
+    return get_resource().meta.client
 
 
 def get_table():
     """Get the DynamoDB table."""
-    ddb = boto3.resource("dynamodb", region_name='eu-west-1')
-    return ddb.Table("sentiment-flanders-impressions")
+    return get_resource().Table(TABLE)
 
 
 def get_statistic_id(date: str) -> str:
     """Get the statistic ID that corresponds with the given date."""
-    if re.match(r"^\d{4}-\d{2}-\d{2}:\d{2}$", date):
-        return 'sentiment_impressions_hourly'
-    elif re.match(r"^\d{4}-\d{2}-\d{2}$", date):
-        return 'sentiment_impressions_daily'
-    elif re.match(r"^\d{4}-\d{2}$", date):
-        return 'sentiment_impressions_monthly'
-    else:
-        raise FileNotFoundError("Invalid date(must be either YYYY-MM-DD:HH, YYYY-MM-DD, or YYYY-MM")
-
-
-def put_item(item: Dict[str, Any]) -> None:
-    """Put a batch of DateStatistics on DynamoDB."""
-    table = get_table()
-    table.put_item(
-            Item={
-                'statistic_id': get_statistic_id(item['date']),
-                'date':         item['date'],
-                'statistic':    item['statistic'],
-            })
+    return get_granularity(date).statistic_id
 
 
-def put_batch(items: List[Dict[str, Any]]) -> None:
-    """Put a batch of DateStatistics on DynamoDB."""
+def to_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Create the DynamoDB item of a DateStatistic, keeping its other attributes (e.g. of a rollup) as well."""
+    return {'statistic_id': get_statistic_id(item['date']), **item}
+
+
+def get_capacity(response: Dict[str, Any]) -> float:
+    """Get the write capacity units consumed by a request."""
+    consumed = response.get('ConsumedCapacity', [])
+    if isinstance(consumed, dict): consumed = [consumed]
+    return sum(c.get('CapacityUnits', 0.) for c in consumed)
+
+
+def put_item(item: Dict[str, Any]) -> float:
+    """Put a single DateStatistic on DynamoDB, return the consumed write capacity."""
     table = get_table()
-    with table.batch_writer() as batch:
-        for item in items:
-            batch.put_item(
-                    Item={
-                        'statistic_id': get_statistic_id(item['date']),
-                        'date':         item['date'],
-                        'statistic':    item['statistic'],
-                    })
+    return get_capacity(table.put_item(Item=to_item(item), ReturnConsumedCapacity='TOTAL'))
+
+
+def write_batch(requests: List[Dict[str, Any]], retries: int = WRITE_RETRIES) -> float:
+    """
+    Write a single batch of (at most 25) put requests, retrying the unprocessed items with exponential backoff.
+
+    :param requests: Put requests of the serialised items
+    :param retries: Number of retries of the unprocessed items
+    :return: Write capacity units consumed
+    """
+    client = get_client()
+    capacity = 0.
+    attempt = 0
+    while True:
+        response = client.batch_write_item(RequestItems={TABLE: requests}, ReturnConsumedCapacity='TOTAL')
+        capacity += get_capacity(response)
+        requests = response.get('UnprocessedItems', {}).get(TABLE, [])
+        if not requests: return capacity
+        if attempt >= retries: raise RuntimeError(f"{len(requests)} items left unprocessed after {retries} retries")
+        sleep(WRITE_BACKOFF * 2 ** attempt * random.uniform(1, 1.5))
+        attempt += 1
+
+
+def put_batch(items: List[Dict[str, Any]], workers: int = WRITE_WORKERS) -> float:
+    """
+    Put a batch of DateStatistics on DynamoDB, split over parallel BatchWriteItem requests of 25 items.
+
+    :param items: DateStatistics to put, of every key only the last one is written
+    :param workers: Number of requests in flight
+    :return: Write capacity units consumed
+    """
+    unique = {(i['statistic_id'], i['date']): i for i in map(to_item, items)}  # A request cannot write a key twice
+    requests = [{'PutRequest': {'Item': {k: _serializer.serialize(v) for k, v in i.items()}}} for i in unique.values()]
+    batches = [requests[i:i + BATCH_SIZE] for i in range(0, len(requests), BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        capacity = sum(executor.map(write_batch, batches))
+    print(f"Wrote {len(requests)} items in {len(batches)} batches, consuming {capacity:.1f} write capacity units")
+    return capacity
+
+
+def get_key(date: str) -> Dict[str, Any]:
+    """Get the (serialised) key of the DateStatistic of the given date."""
+    return {'statistic_id': {'S': get_statistic_id(date)}, 'date': {'S': date}}
+
+
+def get_items(
+        dates: List[str],
+        attributes: List[str],
+        consistent: bool = False,
+        retries: int = WRITE_RETRIES,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the given attributes of the items of the given dates, using BatchGetItem requests of 100 keys.
+
+    :param dates: Dates of which the item is requested
+    :param attributes: Top-level attributes to get, next to the date
+    :param consistent: Use strongly consistent reads
+    :param retries: Number of retries of the keys left unprocessed (throttled) by a BatchGetItem request
+    :return: Item of every date that has one
+    """
+    names = {f'#a{i}': attribute for i, attribute in enumerate(['date', *attributes])}
+    items = batch_get(
+            get_client(),
+            TABLE,
+            keys=[get_key(date) for date in dict.fromkeys(dates)],
+            retries=retries,
+            ProjectionExpression=', '.join(names),
+            ExpressionAttributeNames=names,
+            ConsistentRead=consistent,
+    )
+    return {item['date']: item for item in items}
+
+
+def get_statistics(dates: List[str], retries: int = WRITE_RETRIES) -> Dict[str, Dict[str, int]]:
+    """
+    Get the statistics of the given dates, using BatchGetItem requests of 100 keys.
+
+    :param dates: Dates of which the statistic is requested
+    :param retries: Number of retries of the keys left unprocessed (throttled) by a BatchGetItem request
+    :return: Statistic of every date that has one
+    """
+    items = get_items(dates, attributes=['statistic'], retries=retries)
+    return {date: {label: int(v) for label, v in item['statistic'].items()} for date, item in items.items()}
+
+
+def is_condition_failure(error: ClientError) -> bool:
+    """Check if the request failed because its condition did not hold, or a transaction because one of its did."""
+    if error.response['Error']['Code'] != 'TransactionCanceledException':
+        return error.response['Error']['Code'] == 'ConditionalCheckFailedException'
+    codes = {reason.get('Code', 'None') for reason in error.response.get('CancellationReasons', [])}
+    return 'ConditionalCheckFailed' in codes and codes <= {'None', 'ConditionalCheckFailed', 'TransactionConflict'}
+
+
+def put_if_changed(item: Dict[str, Any]) -> Optional[float]:
+    """
+    Put a single DateStatistic on DynamoDB, on condition that the stored statistic differs from it.
+
+    :param item: DateStatistic to put
+    :return: Write capacity units consumed, None if the stored statistic was equal (e.g. written concurrently)
+    """
+    try:
+        response = get_client().put_item(
+                Item={k: _serializer.serialize(v) for k, v in to_item(item).items()},
+                ConditionExpression='attribute_not_exists(#s) OR #s <> :statistic',
+                ExpressionAttributeNames={'#s': 'statistic'},
+                ExpressionAttributeValues={':statistic': _serializer.serialize(item['statistic'])},
+                ReturnConsumedCapacity='TOTAL',
+        )
+        return get_capacity(response)
+    except ClientError as e:
+        if not is_condition_failure(e): raise
+        return None
+
+
+def put_changed(items: List[Dict[str, Any]], workers: int = WRITE_WORKERS) -> Dict[str, Any]:
+    """
+    Put only the DateStatistics of which the statistic differs from the stored one, skipping the unchanged ones.
+
+    The stored statistics are read first in BatchGetItem requests (half a read capacity unit per item). New items
+    (e.g. a first backfill) are written in BatchWriteItem requests of 25, see `put_batch`, while the changed items are
+    put with conditional writes in parallel. Rewriting unchanged statistics, e.g. when reprocessing history with the
+    same model, therefore consumes (almost) no write capacity.
+
+    :param items: DateStatistics to put, of every date only the last one is written
+    :param workers: Number of requests in flight
+    :return: Number of written and skipped items, and the write capacity units consumed
+    """
+    unique = {item['date']: item for item in items}
+    stored = get_statistics(list(unique))
+    new = [item for date, item in unique.items() if date not in stored]
+    changed = [
+        item for date, item in unique.items()
+        if date in stored and stored[date] != {label: int(value) for label, value in item['statistic'].items()}
+    ]
+    capacity = put_batch(new, workers=workers) if new else 0.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        capacities = [c for c in executor.map(put_if_changed, changed) if c is not None]
+    summary = {
+        'written':        len(new) + len(capacities),
+        'skipped':        len(unique) - len(new) - len(capacities),
+        'capacity_units': capacity + sum(capacities),
+    }
+    print(f"Wrote {len(new)} new and {len(capacities)} changed items and skipped {summary['skipped']} unchanged ones, "
+          f"consuming {summary['capacity_units']:.1f} write capacity units")
+    return summary
 
 
 def get_daily(from_date: datetime, to_date: datetime):
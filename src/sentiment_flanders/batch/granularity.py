@@ -0,0 +1,37 @@
+"""Granularities of the sentiment statistics, from hours up to years, and the rollup of hourly buckets into them."""
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+from sentiment_flanders.granularity import (
+    GRANULARITIES,
+    INCREMENTAL,
+    STORED,
+    Granularity,
+    get_granularity,
+)
+
+from .aggregate import LABELS
+
+__all__ = ["GRANULARITIES", "INCREMENTAL", "STORED", "Granularity", "get_granularity", "rollup"]
+
+
+def rollup(
+        buckets: Dict[datetime, Dict[str, int]],
+        granularities: Sequence[Granularity] = GRANULARITIES,
+) -> Dict[str, List[Dict[str, object]]]:
+    """
+    Sum the hourly buckets into the statistics of every granularity, in a single pass over the buckets.
+
+    :param buckets: Statistic of every hour, as created by `bucket_by_hour`
+    :param granularities: Granularities to sum the buckets into
+    :return: Statistics (date and statistic) of every granularity, keyed by the granularity's name, sorted by date
+    """
+    totals: Dict[str, Dict[str, Dict[str, int]]] = {g.name: {} for g in granularities}
+    for hour, statistic in buckets.items():
+        for granularity in granularities:
+            total = totals[granularity.name].setdefault(granularity.format(hour), {label: 0 for label in LABELS})
+            for label in LABELS: total[label] += int(statistic[label])
+    return {
+        name: [{'date': date, 'statistic': statistic} for date, statistic in sorted(dates.items())]
+        for name, dates in totals.items()
+    }
@@ -0,0 +1,102 @@
+"""Length-bucketed, adaptive batching of sentiment inference."""
+import re
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Hyper-parameters
+TOKEN_BUDGET = 8192  # Maximum number of (padded) tokens in a single batch, bounds the memory used
+LATENCY_BUDGET = 10.  # Targeted number of seconds to predict a single batch
+MAX_BATCH_SIZE = 128  # Maximum number of texts in a single batch
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate the number of tokens of the given text by counting its words and punctuation."""
+    return max(len(_TOKEN.findall(text)), 1)
+
+
+class InferenceScheduler:
+    """
+    Predict the sentiment of texts in batches of similarly sized texts.
+
+    Texts are sorted by their number of tokens, such that texts in the same batch require little padding. The size of
+    every batch is chosen such that its padded number of tokens stays within the token (memory) budget and its
+    predicted duration, based on the throughput of the previous batches, stays within the latency budget.
+    """
+
+    def __init__(
+            self,
+            predict: Callable[[List[str]], List[str]],
+            token_budget: int = TOKEN_BUDGET,
+            latency_budget: float = LATENCY_BUDGET,
+            max_batch_size: int = MAX_BATCH_SIZE,
+            tokenize: Callable[[str], int] = count_tokens,
+    ) -> None:
+        """
+        Initialise the scheduler.
+
+        :param predict: Function predicting the sentiment of a list of texts, e.g. `batch_predict`
+        :param token_budget: Maximum number of padded tokens in a single batch
+        :param latency_budget: Targeted number of seconds to predict a single batch
+        :param max_batch_size: Maximum number of texts in a single batch
+        :param tokenize: Function returning the number of tokens of a text
+        """
+        self.predict = predict
+        self.token_budget = token_budget
+        self.latency_budget = latency_budget
+        self.max_batch_size = max_batch_size
+        self.tokenize = tokenize
+        self.batches: List[Dict[str, Any]] = []  # Statistics of every predicted batch
+        self._seconds_per_token: Optional[float] = None
+
+    def get_budget(self) -> int:
+        """Get the number of padded tokens the next batch may contain."""
+        if not self._seconds_per_token: return self.token_budget
+        return max(int(min(self.token_budget, self.latency_budget / self._seconds_per_token)), 1)
+
+    def __call__(self, texts: Sequence[str]) -> List[str]:
+        """Predict the sentiment of every text, returned in the same order as the given texts."""
+        lengths = [self.tokenize(text) for text in texts]
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+        predictions: List[Optional[str]] = [None] * len(texts)
+        start = 0
+        while start < len(order):
+            # Grow the batch as long as its padded size, set by its longest (last) text, stays within budget
+            budget = self.get_budget()
+            end = start + 1
+            while (end < len(order) and end - start < self.max_batch_size
+                   and (end - start + 1) * lengths[order[end]] <= budget):
+                end += 1
+            batch = order[start:end]
+
+            # Predict the batch and update the measured throughput
+            started = perf_counter()
+            predicted = self.predict([texts[i] for i in batch])
+            seconds = perf_counter() - started
+            assert len(predicted) == len(batch)
+            for i, prediction in zip(batch, predicted): predictions[i] = prediction
+            padded = len(batch) * lengths[batch[-1]]
+            if seconds > 0:
+                measured = seconds / padded
+                self._seconds_per_token = (measured if self._seconds_per_token is None
+                                           else .5 * self._seconds_per_token + .5 * measured)
+            self.batches.append({
+                'size':             len(batch),
+                'tokens':           sum(lengths[i] for i in batch),
+                'padded_tokens':    padded,
+                'seconds':          seconds,
+                'texts_per_second': len(batch) / seconds if seconds > 0 else float('inf'),
+            })
+            start = end
+        self.report()
+        return predictions  # type: ignore
+
+    def report(self) -> None:
+        """Print the overall throughput of all predicted batches."""
+        if not self.batches: return
+        seconds = sum(b['seconds'] for b in self.batches)
+        size = sum(b['size'] for b in self.batches)
+        padding = 1 - sum(b['tokens'] for b in self.batches) / sum(b['padded_tokens'] for b in self.batches)
+        print(f"Predicted {size} texts in {len(self.batches)} batches in {seconds:.1f}s "
+              f"({size / seconds if seconds else float('inf'):.1f} texts/s, {padding:.1%} padding)")
@@ -1,18 +1,25 @@
 """Cron-job as used by AWS Batch."""
 import json
 import os
-import pickle
 from datetime import datetime, timedelta
-from math import log10
 from pathlib import Path
-from time import sleep
+from typing import List, Optional
 
 import boto3
-from twitter_sentiment_classifier import SentimentModel, batch_predict
 
-from .dynamodb import get_daily, put_batch, put_item
-from .twitter_api import fetch, get_ending_timestamps, get_utc_offset
-from .twitter_process import parse
+from .aggregate import HourlyBuckets
+from .backends import get_backend, get_backend_model_id
+from .backup import BACKUP_SUFFIX, read_backup, write_backup
+from .checkpoint import Checkpoint
+from .dynamodb import put_changed
+from .granularity import STORED, rollup
+from .inference import InferenceScheduler
+from .manifest import get_entry, update_manifest
+from .metrics import Metrics
+from .pipeline import fetch_processed, stream_processed
+from .prediction_cache import PredictionCache, cached_predict
+from .rollup import update_rollups
+from .twitter_api import get_ending_timestamps
 
 # Hyper-parameters
 ADDER_FAVORITES = .1
@@ -27,6 +34,7 @@ def fetch_and_process(
         adder_retweets: float = ADDER_RETWEETS,
         followers_log: float = FOLLOWERS_LOG,
         load_local_credentials: bool = True,
+        overlap: bool = True,
 ):
     """
     Perform a fetch on the tweets created two days ago, process these accordingly and push results to DynamoDB.
@@ -43,6 +51,7 @@ def fetch_and_process(
     :param followers_log: Additional points for every follower the user has, logarithmic
                           points += user_followers_log * log_10(user_followers)
     :param load_local_credentials: Load in the locally stored credentials
+    :param overlap: Predict the sentiment of the fetched tweets while the remaining tweets are being fetched
     """
     # Set the locally stored Twitter credentials
     if load_local_credentials:
@@ -51,118 +60,113 @@ def fetch_and_process(
             for k, v in credentials.items():
                 os.environ[k] = v
 
-    # Load in model first
-    model = SentimentModel()
-
     # Connect to S3 bucket
     s3_resource = boto3.resource('s3')
 
     # Get all (16) timestamps for which a fetch is performed
     timestamps = get_ending_timestamps()
 
-    # Fetch all entries
-    tweets = []
-    min_date = None
-    for timestamp in sorted(timestamps, reverse=True):
-        if min_date: timestamp = min(min_date, timestamp)  # Prevent overlap
-        print("Fetching tweets for timestamp:", timestamp)
-        tweets += fetch(enddate=timestamp)
-        sleep(0.2)
-        min_date = min({t.created_at for t in tweets}).replace(tzinfo=None)
-    print(f"Finished fetch of {len(tweets)} tweets")
-
-    # Process all tweets to custom format, recover datetime to current timezone (Europe/Brussels)
-    processed = []
-    for tweet in tweets:
-        tweet.created_at += get_utc_offset()
-        processed.append(parse(tweet))
-    print(f"Finished processing of {len(processed)} tweets")
-
-    # Remove overlap or tweets tweeted in another day
-    day_start = timestamps[0].replace(hour=0, minute=0, second=0)
-    texts = set()
-    processed_temp = []  # temporary container to store unique processed
-    for p in processed:
-        text = p['text'] + p['created_at']
-        if text in texts: continue
-        if datetime.strptime(p['created_at'], "%Y-%m-%d %H:%M:%S") < day_start: continue
-        processed_temp.append(p)
-        texts.add(text)
-    processed = processed_temp
-    print(f"Total of {len(processed)} left after duplicate removal")
-
-    # Backup the tweets to S3 - twittersentimentbucket
-    s3_resource.Object(
-            'default-twittersentiment-data',
-            f'backup/{(datetime.today() - timedelta(days=2)).strftime("%Y-%m-%d")}.pickle',
-    ).put(Body=pickle.dumps(processed))
-    print(f"Backed up all {len(processed)} tweets")
-
-    # Predict sentiment for every tweet using the SentimentModel (takes ~30min for all 8000 tweets)
-    texts = [tweet['text'] for tweet in processed]
-    predictions = batch_predict(texts, model=model)
-    assert len(predictions) == len(processed)
-    print(f"Predicted {len(predictions)} predictions")
-
-    # Bucket by hour
-    buckets = {}
-    for tweet, pred in zip(processed, predictions):
-        key = datetime.strptime(tweet['created_at'], "%Y-%m-%d %H:%M:%S").replace(minute=0, second=0, microsecond=0)
-        if key not in buckets: buckets[key] = {'positive': 0, 'neutral': 0, 'negative': 0}
-
-        # Collect the points of the current tweet
-        points = 1
-        if adder_favorites: points += adder_favorites * tweet['favorite_count']
-        if adder_replies: points += adder_replies * tweet['reply_count']
-        if adder_retweets: points += adder_retweets * tweet['retweet_count']
-        if followers_log and tweet['user_followers']: points += followers_log * log10(tweet['user_followers'])
-        points = round(points)  # Round to be integer (DynamoDB does not accept floats)
-
-        # Assign points to the correct sentiment
-        assert pred in ['NEGATIVE', 'NEUTRAL', 'POSITIVE']
-        if pred == 'POSITIVE': buckets[key]['positive'] += points
-        if pred == 'NEUTRAL': buckets[key]['neutral'] += points
-        if pred == 'NEGATIVE': buckets[key]['negative'] += points
-    print(f"Created {len(buckets)} buckets")
-    print("Keys:", buckets.keys())
-
-    # Push hourly data to DynamoDB
-    statistics_hourly = []
-    for key in buckets.keys():
-        statistics_hourly.append({
-            'date':      key.strftime('%Y-%m-%d:%H'),
-            'statistic': buckets[key]
-        })
-    put_batch(statistics_hourly)
-    print(f"Added {len(statistics_hourly)} hourly statistics to DynamoDB")
-
-    # Push complete day to DynamoDB
-    statistics_daily = {'positive': 0, 'neutral': 0, 'negative': 0}
-    for statistic in buckets.values():
-        for k in statistics_daily.keys(): statistics_daily[k] += statistic[k]
-    put_item({
-        'date':      list(buckets.keys())[0].strftime("%Y-%m-%d"),
-        'statistic': statistics_daily
-    })
-    print(f"Added daily statistic to DynamoDB")
-
-    # If today is second day of month, combine all days of previous month into month-overview
-    if datetime.today().day == 2:
-        # Get last month's date of its last day
-        last_month = (datetime.today() - timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0)
-
-        # Query all statistics that were gathered last month
-        daily_statistics = get_daily(from_date=last_month.replace(day=1), to_date=last_month)
-        if not daily_statistics: return
-
-        # Combine all statistics
-        statistics_monthly = {'positive': 0, 'neutral': 0, 'negative': 0}
-        for statistic in daily_statistics:
-            for key in statistics_monthly.keys(): statistics_monthly[key] += int(statistic['statistic'][key])
-        put_item({
-            'date':      last_month.strftime("%Y-%m"),
-            'statistic': statistics_monthly
-        })
+    # Every stage stores its output in the checkpoint of the day, a retried run resumes after the last completed stage
+    day = (datetime.today() - timedelta(days=2)).strftime("%Y-%m-%d")
+    checkpoint = Checkpoint(day)
+
+    # Fetch, process, deduplicate and predict all entries, only one window of raw tweets is kept in memory at a time
+    # Sentiment is predicted using the SentimentModel (takes ~30min for all 8000 tweets), only the texts that were not
+    # predicted before by the same model are sent to the model, in length-bucketed batches
+    buckets = HourlyBuckets(
+            adder_favorites=adder_favorites,
+            adder_replies=adder_replies,
+            adder_retweets=adder_retweets,
+            followers_log=followers_log,
+    )
+    metrics = Metrics('fetch_and_process')
+    try:
+        backup_data: Optional[bytes] = None
+        if overlap and not checkpoint.exists('processed'):
+            # Predict the tweets while the next windows are being fetched, latency approaches max(fetch, inference)
+            with metrics.stage('fetch_and_predict') as record:
+                processed, predictions = [], []
+                backend = get_backend()
+                scheduler = InferenceScheduler(backend)
+                with PredictionCache(model_id=get_backend_model_id(backend.name)) as cache:
+                    for chunk in stream_processed(timestamps, checkpoint=checkpoint):
+                        predicted = cached_predict([tweet.text for tweet in chunk], predict=scheduler, cache=cache)
+                        buckets.add(chunk, predicted)
+                        processed.extend(chunk)
+                        predictions.extend(predicted)
+                backup_data = write_backup(processed)  # Compressing is costly, the backup below reuses it
+                checkpoint.write('processed', backup_data)
+                checkpoint.write('predictions', json.dumps(predictions).encode('utf-8'))
+                record['items'] = len(processed)
+                record['inference_seconds'] = round(sum(b['seconds'] for b in scheduler.batches), 3)
+        else:
+            with metrics.stage('fetch') as record:
+                processed = checkpoint.stage(
+                        'processed',
+                        lambda: fetch_processed(timestamps, checkpoint=checkpoint),
+                        dump=write_backup,
+                        load=read_backup,
+                )
+                record['items'] = len(processed)
+
+            def predict() -> List[str]:
+                backend = get_backend()
+                with PredictionCache(model_id=get_backend_model_id(backend.name)) as cache:
+                    texts = [tweet.text for tweet in processed]
+                    return cached_predict(texts, predict=InferenceScheduler(backend), cache=cache)
+
+            with metrics.stage('predict') as record:
+                predictions = checkpoint.stage('predictions', predict)
+                buckets.add(processed, predictions)
+                record['items'] = len(predictions)
+        assert len(predictions) == len(processed)
+        print(f"Total of {len(processed)} left after duplicate removal")
+        print(f"Predicted {len(predictions)} predictions")
+
+        # Backup the tweets to S3 - twittersentimentbucket
+        with metrics.stage('backup') as record:
+            backup = s3_resource.Object(
+                    'default-twittersentiment-data',
+                    f'backup/{day}{BACKUP_SUFFIX}',
+            ).put(Body=backup_data or write_backup(processed))
+            record['items'] = len(processed)
+        print(f"Backed up all {len(processed)} tweets")
+
+        # Sum the buckets, which were updated as the predictions came in, into the hourly and daily statistics
+        with metrics.stage('rollup') as record:
+            statistics = checkpoint.stage('statistics', lambda: rollup(buckets.get(), granularities=STORED))
+            statistics_hourly, statistics_daily = statistics['hourly'], statistics['daily']
+            record['items'] = len(statistics_hourly) + len(statistics_daily)
+        print(f"Created {len(statistics_hourly)} buckets")
+        print("Keys:", [s['date'] for s in statistics_hourly])
+
+        # Push the changed hourly and daily data to DynamoDB, weeks, months and years are updated incrementally
+        with metrics.stage('write') as record:
+            # The change of the day is added to its week, month and year first, as it is computed against the stored day
+            record['rollups'] = update_rollups(statistics_daily)
+            record.update(put_changed(statistics_hourly + statistics_daily))
+            record['items'] = len(statistics_hourly) + len(statistics_daily)
+        print(f"Added {record['written']} changed out of {record['items']} hourly and daily statistics to DynamoDB")
+
+        # Record the inputs that produced this day's statistics, historical reruns skip the day until these change
+        with metrics.stage('manifest'):
+            update_manifest(s3_resource.Bucket('default-twittersentiment-data'), {
+                day: get_entry(
+                        checksum=backup['ETag'],
+                        model_id=get_backend_model_id(),
+                        hyperparameters={
+                            'adder_favorites': adder_favorites,
+                            'adder_replies':   adder_replies,
+                            'adder_retweets':  adder_retweets,
+                            'followers_log':   followers_log,
+                        },
+                )
+            })
+
+        # The run completed, a next run of the same day starts from scratch
+        checkpoint.clear()
+    finally:
+        metrics.save()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,41 @@
+"""Manifest recording the inputs that produced the statistics of every backed up day."""
+import json
+from typing import Any, Dict
+
+# Hyper-parameters
+MANIFEST_KEY = 'manifest/statistics.json'
+
+
+def get_entry(checksum: str, model_id: str, hyperparameters: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Get the manifest entry of a single day.
+
+    :param checksum: Checksum (S3 ETag) of the day's backup
+    :param model_id: Identifier of the model that predicted the sentiment
+    :param hyperparameters: Hyper-parameters used to weigh every tweet
+    """
+    return {
+        'checksum':        checksum.strip('"'),
+        'model_id':        model_id,
+        'hyperparameters': hyperparameters,
+    }
+
+
+def load_manifest(bucket: Any) -> Dict[str, Dict[str, Any]]:
+    """Load the manifest, mapping every day (YYYY-MM-DD) on its entry, from the given S3 bucket."""
+    try:
+        return json.loads(bucket.Object(MANIFEST_KEY).get()['Body'].read())
+    except bucket.meta.client.exceptions.NoSuchKey:
+        return {}
+
+
+def save_manifest(bucket: Any, manifest: Dict[str, Dict[str, Any]]) -> None:
+    """Save the manifest to the given S3 bucket."""
+    bucket.Object(MANIFEST_KEY).put(Body=json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+
+
+def update_manifest(bucket: Any, entries: Dict[str, Dict[str, Any]]) -> None:
+    """Update the entries of the given days in the manifest stored in the S3 bucket."""
+    manifest = load_manifest(bucket)
+    manifest.update(entries)
+    save_manifest(bucket, manifest)
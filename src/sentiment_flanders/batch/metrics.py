@@ -0,0 +1,104 @@
+"""Timing and memory instrumentation of the stages of a batch run."""
+import json
+import os
+import resource
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional
+
+# Hyper-parameters
+METRICS_PATH = os.environ.get('METRICS_PATH')  # Directory to write a metrics file of every run to, optional
+
+
+def get_peak_rss(who: int = resource.RUSAGE_SELF) -> int:
+    """
+    Get the peak resident set size (in MiB) over the lifetime of the current process.
+
+    :param who: RUSAGE_SELF for the current process, RUSAGE_CHILDREN for the largest of its terminated child processes
+    """
+    peak = resource.getrusage(who).ru_maxrss
+    return peak // (1024 * 1024) if sys.platform == 'darwin' else peak // 1024  # Bytes on macOS, KiB on Linux
+
+
+def get_rss() -> int:
+    """Get the current resident set size (in MiB) of the current process, its peak where /proc is not available."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'): return int(line.split()[1]) // 1024  # In KiB
+    except OSError:
+        pass
+    return get_peak_rss()
+
+
+def get_cpu_time() -> float:
+    """Get the CPU time (user and system) of the current process and its terminated child processes."""
+    return sum(os.times()[:4])
+
+
+class Metrics:
+    """Metrics of every stage of a single run, printed as a JSON line once the stage finishes."""
+
+    def __init__(self, job: str, path: Optional[str] = METRICS_PATH) -> None:
+        """
+        Initialise the metrics of the run.
+
+        :param job: Name of the job, e.g. fetch_and_process
+        :param path: Directory to write the metrics of the run to by `save`, not written if not provided
+        """
+        self.job = job
+        self.run = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
+        self.path = path
+        self.stages: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, Any]]:
+        """
+        Measure the wall time, CPU time and memory of the stage run within the context.
+
+        The memory is the resident set size once the stage finished and its change during the stage, next to the peak
+        of the child processes (e.g. of a process pool) that terminated so far.
+
+        The yielded record may be given the number of processed `items`, used to compute the throughput, and any other
+        (JSON serialisable) field. The record is kept even when the stage fails.
+        """
+        record: Dict[str, Any] = {'job': self.job, 'run': self.run, 'stage': name}
+        wall, cpu, rss = perf_counter(), get_cpu_time(), get_rss()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = repr(e)
+            raise
+        finally:
+            record['wall_seconds'] = round(perf_counter() - wall, 3)
+            record['cpu_seconds'] = round(get_cpu_time() - cpu, 3)
+            record['rss_mib'] = get_rss()
+            record['rss_delta_mib'] = record['rss_mib'] - rss
+            record['children_peak_rss_mib'] = get_peak_rss(resource.RUSAGE_CHILDREN)
+            if 'items' in record and record['wall_seconds'] > 0:
+                record['items_per_second'] = round(record['items'] / record['wall_seconds'], 1)
+            self.stages.append(record)
+            print(json.dumps(record))
+
+    def summary(self) -> Dict[str, Any]:
+        """Get the metrics of the complete run, the peak memory is measured over the lifetime of the process."""
+        return {
+            'job':                   self.job,
+            'run':                   self.run,
+            'wall_seconds':          round(sum(s['wall_seconds'] for s in self.stages), 3),
+            'cpu_seconds':           round(sum(s['cpu_seconds'] for s in self.stages), 3),
+            'peak_rss_mib':          get_peak_rss(),
+            'children_peak_rss_mib': get_peak_rss(resource.RUSAGE_CHILDREN),
+            'stages':                self.stages,
+        }
+
+    def save(self) -> None:
+        """Write the metrics of the run to its own file, if a directory is configured."""
+        if not self.path: return
+        path = Path(self.path) / f"{self.job}-{self.run.replace(':', '')}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.summary(), indent=2))
+        print(f"Saved metrics to {path}")
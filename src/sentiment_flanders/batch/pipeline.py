@@ -0,0 +1,170 @@
+"""Lazy fetch → parse → dedupe → day-filter pipeline over the Twitter windows."""
+import threading
+from datetime import datetime
+from queue import Full, Queue
+from typing import Any, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .checkpoint import Checkpoint
+from .metrics import get_rss
+from .tweet import Tweet, to_epoch
+from .twitter_api import dump_window, fetch_windows, get_utc_offset, load_window
+from .twitter_process import parse
+
+# Hyper-parameters
+STREAM_CHUNK = 256  # Number of processed tweets handed over to the consumer at once
+STREAM_QUEUE = 8  # Maximum number of chunks waiting to be consumed, bounds the memory used
+
+_DONE = object()  # Handed over by the producer after its last chunk
+
+
+def report_rss(stage: str, items: Iterable[Any]) -> Iterator[Any]:
+    """Pass all items through untouched and report the current RSS once the given stage is exhausted."""
+    count = 0
+    for item in items:
+        count += 1
+        yield item
+    print(f"Stage '{stage}' finished with {count} items, RSS {get_rss()} MiB")
+
+
+def get_windows(timestamps: List[datetime], checkpoint: Optional[Checkpoint] = None) -> Iterator[List[Any]]:
+    """Get the raw tweets of every window, windows checkpointed by a previous attempt are not fetched again."""
+    missing = []
+    for timestamp in timestamps:
+        data = checkpoint.read(f'raw-{timestamp:%Y%m%d%H%M}') if checkpoint else None
+        if data is None: missing.append(timestamp)
+        else: yield load_window(data)
+    for timestamp, window in fetch_windows(missing):
+        if checkpoint: checkpoint.write(f'raw-{timestamp:%Y%m%d%H%M}', dump_window(window))
+        yield window
+
+
+def fetch_tweets(timestamps: List[datetime], checkpoint: Optional[Checkpoint] = None) -> Iterator[Any]:
+    """
+    Fetch the raw tweets for every ending timestamp, trimming the overlap between the windows once merged.
+
+    Windows are fetched concurrently, only the raw tweets of the windows that are in flight are kept in memory.
+    """
+    seen: Set[int] = set()
+    for window in get_windows(timestamps, checkpoint=checkpoint):
+        for tweet in window:
+            if tweet.id in seen: continue
+            seen.add(tweet.id)
+            yield tweet
+        del window
+
+
+def parse_tweets(tweets: Iterable[Any]) -> Iterator[Tweet]:
+    """Parse all tweets to custom format, recover datetime to current timezone (Europe/Brussels)."""
+    offset = get_utc_offset()
+    for tweet in tweets:
+        tweet.created_at += offset
+        yield parse(tweet)
+
+
+def remove_duplicates(processed: Iterable[Tweet]) -> Iterator[Tweet]:
+    """Remove the tweets that were already seen, identified by their text and creation time."""
+    seen: Set[Tuple[str, int]] = set()
+    for p in processed:
+        key = (p.text, p.created_at)
+        if key in seen: continue
+        seen.add(key)
+        yield p
+
+
+def filter_day(processed: Iterable[Tweet], day_start: datetime) -> Iterator[Tweet]:
+    """Remove the tweets that were tweeted before the given day."""
+    start = to_epoch(day_start)
+    for p in processed:
+        if p.created_at < start: continue
+        yield p
+
+
+def iter_processed(timestamps: List[datetime], checkpoint: Optional[Checkpoint] = None) -> Iterator[Tweet]:
+    """
+    Run the complete pipeline for the given ending timestamps, yielding the unique tweets of that day.
+
+    :param timestamps: Ending timestamps of the windows to fetch
+    :param checkpoint: Checkpoint of the run, every fetched window is stored such that it is never fetched twice
+    """
+    day_start = timestamps[0].replace(hour=0, minute=0, second=0)
+    tweets = report_rss('fetch', fetch_tweets(timestamps, checkpoint=checkpoint))
+    processed = report_rss('parse', parse_tweets(tweets))
+    unique = report_rss('dedupe', remove_duplicates(processed))
+    return report_rss('filter', filter_day(unique, day_start))
+
+
+def fetch_processed(timestamps: List[datetime], checkpoint: Optional[Checkpoint] = None) -> List[Tweet]:
+    """Run the complete pipeline for the given ending timestamps and collect the unique tweets of that day."""
+    return list(iter_processed(timestamps, checkpoint=checkpoint))
+
+
+def iter_chunks(items: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    """Group the items in chunks of the given size, the last chunk holds the remaining items."""
+    chunk: List[Any] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) < chunk_size: continue
+        yield chunk
+        chunk = []
+    if chunk: yield chunk
+
+
+def put_chunk(chunks: "Queue[Any]", item: Any, stopped: threading.Event) -> bool:
+    """Put the item on the queue once there is room for it, return False if the consumer stopped."""
+    while not stopped.is_set():
+        try:
+            chunks.put(item, timeout=.1)
+            return True
+        except Full:
+            continue
+    return False
+
+
+def produce_chunks(chunks: "Queue[Any]", stopped: threading.Event, items: Iterable[Any], chunk_size: int) -> None:
+    """Push chunks of the items on the queue, followed by `_DONE` or the exception that was raised."""
+    try:
+        for chunk in iter_chunks(items, chunk_size):
+            if not put_chunk(chunks, chunk, stopped): return
+        put_chunk(chunks, _DONE, stopped)
+    except Exception as e:
+        put_chunk(chunks, e, stopped)
+
+
+def consume_chunks(chunks: "Queue[Any]") -> Iterator[List[Any]]:
+    """Yield the chunks on the queue until the producer is done, raising the exception the producer raised."""
+    while True:
+        item = chunks.get()
+        if item is _DONE: return
+        if isinstance(item, Exception): raise item
+        yield item
+
+
+def stream_processed(
+        timestamps: List[datetime],
+        checkpoint: Optional[Checkpoint] = None,
+        chunk_size: int = STREAM_CHUNK,
+        queue_size: int = STREAM_QUEUE,
+) -> Iterator[List[Tweet]]:
+    """
+    Run the complete pipeline in a background (producer) thread, yielding chunks of unique tweets as they are fetched.
+
+    The chunks are handed over through a bounded queue, such that the consumer (e.g. inference) works while the next
+    windows are being fetched. The producer blocks once the queue is full, and stops when the consumer does.
+
+    :param timestamps: Ending timestamps of the windows to fetch
+    :param checkpoint: Checkpoint of the run, every fetched window is stored such that it is never fetched twice
+    :param chunk_size: Number of tweets in every chunk
+    :param queue_size: Maximum number of chunks waiting to be consumed
+    """
+    chunks: "Queue[Any]" = Queue(maxsize=queue_size)
+    stopped = threading.Event()
+    items = iter_processed(timestamps, checkpoint=checkpoint)
+    producer = threading.Thread(
+            target=produce_chunks, args=(chunks, stopped, items, chunk_size), name='producer', daemon=True,
+    )
+    producer.start()
+    try:
+        yield from consume_chunks(chunks)
+    finally:
+        stopped.set()
+        producer.join()
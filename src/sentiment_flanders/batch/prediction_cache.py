@@ -0,0 +1,139 @@
+"""Persistent, content-addressed cache of sentiment predictions."""
+import hashlib
+import os
+import sqlite3
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from time import time_ns
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Hyper-parameters
+CACHE_PATH = Path(os.environ.get(
+        'PREDICTION_CACHE_PATH',
+        Path.home() / '.cache' / 'sentiment_flanders' / 'predictions.sqlite',
+))
+CACHE_SIZE = 2_000_000  # Maximum number of cached predictions, least recently used are evicted first
+SQLITE_CHUNK = 500  # Maximum number of keys in a single SQLite statement
+
+
+def get_model_id() -> str:
+    """Get the identifier of the sentiment model, overruled by the MODEL_ID environment variable if set."""
+    if os.environ.get('MODEL_ID'): return os.environ['MODEL_ID']
+    try:
+        return f"twitter_sentiment_classifier@{version('twitter_sentiment_classifier')}"
+    except PackageNotFoundError:
+        return 'twitter_sentiment_classifier@unknown'
+
+
+def normalise(text: str) -> str:
+    """Normalise the text before hashing, predictions do not depend on the whitespace used."""
+    return " ".join(text.split())
+
+
+class PredictionCache:
+    """SQLite-backed cache of predictions keyed by the hash of the normalised text and the model identifier."""
+
+    def __init__(
+            self,
+            path: Path = CACHE_PATH,
+            model_id: Optional[str] = None,
+            max_size: int = CACHE_SIZE,
+    ) -> None:
+        """
+        Open (or create) the cache.
+
+        :param path: Path of the SQLite database
+        :param model_id: Identifier of the model whose predictions are cached, see `get_model_id` if not provided
+        :param max_size: Maximum number of cached predictions
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.model_id = model_id or get_model_id()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(str(path), timeout=60)
+        self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key TEXT PRIMARY KEY, prediction TEXT NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)")
+        self._db.commit()
+
+    def __enter__(self) -> 'PredictionCache':
+        """Use the cache as a context manager, closing it afterwards."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close the cache."""
+        self.close()
+
+    def __len__(self) -> int:
+        """Get the number of cached predictions."""
+        return self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def key(self, text: str) -> str:
+        """Get the key of the given text."""
+        return hashlib.sha256(f"{self.model_id}\0{normalise(text)}".encode('utf-8')).hexdigest()
+
+    def get(self, texts: Sequence[str]) -> Dict[str, str]:
+        """Get the cached predictions of the given texts, keyed by text, and mark them as recently used."""
+        text_keys = {text: self.key(text) for text in set(texts)}
+        keys = sorted(set(text_keys.values()))
+        cached: Dict[str, str] = {}
+        for i in range(0, len(keys), SQLITE_CHUNK):
+            chunk = keys[i:i + SQLITE_CHUNK]
+            cached.update(self._db.execute(
+                    f"SELECT key, prediction FROM predictions WHERE key IN ({','.join('?' * len(chunk))})", chunk,
+            ).fetchall())
+        now = time_ns()
+        self._db.executemany("UPDATE predictions SET last_used = ? WHERE key = ?", [(now, key) for key in cached])
+        self._db.commit()
+        return {text: cached[key] for text, key in text_keys.items() if key in cached}
+
+    def put(self, predictions: Dict[str, str]) -> None:
+        """Cache the predictions, keyed by text, and evict the least recently used ones if the cache is full."""
+        now = time_ns()
+        self._db.executemany(
+                "INSERT OR REPLACE INTO predictions (key, prediction, last_used) VALUES (?, ?, ?)",
+                [(self.key(text), prediction, now) for text, prediction in predictions.items()],
+        )
+        overflow = len(self) - self.max_size
+        if overflow > 0:
+            self._db.execute(
+                    "DELETE FROM predictions WHERE key IN "
+                    "(SELECT key FROM predictions ORDER BY last_used LIMIT ?)", (overflow,),
+            )
+        self._db.commit()
+
+    def close(self) -> None:
+        """Close the connection with the database."""
+        self._db.close()
+
+
+def cached_predict(
+        texts: Sequence[str],
+        predict: Callable[[List[str]], List[str]],
+        cache: PredictionCache,
+) -> List[str]:
+    """
+    Predict the sentiment of every text, only the texts that are not cached yet are sent to the model.
+
+    :param texts: Texts to predict the sentiment of
+    :param predict: Function predicting the sentiment of a list of texts, e.g. `batch_predict`
+    :param cache: Cache consulted before predicting and updated afterwards
+    :return: Prediction of every text, in the same order as the given texts
+    """
+    found = cache.get(texts)
+    missing = list(dict.fromkeys(text for text in texts if text not in found))  # Unique, order preserved
+    hits = sum(text in found for text in texts)
+    cache.hits += hits
+    cache.misses += len(texts) - hits
+    if missing:
+        predicted = predict(missing)
+        assert len(predicted) == len(missing)
+        new = dict(zip(missing, predicted))
+        cache.put(new)
+        found.update(new)
+    print(f"Prediction cache: {hits} hits, {len(texts) - hits} misses "
+          f"({cache.hits} hits, {cache.misses} misses in total)")
+    return [found[text] for text in texts]
@@ -0,0 +1,211 @@
+"""Weekly, monthly and yearly statistics, maintained incrementally as the daily statistics are written."""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from sentiment_flanders.dynamodb import batch_get
+
+from .aggregate import LABELS
+from .dynamodb import (
+    TABLE,
+    WRITE_RETRIES,
+    WRITE_WORKERS,
+    get_client,
+    get_daily,
+    get_items,
+    get_key,
+    get_statistic_id,
+    is_condition_failure,
+    put_batch,
+)
+from .granularity import INCREMENTAL, rollup
+
+# Hyper-parameters
+ROLLUP_ATTEMPTS = 5  # Number of attempts to add the change of a day to a statistic that keeps changing concurrently
+APPLIED_SUFFIX = '#applied'  # Suffix of the statistic ID of the items keeping the statistic of every day applied
+
+
+def get_rollups(day: str) -> List[str]:
+    """Get the dates (e.g. YYYY-Www, YYYY-MM and YYYY) of the statistics the given day (YYYY-MM-DD) adds up to."""
+    timestamp = datetime.strptime(day, "%Y-%m-%d")
+    return [granularity.format(timestamp) for granularity in INCREMENTAL]
+
+
+def to_statistic(statistic: Dict[str, Any]) -> Dict[str, int]:
+    """Get the statistic with integer counts of every label."""
+    return {label: int(statistic[label]) for label in LABELS}
+
+
+def to_map(statistic: Dict[str, int]) -> Dict[str, Any]:
+    """Serialise the statistic as a DynamoDB map."""
+    return {'M': {label: {'N': str(statistic[label])} for label in LABELS}}
+
+
+def get_applied_key(date: str, day: str) -> Dict[str, Any]:
+    """Get the (serialised) key of the item keeping the statistic of the day that was added to the given statistic."""
+    return {'statistic_id': {'S': get_statistic_id(date) + APPLIED_SUFFIX}, 'date': {'S': day}}
+
+
+def get_applied(rollups: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict[str, int]]:
+    """
+    Get the statistic of the day that was added to the weekly, monthly or yearly statistic, of the given pairs.
+
+    :param rollups: Date of the statistic (e.g. YYYY-MM) and day (YYYY-MM-DD) of every requested applied statistic
+    :return: Applied statistic of every pair of which the day was added to the statistic
+    """
+    items = batch_get(
+            get_client(),
+            TABLE,
+            keys=[get_applied_key(date, day) for date, day in dict.fromkeys(rollups)],
+            retries=WRITE_RETRIES,
+            ConsistentRead=True,
+    )
+    return {(item['rollup'], item['date']): to_statistic(item['statistic']) for item in items}
+
+
+def get_untracked(dates: List[str]) -> List[str]:
+    """Get the dates of the given statistics that exist but do not track their applied days, e.g. written before."""
+    items = get_items(dates, attributes=['tracked'], consistent=True)
+    return sorted(date for date, item in items.items() if not item.get('tracked'))
+
+
+def to_applied(date: str, day: str, statistic: Dict[str, int]) -> Dict[str, Any]:
+    """Create the (serialised) item keeping the statistic of the day that was added to the given statistic."""
+    return {**get_applied_key(date, day), 'rollup': {'S': date}, 'statistic': to_map(statistic)}
+
+
+def _add(date: str, day: str, old: Optional[Dict[str, int]], new: Dict[str, int]) -> bool:
+    """Add the change of the day to the existing statistic, return False if the day's applied statistic is not old."""
+    add = ', '.join(f'#s.{label} :{label}' for label in LABELS)
+    try:
+        get_client().transact_write_items(TransactItems=[
+            {'Update': {
+                'TableName':                 TABLE,
+                'Key':                       get_key(date),
+                'UpdateExpression':          f'ADD {add}',
+                'ConditionExpression':       'attribute_exists(#s) AND attribute_exists(tracked)',
+                'ExpressionAttributeNames':  {'#s': 'statistic'},
+                'ExpressionAttributeValues': {
+                    f':{label}': {'N': str(new[label] - (old[label] if old else 0))} for label in LABELS
+                },
+            }},
+            {'Put': {
+                'TableName':                TABLE,
+                'Item':                     to_applied(date, day, new),
+                'ConditionExpression':      '#s = :old' if old else 'attribute_not_exists(#s)',
+                'ExpressionAttributeNames': {'#s': 'statistic'},
+                **({'ExpressionAttributeValues': {':old': to_map(old)}} if old else {}),
+            }},
+        ])
+        return True
+    except ClientError as e:
+        if not is_condition_failure(e): raise
+        return False
+
+
+def _create(date: str, day: str, new: Dict[str, int]) -> bool:
+    """Create the statistic with the day's statistic as value, return False if it (or the day's) already exists."""
+    try:
+        get_client().transact_write_items(TransactItems=[
+            {'Put': {
+                'TableName':           TABLE,
+                'Item':                {**get_key(date), 'statistic': to_map(new), 'tracked': {'BOOL': True}},
+                'ConditionExpression': 'attribute_not_exists(statistic_id)',
+            }},
+            {'Put': {
+                'TableName':           TABLE,
+                'Item':                to_applied(date, day, new),
+                'ConditionExpression': 'attribute_not_exists(statistic_id)',
+            }},
+        ])
+        return True
+    except ClientError as e:
+        if not is_condition_failure(e): raise
+        return False
+
+
+def add_statistic(date: str, day: str, old: Optional[Dict[str, int]], new: Dict[str, int]) -> bool:
+    """
+    Atomically replace the day's contribution to the statistic of the given date, from its old to its new statistic.
+
+    The statistic of every day that was added to a statistic is kept in an item of its own, next to the statistic
+    (e.g. `sentiment_impressions_monthly#applied` for the monthly statistics), such that the statistics the API reads
+    stay small. The change is added in a transaction with the applied statistic of the day, on condition that it still
+    equals old, else it is computed again against the applied statistic that is read, such that a retried or
+    concurrent run never counts a day twice. The statistic is created if it does not exist yet.
+
+    :param date: Date of the statistic to update, e.g. YYYY-Www, YYYY-MM or YYYY
+    :param day: Day (YYYY-MM-DD) of which the statistic changed
+    :param old: Statistic of the day that was applied to the statistic, None if the day was never added to it
+    :param new: New statistic of the day
+    :return: True if the change was added, False if the new statistic was applied before
+    """
+    for _ in range(ROLLUP_ATTEMPTS):
+        if old == new: return False
+        if _add(date, day, old, new): return True
+        if old is None and _create(date, day, new): return True
+        old = get_applied([(date, day)]).get((date, day))  # Changed by another (or an earlier, failed) run
+    raise RuntimeError(
+            f"The change of day {day} was not added to statistic {date}, it either kept changing concurrently or does "
+            f"not track its applied days, rebuild it by `python -m sentiment_flanders.batch.rollup {date[:4]}`"
+    )
+
+
+def update_rollups(statistics_daily: List[Dict[str, Any]], workers: int = WRITE_WORKERS) -> int:
+    """
+    Add the change of the given daily statistics to their weekly, monthly and yearly statistics.
+
+    The change of every day is computed against the statistic of the day that was applied to every rollup, rather
+    than against the stored day. Rollups are therefore correct however a rerun differs from the run that failed, e.g.
+    after a failure in between updating the rollups and writing the days. Rollups that do not track their applied
+    days yet, as written before they were maintained incrementally, are rebuilt from the stored days first.
+
+    :param statistics_daily: Daily statistics about to be written
+    :param workers: Number of requests in flight
+    :return: Number of rollups that were updated
+    """
+    rollups = [(date, statistic['date']) for statistic in statistics_daily for date in get_rollups(statistic['date'])]
+    untracked = get_untracked([date for date, _ in rollups])
+    for year in sorted({date[:4] for date in untracked}):
+        print(f"Rebuilding the statistics of {year}, {', '.join(d for d in untracked if d[:4] == year)} are untracked")
+        rebuild_rollups(int(year))
+    applied = get_applied(rollups)
+    updates = []
+    for statistic in statistics_daily:
+        day, new = statistic['date'], to_statistic(statistic['statistic'])
+        for date in get_rollups(day):
+            old = applied.get((date, day))
+            if old != new: updates.append((date, day, old, new))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        updated = sum(executor.map(lambda update: add_statistic(*update), updates))
+    print(f"Updated {updated} out of {len(updates)} {', '.join(g.name for g in INCREMENTAL)} statistics")
+    return updated
+
+
+def rebuild_rollups(year: int) -> None:
+    """
+    Rebuild the weekly, monthly and yearly statistics of the given year from scratch, by summing the daily statistics.
+
+    The applied statistic of every day is rebuilt as well, such that later changes of the days are added correctly.
+    The ISO weeks overlapping with the previous or next year are rebuilt by the year they are numbered in.
+    """
+    start, end = datetime(year, 1, 1) - timedelta(days=7), datetime(year, 12, 31) + timedelta(days=7)
+    daily = {datetime.strptime(item['date'], "%Y-%m-%d"): item['statistic'] for item in get_daily(start, end)}
+    statistics = rollup(daily, granularities=INCREMENTAL)
+    applied = [
+        {'statistic_id': get_statistic_id(date) + APPLIED_SUFFIX, 'date': day, 'rollup': date, 'statistic': statistic}
+        for day, statistic in ((t.strftime("%Y-%m-%d"), to_statistic(s)) for t, s in daily.items())
+        for date in get_rollups(day) if date.startswith(str(year))
+    ]
+    rollups: List[Dict[str, Any]] = [s for dates in statistics.values() for s in dates]
+    put_batch(applied + [{**s, 'tracked': True} for s in rollups if s['date'].startswith(str(year))])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild the weekly, monthly and yearly statistics from the days.")
+    parser.add_argument('years', type=int, nargs='+', help="years to rebuild")
+    args = parser.parse_args()
+    for y in args.years: rebuild_rollups(y)
@@ -0,0 +1,140 @@
+"""Compact record of a processed tweet."""
+import sys
+from calendar import timegm
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def to_epoch(timestamp: Union[int, str, datetime]) -> int:
+    """
+    Convert the (naive) timestamp to an integer epoch, without any timezone conversion.
+
+    Formatted timestamps (YYYY-MM-DD HH:MM:SS) of legacy backups are accepted as well.
+    """
+    if isinstance(timestamp, int): return timestamp
+    if isinstance(timestamp, str): timestamp = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    return timegm(timestamp.timetuple())
+
+
+def to_timestamp(epoch: int) -> str:
+    """Format the integer epoch as a (naive) timestamp, without any timezone conversion."""
+    return datetime.utcfromtimestamp(epoch).strftime(TIMESTAMP_FORMAT)
+
+
+def intern(value: Optional[str]) -> Optional[str]:
+    """Intern the (frequently repeated) string, such that all its occurrences share the same memory."""
+    return sys.intern(value) if value is not None else None
+
+
+class Tweet:
+    """
+    Processed tweet, holding only the desired information.
+
+    Timestamps are stored as integer epochs of the (naive) local time and frequently repeated strings are interned.
+    """
+
+    FIELDS = (
+        'id',
+        'created_at',
+        'text',
+        'text_raw',
+        'truncated',
+        'is_quote',
+        'quoted_lang',
+        'quoted_tweet',
+        'quoted_tweet_raw',
+        'quote_count',
+        'is_reply',
+        'replied_tweet_id',
+        'reply_count',
+        'retweet_count',
+        'favorite_count',
+        'hashtags',
+        'user_followers',
+        'user_friends',
+        'user_verified',
+        'user_tweet_count',
+        'user_created_at',
+    )
+    __slots__ = FIELDS
+
+    def __init__(
+            self,
+            id: int,
+            created_at: Union[int, str, datetime],
+            text: str,
+            text_raw: str = "",
+            truncated: bool = False,
+            is_quote: bool = False,
+            quoted_lang: str = "",
+            quoted_tweet: str = "",
+            quoted_tweet_raw: str = "",
+            quote_count: int = 0,
+            is_reply: bool = False,
+            replied_tweet_id: Optional[int] = None,
+            reply_count: int = 0,
+            retweet_count: int = 0,
+            favorite_count: int = 0,
+            hashtags: Iterable[str] = (),
+            user_followers: int = 0,
+            user_friends: int = 0,
+            user_verified: bool = False,
+            user_tweet_count: int = 0,
+            user_created_at: Union[int, str, datetime] = 0,
+    ) -> None:
+        """Create the record, see `twitter_process.parse` for the meaning of every field."""
+        self.id = id
+        self.created_at = to_epoch(created_at)
+        self.text = text
+        self.text_raw = text_raw
+        self.truncated = truncated
+        self.is_quote = is_quote
+        self.quoted_lang = intern(quoted_lang)
+        self.quoted_tweet = quoted_tweet
+        self.quoted_tweet_raw = quoted_tweet_raw
+        self.quote_count = quote_count
+        self.is_reply = is_reply
+        self.replied_tweet_id = replied_tweet_id
+        self.reply_count = reply_count
+        self.retweet_count = retweet_count
+        self.favorite_count = favorite_count
+        self.hashtags: Tuple[str, ...] = tuple(sys.intern(h) for h in hashtags)
+        self.user_followers = user_followers
+        self.user_friends = user_friends
+        self.user_verified = user_verified
+        self.user_tweet_count = user_tweet_count
+        self.user_created_at = to_epoch(user_created_at)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare the records field by field."""
+        if not isinstance(other, Tweet): return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.FIELDS)
+
+    def __repr__(self) -> str:
+        """Represent the record by its identifier, creation time and text."""
+        return f"Tweet(id={self.id!r}, created_at={to_timestamp(self.created_at)!r}, text={self.text!r})"
+
+    @classmethod
+    def from_dict(cls, tweet: Dict[str, Any]) -> 'Tweet':
+        """Create the record from a (legacy) dictionary, missing fields get their default value."""
+        return cls(**{field: tweet[field] for field in cls.FIELDS if field in tweet})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the record to the legacy dictionary format, with formatted timestamps."""
+        tweet = {field: getattr(self, field) for field in self.FIELDS}
+        tweet['created_at'] = to_timestamp(self.created_at)
+        tweet['user_created_at'] = to_timestamp(self.user_created_at)
+        tweet['hashtags'] = list(self.hashtags)
+        return tweet
+
+
+def to_columns(tweets: Sequence[Tweet], fields: Sequence[str] = Tweet.FIELDS) -> Dict[str, List[Any]]:
+    """Get the values of the requested fields of every tweet, as columns."""
+    return {field: [getattr(tweet, field) for tweet in tweets] for field in fields}
+
+
+def from_columns(columns: Dict[str, List[Any]]) -> List[Tweet]:
+    """Create the records from columns, fields without a column get their default value."""
+    return [Tweet(**dict(zip(columns.keys(), values))) for values in zip(*columns.values())]
@@ -1,23 +1,71 @@
 """Functionality used to query the Twitter API."""
+import json
 import os
+import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
+from functools import lru_cache
 from math import modf
-from typing import Any, List
+from time import monotonic, sleep
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pytz
 import tweepy
 
 # Hyper-parameters
 DAY_DELAY = 2
+FETCH_WORKERS = 4  # Number of windows fetched concurrently
+FETCH_RATE = 5.  # Maximum number of requests per second
+FETCH_BURST = 5  # Maximum number of requests sent at once
+FETCH_RETRIES = 5  # Number of retries on rate limiting (429) or server errors (5xx)
+FETCH_BACKOFF = 1.  # Initial backoff in seconds, doubled on every retry
 
 
+class RateLimiter:
+    """Thread-safe token bucket limiting the number of requests sent to the Twitter API."""
+
+    def __init__(self, rate: float = FETCH_RATE, burst: int = FETCH_BURST) -> None:
+        """
+        Initialise the token bucket, which starts full.
+
+        :param rate: Number of tokens added to the bucket every second
+        :param burst: Capacity of the bucket
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+            sleep(wait_time)
+
+
+@lru_cache(maxsize=None)
 def connect() -> tweepy.API:
-    """Create a connection with the Twitter API."""
+    """Create a connection with the Twitter API, shared by all fetches."""
     auth = tweepy.OAuthHandler(os.environ["TWITTER_CONSUMER_KEY"], os.environ["TWITTER_CONSUMER_SECRET"])
     auth.set_access_token(os.environ["TWITTER_ACCESS_TOKEN_KEY"], os.environ["TWITTER_ACCESS_TOKEN_SECRET"])
     return tweepy.API(auth)
 
 
+def is_retryable(error: Exception) -> bool:
+    """Check if the failed request is worth retrying, being rate limited (429) or a server error (5xx)."""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
 def get_utc_offset():
     """Get the current UTC offset for Belgium timezone."""
     return pytz.timezone('CET')._utcoffset
@@ -62,8 +110,7 @@ def get_ending_timestamps() -> List[datetime]:
     return timestamps
 
 
-def fetch(
-        enddate: datetime,
+def build_query(
         country: str = "be",
         lang: str = "nl",
         exclude_retweet: bool = True,
@@ -73,25 +120,8 @@ def fetch(
         exclude_media: bool = True,
         exclude_links: bool = False,
         exclude_mentions: bool = False,
-) -> List[Any]:
-    """
-    Perform a single fetch using the TwitterAPI.
-
-    :param enddate: Ending timestamp for which tweets are fetched
-    :param country: Country of the Twitter user's profile
-    :param lang: Language of the tweets
-    :param exclude_retweet: Exclude all retweets
-    :param exclude_replies: Exclude all replies
-    :param is_verified: Only use verified users
-    :param is_not_verified: Only use non-verified users
-    :param exclude_media: Exclude embedded videos and images
-    :param exclude_links: Exclude tweets that contain URLs
-    :param exclude_mentions: Exclude tweets that mention other users
-    :return: List of 500 fetched tweets
-    """
-    # Connect with the API
-    api = connect()
-
+) -> str:
+    """Create the query of the premium search API, see `fetch` for the filters."""
     # Create the query
     query = ''
 
@@ -110,8 +140,11 @@ def fetch(
     if exclude_media: query += " -has:images -has:videos"
     if exclude_links: query += " -has:media -has:links"
     if exclude_mentions: query += " -has:mentions"
+    return query
+
 
-    # Perform the query
+def search(api: tweepy.API, query: str, enddate: datetime) -> List[Any]:
+    """Search the 500 latest tweets matching the query before the ending timestamp, in a single request."""
     response = tweepy.Cursor(
             api.search_30_day,
             label="production",  # Alternative naming for environment_name
@@ -122,3 +155,108 @@ def fetch(
             toDate=enddate.strftime("%Y%m%d%H%M"),
     )
     return list(response.items(500))
+
+
+def search_with_retries(
+        query: str,
+        enddate: datetime,
+        limiter: Optional[RateLimiter] = None,
+        retries: int = FETCH_RETRIES,
+) -> List[Any]:
+    """Search the tweets, back off exponentially (with jitter) when rate limited or on server errors."""
+    api = connect()
+    attempt = 0
+    while True:
+        if limiter: limiter.acquire()
+        try:
+            return search(api, query, enddate)
+        except tweepy.TweepyException as e:
+            if attempt >= retries or not is_retryable(e): raise
+            backoff = FETCH_BACKOFF * 2 ** attempt * random.uniform(1, 1.5)
+            print(f"Fetch for timestamp {enddate} failed ({e}), retrying in {backoff:.1f}s")
+            sleep(backoff)
+            attempt += 1
+
+
+def fetch(
+        enddate: datetime,
+        country: str = "be",
+        lang: str = "nl",
+        exclude_retweet: bool = True,
+        exclude_replies: bool = True,
+        is_verified: bool = False,
+        is_not_verified: bool = False,
+        exclude_media: bool = True,
+        exclude_links: bool = False,
+        exclude_mentions: bool = False,
+        limiter: Optional[RateLimiter] = None,
+        retries: int = FETCH_RETRIES,
+) -> List[Any]:
+    """
+    Perform a single fetch using the TwitterAPI.
+
+    :param enddate: Ending timestamp for which tweets are fetched
+    :param country: Country of the Twitter user's profile
+    :param lang: Language of the tweets
+    :param exclude_retweet: Exclude all retweets
+    :param exclude_replies: Exclude all replies
+    :param is_verified: Only use verified users
+    :param is_not_verified: Only use non-verified users
+    :param exclude_media: Exclude embedded videos and images
+    :param exclude_links: Exclude tweets that contain URLs
+    :param exclude_mentions: Exclude tweets that mention other users
+    :param limiter: Rate limiter to acquire a token from before every request
+    :param retries: Number of retries, with exponential backoff, when rate limited or on server errors
+    :return: List of 500 fetched tweets
+    """
+    query = build_query(
+            country=country,
+            lang=lang,
+            exclude_retweet=exclude_retweet,
+            exclude_replies=exclude_replies,
+            is_verified=is_verified,
+            is_not_verified=is_not_verified,
+            exclude_media=exclude_media,
+            exclude_links=exclude_links,
+            exclude_mentions=exclude_mentions,
+    )
+    return search_with_retries(query, enddate, limiter=limiter, retries=retries)
+
+
+def fetch_windows(
+        timestamps: List[datetime],
+        workers: int = FETCH_WORKERS,
+        limiter: Optional[RateLimiter] = None,
+) -> Iterator[Tuple[datetime, List[Any]]]:
+    """
+    Fetch the windows ending at the given timestamps concurrently, yield every window (and its timestamp) once fetched.
+
+    At most `workers` windows are in flight (or waiting to be consumed) at any time, which bounds the number of raw
+    tweets kept in memory. Windows may overlap, overlap must be removed after merging.
+
+    :param timestamps: Ending timestamps of the windows to fetch
+    :param workers: Number of windows fetched concurrently
+    :param limiter: Rate limiter shared by all workers, a default one is created if not provided
+    """
+    limiter = limiter or RateLimiter()
+    pending = sorted(timestamps, reverse=True)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running: Dict["Future[List[Any]]", datetime] = {}
+        while pending or running:
+            while pending and len(running) < workers:
+                timestamp = pending.pop(0)
+                print("Fetching tweets for timestamp:", timestamp)
+                running[executor.submit(fetch, enddate=timestamp, limiter=limiter)] = timestamp
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield running.pop(future), future.result()
+
+
+def dump_window(window: List[Any]) -> bytes:
+    """Serialise the raw tweets of a fetched window to JSON, as returned by the Twitter API."""
+    return json.dumps([tweet._json for tweet in window]).encode('utf-8')
+
+
+def load_window(data: bytes) -> List[Any]:
+    """Deserialise the raw tweets of a fetched window, see `dump_window`."""
+    return [tweepy.models.Status.parse(None, tweet) for tweet in json.loads(data)]
@@ -1,35 +1,97 @@
 """Process raw tweet-objects as received by the TwitterAPI."""
 import re
-from typing import Any, Dict
+from typing import Dict, Iterable, List, Match
 
 import emoji
 
+from .tweet import Tweet
+
+# Emoji lookup, every emoji maps on its :emoji: name, candidate lengths per first character are tried longest first
+_EMOJI_NAMES = {e: f":{name[1:-1]}:" for e, name in emoji.UNICODE_EMOJI.items()}
+_EMOJI_LENGTHS: Dict[str, List[int]] = {}
+for _emoji in sorted(_EMOJI_NAMES, key=len, reverse=True):
+    _lengths = _EMOJI_LENGTHS.setdefault(_emoji[0], [])
+    if len(_emoji) not in _lengths: _lengths.append(len(_emoji))
+
+
+def _to_character_class(characters: Iterable[str]) -> str:
+    """Create a regex character class of the given characters, merging consecutive code points into ranges."""
+    ranges: List[List[int]] = []
+    for code in sorted(map(ord, characters)):
+        if ranges and code == ranges[-1][1] + 1: ranges[-1][1] = code
+        else: ranges.append([code, code])
+    return "[" + "".join(
+            re.escape(chr(a)) if a == b else f"{re.escape(chr(a))}-{re.escape(chr(b))}" for a, b in ranges
+    ) + "]"
+
+
+_EMOJI_START = re.compile(_to_character_class(_EMOJI_LENGTHS))
+
+# Single character substitutions (including the removal of emoji variation selectors)
+_TRANSLATION = str.maketrans({
+    "\ufe0f": None,  # Variation selector, removed by emoji.demojize
+    "“": '"',  # Substitute faulty quotes
+    "”": '"',
+    "‘": "'",
+    "’": "'",
+    "•": "-",  # Substitute faulty symbols
+    "›": ">",
+    "‹": "<",
+})
+
+# Remove urls, substitute faulty symbols and repeating symbols in a single pass
+_SUBSTITUTION = re.compile(r"https?://[^ ]+|&gt|&lt|--+")
+_SUBSTITUTES = {"&gt": ">", "&lt": "<"}
+
+
+def _substitute(match: Match[str]) -> str:
+    """Get the substitute of a matched url (removed), faulty symbol or repeating symbol."""
+    text = match.group()
+    if text[0] == "-": return "-"
+    return _SUBSTITUTES.get(text, "")
+
+
+def demojize(tweet: str) -> str:
+    """Substitute unicode emoji by :emoji: type (readable emojis), equivalent to `emoji.demojize` without selectors."""
+    parts = []
+    start = position = 0
+    while True:
+        match = _EMOJI_START.search(tweet, position)
+        if not match: break
+        i = match.start()
+        for length in _EMOJI_LENGTHS[tweet[i]]:
+            name = _EMOJI_NAMES.get(tweet[i:i + length])
+            if name:
+                parts += [tweet[start:i], name]
+                start = position = i + length
+                break
+        else:
+            position = i + 1
+    parts.append(tweet[start:])
+    return "".join(parts)
+
 
 def process(tweet: str) -> str:
-    """Process a tweet's text (body) before storing in final DB."""
-    tweet = emoji.demojize(
-            tweet
-    )  # Substitute unicode emoji by :emoji: type (readable emojis)
-    tweet = re.sub(r"^RT", "", tweet)  # Remove retweet-tag
-    tweet = re.sub(r"http(s|)://[^ ]+", "", tweet)  # Remove urls
-    tweet = re.sub(r"[“”]", '"', tweet)  # Substitute faulty quotes
-    tweet = re.sub(r"[‘’]", "'", tweet)  # Substitute faulty quotes
-    tweet = re.sub(r"•", "-", tweet)  # Substitute faulty symbols
-    tweet = re.sub(r"(›|&gt)", ">", tweet)  # Substitute faulty symbols
-    tweet = re.sub(r"(‹|&lt)", "<", tweet)  # Substitute faulty symbols
-    tweet = re.sub(r"-[\-]+", "-", tweet)  # Substitute repeating symbols
-    tweet = tweet.strip()  # Remove leading and trailing spaces
-    tweet = " ".join(tweet.split())  # Remove enters, tabs, ...
-    return tweet
-
-
-def parse(tweet) -> Dict[str, Any]:
+    """
+    Process a tweet's text (body) before storing in final DB.
+
+    In order: substitute unicode emoji by their :emoji: type, remove the retweet-tag, remove urls, substitute faulty
+    quotes and symbols, substitute repeating symbols, and remove leading, trailing and repeated whitespace.
+    """
+    if not tweet.isascii():
+        tweet = demojize(tweet).translate(_TRANSLATION)
+    if tweet.startswith("RT"): tweet = tweet[2:]  # Remove retweet-tag
+    tweet = _SUBSTITUTION.sub(_substitute, tweet)
+    return " ".join(tweet.split())  # Remove leading and trailing spaces, enters, tabs, ...
+
+
+def parse(tweet) -> Tweet:
     """
     Parse the tweet object to cover only the desired information.
 
-    A parsed tweet looks as follows:
+    A parsed tweet has the following fields:
      - id: [int] unique identifier of the tweet
-     - created_at: [str] timestamp of when tweet was created, second granularity
+     - created_at: [int] epoch of when tweet was created, second granularity
      - text: [str] processed text body of the tweet
      - text_raw: [str] text body of the tweet
      - truncated: [bool] indication if the original tweet is truncated
@@ -43,12 +105,12 @@ def parse(tweet) -> Dict[str, Any]:
      - reply_count: [int] number of tweets replying on this tweet
      - retweet_count: [int] number of tweets retweeting this tweet
      - favorite_count: [int] number of times the tweet is favored
-     - hashtags: [List[str]] list of hashtags that occurred in the tweet
+     - hashtags: [Tuple[str]] hashtags that occurred in the tweet
      - user_followers: [int] number of followers the user posting this tweet has
      - user_friends: [int] number of friends the user posting this tweet has
      - user_verified: [bool] indicator if the user is a verified user
      - user_tweet_count: [int] number of tweets sent by the user over its lifetime
-     - user_created_at: [str] timestamp of when user account was created, second granularity
+     - user_created_at: [int] epoch of when user account was created, second granularity
     """
     # Pull the right text
     text = tweet.text if not tweet.truncated else tweet.extended_tweet["full_text"]
@@ -64,26 +126,26 @@ def parse(tweet) -> Dict[str, Any]:
         quote, quoted_lang = "", ""
 
     # Pull only the useful information
-    return {
-        "id":               tweet.id,
-        "created_at":       tweet.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-        "text":             process(text),
-        "text_raw":         text,
-        "truncated":        tweet.truncated,
-        "is_quote":         tweet.is_quote_status and hasattr(tweet, "quoted_status"),
-        "quoted_lang":      quoted_lang,
-        "quoted_tweet":     process(quote),
-        "quoted_tweet_raw": quote,
-        "quote_count":      tweet.quote_count,
-        "is_reply":         tweet.in_reply_to_status_id is not None,
-        "replied_tweet_id": tweet.in_reply_to_status_id,
-        "reply_count":      tweet.reply_count,
-        "retweet_count":    tweet.retweet_count,
-        "favorite_count":   tweet.favorite_count,
-        "hashtags":         [h["text"] for h in tweet.entities["hashtags"]],
-        "user_followers":   tweet.user.followers_count,
-        "user_friends":     tweet.user.friends_count,
-        "user_verified":    tweet.user.verified,
-        "user_tweet_count": tweet.user.statuses_count,
-        "user_created_at":  tweet.user.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-    }
+    return Tweet(
+            id=tweet.id,
+            created_at=tweet.created_at,
+            text=process(text),
+            text_raw=text,
+            truncated=tweet.truncated,
+            is_quote=tweet.is_quote_status and hasattr(tweet, "quoted_status"),
+            quoted_lang=quoted_lang,
+            quoted_tweet=process(quote),
+            quoted_tweet_raw=quote,
+            quote_count=tweet.quote_count,
+            is_reply=tweet.in_reply_to_status_id is not None,
+            replied_tweet_id=tweet.in_reply_to_status_id,
+            reply_count=tweet.reply_count,
+            retweet_count=tweet.retweet_count,
+            favorite_count=tweet.favorite_count,
+            hashtags=[h["text"] for h in tweet.entities["hashtags"]],
+            user_followers=tweet.user.followers_count,
+            user_friends=tweet.user.friends_count,
+            user_verified=tweet.user.verified,
+            user_tweet_count=tweet.user.statuses_count,
+            user_created_at=tweet.user.created_at,
+    )
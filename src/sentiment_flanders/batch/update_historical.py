@@ -1,13 +1,155 @@
 """Update historical tweets by recalculating the sentiment for all previously fetched Twitter dumps."""
-import pickle
-from datetime import datetime, timedelta
-from math import log10
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import PurePosixPath
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import boto3
-from twitter_sentiment_classifier import batch_predict
 
-from .dynamodb import get_daily, put_batch, put_item
+from .aggregate import bucket_by_hour
+from .backends import get_backend, get_backend_model_id
+from .backup import LEGACY_SUFFIX, open_backup, read_backup
+from .dynamodb import put_changed
+from .granularity import STORED, rollup
+from .inference import InferenceScheduler
 from .main import ADDER_FAVORITES, ADDER_REPLIES, ADDER_RETWEETS, FOLLOWERS_LOG
+from .manifest import get_entry, load_manifest, update_manifest
+from .metrics import Metrics
+from .prediction_cache import PredictionCache, cached_predict
+from .rollup import update_rollups
+
+# Hyper-parameters
+BUCKET = 'default-twittersentiment-data'
+BACKUP_PREFIX = 'backup/2'  # Only backups of days, the manifest lives outside this prefix
+COLUMNS = ('id', 'text', 'created_at', 'favorite_count', 'reply_count', 'retweet_count', 'user_followers')
+WRITE_DAYS = 7  # Number of processed days written to DynamoDB and recorded in the manifest at once
+
+# State of the current (worker) process, initialised once by `init_worker`
+_worker: Dict[str, Any] = {}
+
+
+def init_worker() -> None:
+    """Load the sentiment model (wrapped in a scheduler), prediction cache and S3 bucket once for this process."""
+    backend = get_backend()
+    _worker['scheduler'] = InferenceScheduler(backend)
+    _worker['cache'] = PredictionCache(model_id=get_backend_model_id(backend.name))
+    _worker['bucket'] = boto3.resource('s3').Bucket(BUCKET)
+
+
+def get_day(key: str) -> str:
+    """Get the day (YYYY-MM-DD) of which the backup with the given key contains the tweets."""
+    return PurePosixPath(key).name.split('.')[0]
+
+
+def list_backups(bucket: Any, date_from: Optional[str] = None, date_to: Optional[str] = None) -> Dict[str, str]:
+    """
+    List the keys of all backups in S3, optionally only those in between the given days.
+
+    :param bucket: S3 bucket containing the backups
+    :param date_from: Starting day (inclusive) in YYYY-MM-DD format, optional
+    :param date_to: Ending day (inclusive) in YYYY-MM-DD format, optional
+    :return: Checksum (ETag) of every backup, keyed by the backup's key, only a single backup per day
+    """
+    backups: Dict[str, Any] = {}
+    for obj in bucket.objects.filter(Prefix=BACKUP_PREFIX).all():
+        day = get_day(obj.key)
+        if date_from and day < date_from: continue
+        if date_to and day > date_to: continue
+        if day in backups and obj.key.endswith(LEGACY_SUFFIX): continue  # Prefer columnar over legacy backups
+        backups[day] = obj
+    return {obj.key: obj.e_tag for _, obj in sorted(backups.items())}
+
+
+def process_day(
+        key: str,
+        adder_favorites: float = ADDER_FAVORITES,
+        adder_replies: float = ADDER_REPLIES,
+        adder_retweets: float = ADDER_RETWEETS,
+        followers_log: float = FOLLOWERS_LOG,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Recalculate the statistics of a single backed up day, `init_worker` must be called in the current process first.
+
+    :param key: Key of the backup in S3
+    :return: Hourly and daily statistics of the day, none if the day contains no tweets
+    """
+    print(f"Processing {key}")
+    backup = open_backup(_worker['bucket'].Object(key))
+    processed = read_backup(backup, columns=COLUMNS)
+
+    # Predict sentiment for every tweet using the SentimentModel (takes ~30min for all 8000 tweets)
+    # Only the texts that were not predicted before by the same model are sent to the model, in length-bucketed batches
+    # The batches of the previous days of this worker are dropped, such that the report covers this day only
+    _worker['scheduler'].batches.clear()
+    texts = [tweet.text for tweet in processed]
+    predictions = cached_predict(texts, predict=_worker['scheduler'], cache=_worker['cache'])
+    assert len(predictions) == len(processed)
+    print(f"Predicted {len(predictions)} predictions for {key}")
+
+    # Bucket by hour
+    buckets = bucket_by_hour(
+            processed,
+            predictions,
+            adder_favorites=adder_favorites,
+            adder_replies=adder_replies,
+            adder_retweets=adder_retweets,
+            followers_log=followers_log,
+    )
+    statistics = rollup(buckets, granularities=STORED)
+    return statistics['hourly'], statistics['daily']
+
+
+def iter_processed(
+        keys: List[str],
+        process: Callable[[str], Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]],
+        workers: int = 1,
+) -> Iterator[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """
+    Process the backups with the given keys, spread over multiple processes, yielding the results in order.
+
+    :param keys: Keys of the backups in S3
+    :param process: Function processing a single backup, e.g. `process_day`
+    :param workers: Number of processes over which the days are spread, each loading the model once
+    :return: Hourly and daily statistics of every day, as soon as the day (and all days before) finished
+    """
+    if workers <= 1:
+        init_worker()
+        yield from map(process, keys)
+        return
+    with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),  # boto3 sessions are not fork-safe
+            initializer=init_worker,
+    ) as executor:
+        yield from executor.map(process, keys)
+
+
+def write_days(
+        bucket: Any,
+        results: Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]],
+        entries: Dict[str, Dict[str, Any]],
+        metrics: Metrics,
+) -> None:
+    """
+    Write the statistics of the processed days to DynamoDB, then record the days as written in the manifest.
+
+    :param bucket: S3 bucket containing the manifest
+    :param results: Hourly and daily statistics of every processed day, keyed by the key of its backup
+    :param entries: Manifest entry of every backup, keyed by the key of the backup
+    :param metrics: Metrics of the run, to which the write and manifest stages are added
+    """
+    statistics_hourly = [statistic for hourly, _ in results.values() for statistic in hourly]
+    statistics_daily = [statistic for _, daily in results.values() for statistic in daily]
+    with metrics.stage('write') as record:
+        # The change of every day is added to its week, month and year first, computed against the stored day
+        record['rollups'] = update_rollups(statistics_daily)
+        record.update(put_changed(statistics_hourly + statistics_daily))
+        record['items'] = len(statistics_hourly) + len(statistics_daily)
+    print(f"Added {record['written']} changed out of {record['items']} hourly and daily statistics to DynamoDB")
+    with metrics.stage('manifest'):
+        update_manifest(bucket, {get_day(key): entries[key] for key in results})
 
 
 def process_historical(
@@ -15,9 +157,13 @@ def process_historical(
         adder_replies: float = ADDER_REPLIES,
         adder_retweets: float = ADDER_RETWEETS,
         followers_log: float = FOLLOWERS_LOG,
+        workers: int = 1,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        force: bool = False,
 ):
     """
-    Fetch previously stored tweets and process these accordingly, update DynamoDB afterwards.
+    Fetch previously stored tweets and process these accordingly, updating DynamoDB every few processed days.
 
     Every tweet is processed, with its sentiment having a value of one. Afterwards, its weight may increase depending
     on the number of likes, replies, ... it has.
@@ -30,83 +176,59 @@ def process_historical(
                            points += adder_retweets * n_retweets
     :param followers_log: Additional points for every follower the user has, logarithmic
                           points += user_followers_log * log_10(user_followers)
+    :param workers: Number of processes over which the days are spread, each loading the model once
+    :param date_from: First day (inclusive) to process in YYYY-MM-DD format, optional
+    :param date_to: Last day (inclusive) to process in YYYY-MM-DD format, optional
+    :param force: Process all days, also those whose backup, model and hyper-parameters are unchanged
     """
-    # Fetch resources from S3
-    s3_resource = boto3.resource('s3')
-    my_bucket = s3_resource.Bucket(
-            'default-twittersentiment-data',
-    )
-    for my_bucket_object in my_bucket.objects.filter(Prefix='backup/2').all():
-        print(f"Processing {my_bucket_object.key}")
-        contents = my_bucket_object.get()['Body'].read()
-        processed = pickle.loads(contents)
-
-        # Predict sentiment for every tweet using the SentimentModel (takes ~30min for all 8000 tweets)
-        texts = [tweet['text'] for tweet in processed]
-        predictions = batch_predict(texts)
-        assert len(predictions) == len(processed)
-        print(f"Predicted {len(predictions)} predictions")
-
-        # Bucket by hour
-        buckets = {}
-        for tweet, pred in zip(processed, predictions):
-            key = datetime.strptime(tweet['created_at'], "%Y-%m-%d %H:%M:%S").replace(minute=0, second=0, microsecond=0)
-            if key not in buckets: buckets[key] = {'positive': 0, 'neutral': 0, 'negative': 0}
-
-            # Collect the points of the current tweet
-            points = 1
-            if adder_favorites: points += adder_favorites * tweet['favorite_count']
-            if adder_replies: points += adder_replies * tweet['reply_count']
-            if adder_retweets: points += adder_retweets * tweet['retweet_count']
-            if followers_log and tweet['user_followers']: points += followers_log * log10(tweet['user_followers'])
-            points = round(points)  # Round to be integer (DynamoDB does not accept floats)
-
-            # Assign points to the correct sentiment
-            assert pred in ['NEGATIVE', 'NEUTRAL', 'POSITIVE']
-            if pred == 'POSITIVE': buckets[key]['positive'] += points
-            if pred == 'NEUTRAL': buckets[key]['neutral'] += points
-            if pred == 'NEGATIVE': buckets[key]['negative'] += points
-        print(f"Created {len(buckets)} buckets")
-        print("Keys:", buckets.keys())
-
-        # Push hourly data to DynamoDB
-        statistics_hourly = []
-        for key in buckets.keys():
-            statistics_hourly.append({
-                'date':      key.strftime('%Y-%m-%d:%H'),
-                'statistic': buckets[key]
-            })
-        put_batch(statistics_hourly)
-        print(f"Added {len(statistics_hourly)} hourly statistics to DynamoDB")
-
-        # Push complete day to DynamoDB
-        statistics_daily = {'positive': 0, 'neutral': 0, 'negative': 0}
-        for statistic in buckets.values():
-            for k in statistics_daily.keys(): statistics_daily[k] += statistic[k]
-        put_item({
-            'date':      list(buckets.keys())[0].strftime("%Y-%m-%d"),
-            'statistic': statistics_daily
-        })
-        print(f"Added daily statistic to DynamoDB")
-
-        # If today is second day of month, combine all days of previous month into month-overview
-        if datetime.today().day == 2:
-            # Get last month's date of its last day
-            last_month = (datetime.today() - timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0)
-
-            # Query all statistics that were gathered last month
-            daily_statistics = get_daily(from_date=last_month.replace(day=1), to_date=last_month)
-            if not daily_statistics: return
-
-            # Combine all statistics
-            statistics_monthly = {'positive': 0, 'neutral': 0, 'negative': 0}
-            for statistic in daily_statistics:
-                for key in statistics_monthly.keys(): statistics_monthly[key] += int(statistic['statistic'][key])
-            put_item({
-                'date':      last_month.strftime("%Y-%m"),
-                'statistic': statistics_monthly
-            })
+    metrics = Metrics('process_historical')
+    try:
+        with metrics.stage('list') as record:
+            bucket = boto3.resource('s3').Bucket(BUCKET)
+            backups = list_backups(bucket, date_from=date_from, date_to=date_to)
+
+            # Only process the days whose inputs changed since their statistics were last written
+            manifest = load_manifest(bucket)
+            hyperparameters = {
+                'adder_favorites': adder_favorites,
+                'adder_replies':   adder_replies,
+                'adder_retweets':  adder_retweets,
+                'followers_log':   followers_log,
+            }
+            model_id = get_backend_model_id()
+            entries = {
+                key: get_entry(checksum=checksum, model_id=model_id, hyperparameters=hyperparameters)
+                for key, checksum in backups.items()
+            }
+            keys = [key for key, entry in entries.items() if force or manifest.get(get_day(key)) != entry]
+            record['items'] = len(backups)
+        print(f"Processing {len(keys)} out of {len(backups)} backups using {workers} worker(s)")
+        process = partial(
+                process_day,
+                adder_favorites=adder_favorites,
+                adder_replies=adder_replies,
+                adder_retweets=adder_retweets,
+                followers_log=followers_log,
+        )
+
+        # Write every few processed days, such that a failed run keeps (and skips on a rerun) the days written so far
+        results = iter_processed(keys, process, workers=workers)
+        for start in range(0, len(keys), WRITE_DAYS):
+            chunk = keys[start:start + WRITE_DAYS]
+            with metrics.stage('process') as record:
+                processed = {key: next(results) for key in chunk}
+                record['items'] = len(chunk)
+                record['workers'] = workers
+            write_days(bucket, processed, entries, metrics)
+    finally:
+        metrics.save()
 
 
 if __name__ == '__main__':
-    process_historical()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=1, help="number of processes to spread the days over")
+    parser.add_argument('--from', dest='date_from', help="first day (inclusive) to process, YYYY-MM-DD")
+    parser.add_argument('--to', dest='date_to', help="last day (inclusive) to process, YYYY-MM-DD")
+    parser.add_argument('--force', action='store_true', help="also process the days whose inputs are unchanged")
+    args = parser.parse_args()
+    process_historical(workers=args.workers, date_from=args.date_from, date_to=args.date_to, force=args.force)
@@ -1,13 +1,38 @@
 """Sentiment Flanders configuration."""
+import os
+import threading
+from typing import Any
+
 from .config import __version__, load_config
 from .logging import configure_root_logger
 from .sentry import log_function_with_sentry, log_module_with_sentry
 
-configure_root_logger()
-config = load_config()
+# Defer configuring the logging and loading the config until first use, shortening the cold start of a Lambda
+COLD_START_BUDGET = os.environ.get("COLD_START_BUDGET", "").lower() in ("1", "true", "yes")
+
+_lock = threading.Lock()
+
+if not COLD_START_BUDGET:
+    configure_root_logger()
+    config = load_config()
+else:
+    globals().pop("config")  # Refers to the config module, until the config is loaded on first use
+
+
+def __getattr__(name: str) -> Any:
+    """Configure the logging and load the config on first use, in cold start budget mode."""
+    global config
+    if name != "config": raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lock:
+        if "config" not in globals():
+            configure_root_logger()
+            config = load_config()
+    return config
+
 
 __all__ = [
     "__version__",
+    "COLD_START_BUDGET",
     "config",
     "load_config",
     "log_function_with_sentry",
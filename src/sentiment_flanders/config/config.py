@@ -3,9 +3,10 @@
 import logging
 import os
 from subprocess import CalledProcessError, check_output  # noqa: S404
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-import dynaconf
+if TYPE_CHECKING:
+    import dynaconf
 
 __version__ = "0.0.0"
 logger = logging.getLogger(__name__)
@@ -42,8 +43,10 @@ def get_workspace() -> Optional[str]:
         return workspace
 
 
-def load_config(workspace: Optional[str] = None) -> dynaconf.LazySettings:
+def load_config(workspace: Optional[str] = None) -> "dynaconf.LazySettings":
     """Load package config for the selected workspace."""
+    import dynaconf  # Imported on first use, it takes a large part of the import time of the package
+
     settings = dynaconf.LazySettings(
         ENV_FOR_DYNACONF=workspace or get_workspace(),
         ROOT_PATH_FOR_DYNACONF=os.path.dirname(__file__),
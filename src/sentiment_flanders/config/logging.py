@@ -2,11 +2,11 @@
 
 import logging
 
-import coloredlogs
-
 
 def configure_root_logger() -> None:
     """Configure the root logger."""
+    import coloredlogs
+
     # Remove all handlers associated with the root logger object.
     for handler in logging.root.handlers:
         logging.root.removeHandler(handler)
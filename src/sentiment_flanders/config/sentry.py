@@ -1,27 +1,33 @@
 """Sentry.io configuration."""
 
-import ast
 import inspect
+import sys
+from functools import lru_cache
 from types import ModuleType
 from typing import Any, Callable, Dict, List, Optional
 
 import sentry_sdk
 import wrapt
-from sentry_sdk.integrations import aws_lambda
 
-from . import config
+from .config import __version__, get_workspace
 
-# https://docs.sentry.io/error-reporting/configuration/?platform=python#common-options
-sentry_client = sentry_sdk.Hub(
-    sentry_sdk.Client(
-        dsn="https://a82596eaa56c4ddeb8a4f89079a38730@o348638.ingest.sentry.io/5469393",
-        release=f"sentiment_flanders@{config.__version__}",
-        environment=config.get_workspace(),
-        traces_sample_rate=1.0,
-        # https://github.com/getsentry/sentry-python/issues/227
-        integrations=[aws_lambda.AwsLambdaIntegration()],
+
+@lru_cache(maxsize=None)
+def get_sentry_client() -> sentry_sdk.Hub:
+    """Create the Sentry hub on first use, rather than when the package is imported."""
+    from sentry_sdk.integrations import aws_lambda
+
+    # https://docs.sentry.io/error-reporting/configuration/?platform=python#common-options
+    return sentry_sdk.Hub(
+        sentry_sdk.Client(
+            dsn="https://a82596eaa56c4ddeb8a4f89079a38730@o348638.ingest.sentry.io/5469393",
+            release=f"sentiment_flanders@{__version__}",
+            environment=get_workspace(),
+            traces_sample_rate=1.0,
+            # https://github.com/getsentry/sentry-python/issues/227
+            integrations=[aws_lambda.AwsLambdaIntegration()],
+        )
     )
-)
 
 
 @wrapt.decorator
@@ -29,7 +35,7 @@ def log_function_with_sentry(
     wrapped: Callable[..., Any], instance: Any, args: List[Any], kwargs: Dict[str, Any]
 ) -> Any:
     """Attaches Sentry integrations to a function."""
-    with sentry_client:
+    with get_sentry_client():
         try:
             return wrapped(*args, **kwargs)
         except Exception as e:
@@ -42,7 +48,7 @@ async def log_function_with_sentry_async(
     wrapped: Callable[..., Any], instance: Any, args: List[Any], kwargs: Dict[str, Any]
 ) -> Any:
     """Attaches Sentry integrations to a function."""
-    with sentry_client:
+    with get_sentry_client():
         try:
             return await wrapped(*args, **kwargs)
         except Exception as e:
@@ -51,15 +57,17 @@ async def log_function_with_sentry_async(
 
 
 def log_module_with_sentry(module: Optional[ModuleType] = None) -> None:
-    """Attaches Sentry integrations to a module."""
-    module = module or inspect.getmodule(inspect.stack()[1][0])
-    for node in ast.parse(inspect.getsource(module)).body:  # type: ignore
-        if isinstance(node, ast.ClassDef):
-            cls = getattr(module, node.name)
-            for key, value in cls.__dict__.items():
-                if callable(value) or isinstance(value, (classmethod, staticmethod)):
-                    setattr(cls, key, log_function_with_sentry(value))
-        elif isinstance(node, ast.FunctionDef):
-            setattr(module, node.name, log_function_with_sentry(getattr(module, node.name)))
-        elif isinstance(node, ast.AsyncFunctionDef):
-            setattr(module, node.name, log_function_with_sentry_async(getattr(module, node.name)))
+    """Attaches Sentry integrations to the classes and functions defined in a module."""
+    module = module or sys.modules[sys._getframe(1).f_globals["__name__"]]
+    for name, value in list(vars(module).items()):
+        # Only the classes and functions defined at the top level of the module itself, not the imported ones
+        if getattr(value, "__module__", None) != module.__name__ or getattr(value, "__qualname__", None) != name:
+            continue
+        if inspect.isclass(value):
+            for key, attribute in list(value.__dict__.items()):
+                if callable(attribute) or isinstance(attribute, (classmethod, staticmethod)):
+                    setattr(value, key, log_function_with_sentry(attribute))
+        elif inspect.iscoroutinefunction(value):
+            setattr(module, name, log_function_with_sentry_async(value))
+        elif inspect.isfunction(value):
+            setattr(module, name, log_function_with_sentry(value))
@@ -0,0 +1,45 @@
+"""DynamoDB requests shared by the API and the batch."""
+import random
+from time import sleep
+from typing import Any, Dict, List
+
+from boto3.dynamodb.types import TypeDeserializer
+
+# Hyper-parameters
+BATCH_GET_SIZE = 100  # Maximum number of keys in a single BatchGetItem request
+BATCH_GET_BACKOFF = .05  # Initial backoff in seconds, doubled on every retry
+
+_deserializer = TypeDeserializer()
+
+
+def batch_get(
+        client: Any,
+        table: str,
+        keys: List[Dict[str, Any]],
+        retries: int,
+        **request: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Get the items of the given keys, using BatchGetItem requests of 100 keys that retry the keys left unprocessed.
+
+    :param client: Low-level DynamoDB client
+    :param table: Name of the table
+    :param keys: Serialised keys of the items, without duplicates
+    :param retries: Number of retries of the keys left unprocessed (throttled) by a BatchGetItem request
+    :param request: Other parameters of every request, e.g. a ProjectionExpression
+    :return: Deserialised item of every key that has one
+    :raise RuntimeError: If keys are still left unprocessed after the last retry
+    """
+    items = []
+    for i in range(0, len(keys), BATCH_GET_SIZE):
+        unprocessed = keys[i:i + BATCH_GET_SIZE]
+        attempt = 0
+        while unprocessed:
+            response = client.batch_get_item(RequestItems={table: {**request, "Keys": unprocessed}})
+            for item in response["Responses"].get(table, []):
+                items.append({k: _deserializer.deserialize(v) for k, v in item.items()})
+            unprocessed = response.get("UnprocessedKeys", {}).get(table, {}).get("Keys", [])
+            if unprocessed and attempt >= retries: raise RuntimeError(f"{len(unprocessed)} keys left unprocessed")
+            if unprocessed: sleep(BATCH_GET_BACKOFF * 2 ** attempt * random.uniform(1, 1.5))
+            attempt += 1
+    return items
@@ -0,0 +1,38 @@
+"""Granularities of the sentiment statistics, from hours up to years, shared by the API and the batch."""
+import re
+from datetime import datetime
+from typing import Callable, Dict, NamedTuple
+
+
+class Granularity(NamedTuple):
+    """Granularity of a statistic, identified by its name (e.g. daily)."""
+
+    name: str
+    pattern: str  # Regular expression matching the dates of the granularity
+    format: Callable[[datetime], str]  # Format the date of the period a timestamp falls in
+    incremental: bool  # Updated by adding the change of every day, rather than written as a whole by every run
+    date_format: str  # Human-readable format of the dates, e.g. YYYY-MM-DD
+
+    @property
+    def statistic_id(self) -> str:
+        """Get the statistic ID of the granularity in DynamoDB."""
+        return f"sentiment_impressions_{self.name}"
+
+
+GRANULARITIES = (
+    Granularity("hourly", r"^\d{4}-\d{2}-\d{2}:\d{2}$", lambda t: t.strftime("%Y-%m-%d:%H"), False, "YYYY-MM-DD:HH"),
+    Granularity("daily", r"^\d{4}-\d{2}-\d{2}$", lambda t: t.strftime("%Y-%m-%d"), False, "YYYY-MM-DD"),
+    Granularity("weekly", r"^\d{4}-W\d{2}$", lambda t: "%04d-W%02d" % t.isocalendar()[:2], True, "YYYY-Www"),
+    Granularity("monthly", r"^\d{4}-\d{2}$", lambda t: t.strftime("%Y-%m"), True, "YYYY-MM"),
+    Granularity("yearly", r"^\d{4}$", lambda t: t.strftime("%Y"), True, "YYYY"),
+)
+BY_NAME: Dict[str, Granularity] = {g.name: g for g in GRANULARITIES}
+STORED = tuple(g for g in GRANULARITIES if not g.incremental)
+INCREMENTAL = tuple(g for g in GRANULARITIES if g.incremental)
+
+
+def get_granularity(date: str) -> Granularity:
+    """Get the granularity of the given date."""
+    for granularity in GRANULARITIES:
+        if re.match(granularity.pattern, date): return granularity
+    raise FileNotFoundError("Invalid date(must be either YYYY-MM-DD:HH, YYYY-MM-DD, YYYY-Www, YYYY-MM, or YYYY")
@@ -2,7 +2,7 @@
 
 from invoke import Collection
 
-from . import aws, conda, sentry, serverless, terraform
+from . import aws, benchmark, conda, sentry, serverless, terraform
 from .logging import configure_root_logger
 from .main import bump, docs, lab, lint, serve, test
 
@@ -16,6 +16,7 @@ ns.add_task(lint)
 ns.add_task(serve)
 ns.add_task(test)
 ns.add_collection(aws)
+ns.add_collection(benchmark)
 ns.add_collection(conda)
 ns.add_collection(sentry)
 ns.add_collection(terraform)
@@ -0,0 +1,49 @@
+"""Benchmark tasks."""
+
+import logging
+
+from invoke import task
+
+logger = logging.getLogger(__name__)
+
+
+@task
+def normalise(c, n=20_000, repeat=3, min_speedup=5.0):
+    """Benchmark the text normalisation of tweets against the original implementation."""
+    logger.info("Benchmarking text normalisation...")
+    c.run(
+        "env PYTHONPATH=src:.:$PYTHONPATH python -m tests.benchmarks.normalise "
+        f"--n {n} --repeat {repeat} --min-speedup {min_speedup}"
+    )
+
+
+@task
+def batch(c, volumes="1000 10000 100000", seconds_per_text=0.0, sequential=False, min_throughput=0.0):
+    """Benchmark the nightly batch job end-to-end, offline, against fake Twitter, S3, DynamoDB and model."""
+    logger.info("Benchmarking the batch job...")
+    c.run(
+        "env PYTHONPATH=src:.:$PYTHONPATH python -m tests.benchmarks.batch "
+        f"--volumes {volumes} --seconds-per-text {seconds_per_text} --min-throughput {min_throughput}"
+        + (" --sequential" if sequential else "")
+    )
+
+
+@task
+def api(c, concurrencies="1 8 32", requests=256, latency=0.02, blocking=False, max_p99=0.0):
+    """Benchmark the latency of the API under concurrent requests, offline, against a fake DynamoDB table."""
+    logger.info("Benchmarking the API...")
+    c.run(
+        "env PYTHONPATH=src:.:$PYTHONPATH python -m tests.benchmarks.api "
+        f"--concurrencies {concurrencies} --requests {requests} --latency {latency} --max-p99 {max_p99}"
+        + (" --blocking" if blocking else "")
+    )
+
+
+@task
+def importtime(c, module="sentiment_flanders.api", repeat=5, top=15, max_ms=0.0):
+    """Profile the import time (-X importtime) of the API, with and without the cold start budget."""
+    logger.info("Profiling the import time...")
+    c.run(
+        "env PYTHONPATH=src:.:$PYTHONPATH python -m tests.benchmarks.importtime "
+        f"--module {module} --repeat {repeat} --top {top} --max-ms {max_ms}"
+    )
@@ -0,0 +1 @@
+"""Sentiment Flanders benchmark suite."""
@@ -0,0 +1,109 @@
+"""Benchmark the latency of the API under concurrent requests, offline, against a fake DynamoDB table."""
+
+import argparse
+import asyncio
+import contextlib
+import time
+from typing import Any, Dict, List
+from unittest import mock
+
+from sentiment_flanders.api import app
+from sentiment_flanders.api.routers import impressions_daily
+from sentiment_flanders.api.utils import cache, dynamodb_get
+from tests.benchmarks.aws import FakeTable
+
+PATH = "/api/v1/impressions/daily/period/"
+
+
+async def request(path: str, query: str, arrival: float) -> float:
+    """Send a single GET request to the ASGI app, return its latency in seconds since its arrival."""
+    scope = {
+        "type":         "http",
+        "http_version": "1.1",
+        "method":       "GET",
+        "scheme":       "http",
+        "path":         path,
+        "root_path":    "",
+        "query_string": query.encode(),
+        "headers":      [(b"host", b"benchmark")],
+        "client":       ("127.0.0.1", 0),
+        "server":       ("benchmark", 80),
+    }
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, f"Request failed with status {message['status']}"
+
+    await app(scope, receive, send)
+    return time.perf_counter() - arrival
+
+
+async def load(concurrency: int, requests: int) -> List[float]:
+    """Send the requests in waves of simultaneously arriving requests, every request queries a different period."""
+    latencies: List[float] = []
+    for wave in range(0, requests, concurrency):
+        arrival = time.perf_counter()
+        latencies += await asyncio.gather(*(
+            request(PATH, f"start=2020-01-01&end=2020-02-{i % 28 + 1:02d}&i={i}", arrival)
+            for i in range(wave, min(wave + concurrency, requests))
+        ))
+    return latencies
+
+
+def percentile(latencies: List[float], p: float) -> float:
+    """Get the p-th percentile of the latencies."""
+    ordered = sorted(latencies)
+    return ordered[min(int(p / 100 * len(ordered)), len(ordered) - 1)]
+
+
+def run(concurrency: int, requests: int, latency: float, blocking: bool = False) -> Dict[str, float]:
+    """
+    Send the requests to the API, of which every DynamoDB query takes the given latency, without any network access.
+
+    :param concurrency: Number of simultaneously arriving requests
+    :param requests: Total number of requests
+    :param latency: Number of seconds every DynamoDB query takes
+    :param blocking: Run the queries on the event loop, as before they were run in the query thread pool
+    :return: Throughput, p50 and p99 latency in seconds, and the maximum number of queries in flight at once
+    """
+    table = FakeTable(latency=latency)
+
+    async def inline(function: Any, *args: Any, **kwargs: Any) -> Any:
+        return function(*args, **kwargs)
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.object(dynamodb_get, "get_table", lambda: table))
+        stack.enter_context(mock.patch.object(cache, "query_cache", cache.TTLCache(maxsize=0)))  # Always query
+        if blocking: stack.enter_context(mock.patch.object(impressions_daily, "run_query", inline))
+        start = time.perf_counter()
+        latencies = asyncio.run(load(concurrency, requests))
+        wall = time.perf_counter() - start
+    return {
+        "requests_per_second": requests / wall,
+        "p50_seconds":         percentile(latencies, 50),
+        "p99_seconds":         percentile(latencies, 99),
+        "max_in_flight":       table.max_in_flight,
+    }
+
+
+def main(concurrencies: List[int], requests: int, latency: float, blocking: bool, max_p99: float) -> None:
+    """Run the benchmark for every concurrency, fail if the p99 latency exceeds the maximum."""
+    for concurrency in concurrencies:
+        result = run(concurrency, requests, latency, blocking=blocking)
+        print(f"{concurrency:>4} simultaneous: {result['requests_per_second']:8.1f} requests/s, "
+              f"p50 {result['p50_seconds'] * 1000:8.1f}ms, p99 {result['p99_seconds'] * 1000:8.1f}ms")
+        if max_p99: assert result["p99_seconds"] <= max_p99, f"p99 latency exceeds {max_p99}s"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrencies", type=int, nargs="+", default=[1, 8, 32], help="simultaneous requests")
+    parser.add_argument("--requests", type=int, default=256, help="number of requests for every concurrency")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds every DynamoDB query takes")
+    parser.add_argument("--blocking", action="store_true", help="run the queries on the event loop")
+    parser.add_argument("--max-p99", type=float, default=0.0, help="maximal p99 latency in seconds")
+    args = parser.parse_args()
+    main(args.concurrencies, args.requests, args.latency, blocking=args.blocking, max_p99=args.max_p99)
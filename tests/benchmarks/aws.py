@@ -0,0 +1,427 @@
+"""In-process stand-ins for S3 and DynamoDB."""
+
+import hashlib
+import io
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+from sentiment_flanders.batch.dynamodb import TABLE
+
+_deserializer = TypeDeserializer()
+_serializer = TypeSerializer()
+
+
+class NoSuchKey(Exception):
+    """Raised when a missing S3 key is requested."""
+
+
+class FakeObject:
+    """S3 Object stored in memory."""
+
+    def __init__(self, store: Dict[str, bytes], key: str) -> None:
+        """Refer to the object with the given key in the store."""
+        self.store = store
+        self.key = key
+
+    @property
+    def content_length(self) -> int:
+        """Get the size of the object."""
+        return len(self.store[self.key])
+
+    @property
+    def e_tag(self) -> str:
+        """Get the checksum of the object."""
+        return f'"{hashlib.md5(self.store[self.key]).hexdigest()}"'
+
+    def put(self, Body: bytes) -> Dict[str, Any]:
+        """Store the object."""
+        self.store[self.key] = Body
+        return {"ETag": self.e_tag}
+
+    def get(self, Range: Optional[str] = None) -> Dict[str, Any]:
+        """Get the object, or only the given byte range of it."""
+        if self.key not in self.store: raise NoSuchKey(self.key)
+        data = self.store[self.key]
+        if Range:
+            start, end = Range[len("bytes="):].split("-")
+            data = data[int(start):int(end) + 1]
+        return {"Body": io.BytesIO(data)}
+
+    def delete(self) -> None:
+        """Delete the object."""
+        self.store.pop(self.key, None)
+
+
+class FakeObjects:
+    """Collection of the objects in a bucket."""
+
+    def __init__(self, store: Dict[str, bytes], prefix: str = "") -> None:
+        """Refer to all objects in the store of which the key starts with the prefix."""
+        self.store = store
+        self.prefix = prefix
+
+    def filter(self, Prefix: str) -> "FakeObjects":
+        """Get the objects of which the key starts with the given prefix."""
+        return FakeObjects(self.store, Prefix)
+
+    def all(self) -> "FakeObjects":
+        """Get all objects."""
+        return self
+
+    def __iter__(self) -> Iterator[FakeObject]:
+        """Iterate over the objects, sorted by key."""
+        return iter([FakeObject(self.store, key) for key in sorted(self.store) if key.startswith(self.prefix)])
+
+    def delete(self) -> None:
+        """Delete all objects."""
+        for obj in self: obj.delete()
+
+
+class FakeBucket:
+    """S3 Bucket stored in memory."""
+
+    meta = SimpleNamespace(client=SimpleNamespace(exceptions=SimpleNamespace(NoSuchKey=NoSuchKey)))
+
+    def __init__(self, store: Dict[str, bytes]) -> None:
+        """Refer to the store of the bucket."""
+        self.store = store
+        self.objects = FakeObjects(store)
+
+    def Object(self, key: str) -> FakeObject:  # noqa: N802
+        """Refer to the object with the given key."""
+        return FakeObject(self.store, key)
+
+
+class FakeS3:
+    """S3 resource of which all buckets are stored in memory."""
+
+    def __init__(self) -> None:
+        """Create the (empty) buckets."""
+        self.buckets: Dict[str, Dict[str, bytes]] = {}
+
+    def Bucket(self, name: str) -> FakeBucket:  # noqa: N802
+        """Refer to the bucket with the given name."""
+        return FakeBucket(self.buckets.setdefault(name, {}))
+
+    def Object(self, bucket: str, key: str) -> FakeObject:  # noqa: N802
+        """Refer to the object with the given key in the given bucket."""
+        return self.Bucket(bucket).Object(key)
+
+
+class FakeBoto3:
+    """Replaces the boto3 module, only supporting the S3 resource."""
+
+    def __init__(self, s3: FakeS3) -> None:
+        """Use the given S3 resource."""
+        self.s3 = s3
+
+    def resource(self, name: str, **kwargs: Any) -> FakeS3:
+        """Get the S3 resource."""
+        assert name == "s3", f"Unsupported resource {name}"
+        return self.s3
+
+
+class FakeBatchWriter:
+    """Batch writer of a fake table, putting every item at once."""
+
+    def __init__(self, table: "FakeTable") -> None:
+        """Write to the given table."""
+        self.table = table
+
+    def __enter__(self) -> "FakeBatchWriter":
+        """Start writing."""
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Stop writing."""
+
+    def put_item(self, Item: Dict[str, Any]) -> None:
+        """Put the item in the table."""
+        self.table.put_item(Item=Item)
+
+
+def evaluate(condition: Any, item: Dict[str, Any]) -> bool:
+    """Evaluate a (boto3) key condition of equalities, ranges and conjunctions on the item."""
+    expression = condition.get_expression()
+    operator, values = expression["operator"], expression["values"]
+    if operator == "AND": return all(evaluate(value, item) for value in values)
+    value = item.get(values[0].name)
+    if operator == "=": return value == values[1]
+    if operator == ">=": return value >= values[1]
+    if operator == "BETWEEN": return values[1] <= value <= values[2]
+    if operator == "begins_with": return value.startswith(values[1])
+    raise NotImplementedError(f"Unsupported operator {operator}")
+
+
+def resolve(item: Optional[Dict[str, Any]], path: str, names: Dict[str, str]) -> Any:
+    """Get the value of the (nested) attribute at the path, e.g. applied.#d, None if it does not exist."""
+    value: Any = item
+    for part in path.split("."):
+        if not isinstance(value, dict): return None
+        value = value.get(names.get(part, part))
+    return value
+
+
+class FakeTable:
+    """DynamoDB table stored in memory, counting the number of requests."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        """
+        Create an empty table.
+
+        :param latency: Number of seconds every request takes
+        """
+        self.items: Dict[Any, Dict[str, Any]] = {}
+        self.latency = latency
+        self.requests = 0
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def request(self) -> None:
+        """Count (and delay) a request, keeping track of the maximum number of requests in flight at once."""
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency: time.sleep(self.latency)
+        finally:
+            with self.lock: self.in_flight -= 1
+
+    def put_item(self, Item: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        """Put the item in the table, replacing the item with the same key."""
+        self.request()
+        self.items[Item["statistic_id"], Item["date"]] = Item
+        return {"ConsumedCapacity": {"TableName": TABLE, "CapacityUnits": 1.0}}
+
+    def batch_writer(self) -> FakeBatchWriter:
+        """Get a batch writer."""
+        return FakeBatchWriter(self)
+
+    def query(
+            self,
+            KeyConditionExpression: Any,
+            Limit: Optional[int] = None,
+            ExclusiveStartKey: Optional[Dict[str, Any]] = None,
+            ProjectionExpression: Optional[str] = None,
+            ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+            **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """
+        Query a page of the items matching the key condition, sorted by date, starting after the given key.
+
+        Only the attributes of the projection expression are returned, if given.
+        """
+        self.request()
+        items = [item for _, item in sorted(self.items.items()) if evaluate(KeyConditionExpression, item)]
+        if ExclusiveStartKey: items = [item for item in items if item["date"] > ExclusiveStartKey["date"]]
+        page = items[:Limit]
+        if ProjectionExpression:
+            names = ExpressionAttributeNames or {}
+            attributes = [names.get(name.strip(), name.strip()) for name in ProjectionExpression.split(",")]
+            page = [{a: item[a] for a in attributes if a in item} for item in page]
+        response = {"Items": page, "Count": len(page)}
+        if Limit and len(items) > Limit:
+            last = items[Limit - 1]
+            response["LastEvaluatedKey"] = {"statistic_id": last["statistic_id"], "date": last["date"]}
+        return response
+
+
+class FakeClient:
+    """Low-level DynamoDB client of a fake table, which may leave batched items unprocessed like a throttled table."""
+
+    def __init__(self, table: FakeTable, unprocessed: float = 0.0, attempts: int = 1) -> None:
+        """
+        Create the client.
+
+        The keys left unprocessed are selected by a hash of the key, such that the outcome does not depend on the
+        order in which concurrent requests arrive.
+
+        :param table: Table to write to
+        :param unprocessed: Fraction of the keys that is left unprocessed by their first requests
+        :param attempts: Number of requests by which a selected key is left unprocessed, after which it is processed
+        """
+        self.table = table
+        self.unprocessed = unprocessed
+        self.attempts = attempts
+        self.throttled: "Counter[Tuple[str, str]]" = Counter()
+        self.batch_sizes: List[int] = []
+        self.lock = threading.Lock()
+
+    def throttle(self, key: Dict[str, Any]) -> bool:
+        """Check if the (serialised) key is left unprocessed by the current request."""
+        statistic_id, date = key["statistic_id"]["S"], key["date"]["S"]
+        if zlib.crc32(f"{statistic_id}|{date}".encode("utf-8")) % 1000 >= self.unprocessed * 1000: return False
+        with self.lock:
+            self.throttled[statistic_id, date] += 1
+            return self.throttled[statistic_id, date] <= self.attempts
+
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict[str, Any]]], **kwargs: Any) -> Dict[str, Any]:
+        """Put the items of the requests in the table, except the ones that are left unprocessed."""
+        self.table.request()
+        self.batch_sizes.append(len(RequestItems[TABLE]))
+        unprocessed = []
+        for request in RequestItems[TABLE]:
+            if self.throttle(request["PutRequest"]["Item"]):
+                unprocessed.append(request)
+                continue
+            item = {k: _deserializer.deserialize(v) for k, v in request["PutRequest"]["Item"].items()}
+            self.table.items[item["statistic_id"], item["date"]] = item
+        processed = len(RequestItems[TABLE]) - len(unprocessed)
+        return {
+            "UnprocessedItems": {TABLE: unprocessed} if unprocessed else {},
+            "ConsumedCapacity": [{"TableName": TABLE, "CapacityUnits": float(processed)}],
+        }
+
+    def batch_get_item(self, RequestItems: Dict[str, Dict[str, Any]], **kwargs: Any) -> Dict[str, Any]:
+        """Get the items with the requested keys that exist, except the keys that are left unprocessed."""
+        self.table.request()
+        keys, unprocessed = [], []
+        for key in RequestItems[TABLE]["Keys"]:
+            if self.throttle(key): unprocessed.append(key)
+            else: keys.append((key["statistic_id"]["S"], key["date"]["S"]))
+        items = [self.table.items[key] for key in keys if key in self.table.items]
+        return {
+            "Responses":       {TABLE: [{k: _serializer.serialize(v) for k, v in item.items()} for item in items]},
+            "UnprocessedKeys": {TABLE: {"Keys": unprocessed}} if unprocessed else {},
+        }
+
+    def holds(
+            self,
+            condition: str,
+            item: Optional[Dict[str, Any]],
+            names: Dict[str, str],
+            values: Dict[str, Any],
+    ) -> bool:
+        """Check a conjunction of functions and comparisons holds for the item."""
+        for clause in condition.split(" AND "):
+            negate = clause.startswith("NOT ")
+            clause = clause[4 if negate else 0:]
+            if " <> " in clause:
+                path, value = clause.split(" <> ")
+                holds = resolve(item, path, names) != values[value]
+            elif " = " in clause:
+                path, value = clause.split(" = ")
+                holds = resolve(item, path, names) == values[value]
+            else:
+                function, arguments = clause.rstrip(")").split("(")
+                path, *value = arguments.split(", ")
+                attribute = resolve(item, path, names)
+                if function == "attribute_exists": holds = attribute is not None
+                elif function == "attribute_not_exists": holds = attribute is None
+                else: raise NotImplementedError(f"Unsupported function {function}")
+            if holds == negate: return False
+        return True
+
+    def put_item(
+            self,
+            Item: Dict[str, Any],
+            ConditionExpression: str = "",
+            ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+            ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+            **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Put the item in the table, if the condition holds."""
+        self.table.request()
+        with self.lock:
+            self.check(ConditionExpression, Item, ExpressionAttributeNames, ExpressionAttributeValues)
+            self.put(Item)
+        return {"ConsumedCapacity": {"TableName": TABLE, "CapacityUnits": 1.0}}
+
+    def update_item(
+            self,
+            Key: Dict[str, Any],
+            UpdateExpression: str,
+            ConditionExpression: str = "",
+            ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+            ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+            **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Add the values to or set the values of the (nested) attributes of the item, if the condition holds."""
+        self.table.request()
+        with self.lock:
+            self.check(ConditionExpression, Key, ExpressionAttributeNames, ExpressionAttributeValues)
+            self.update(Key, UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+        return {}
+
+    def transact_write_items(self, TransactItems: List[Dict[str, Dict[str, Any]]], **kwargs: Any) -> Dict[str, Any]:
+        """Put or update all items at once if all conditions hold, else cancel the transaction as a whole."""
+        self.table.request()
+        with self.lock:
+            reasons = []
+            for action in TransactItems:
+                request = action.get("Put") or action["Update"]
+                try:
+                    self.check(
+                            request.get("ConditionExpression", ""),
+                            request.get("Item") or request["Key"],
+                            request.get("ExpressionAttributeNames"),
+                            request.get("ExpressionAttributeValues"),
+                    )
+                    reasons.append({"Code": "None"})
+                except ClientError:
+                    reasons.append({"Code": "ConditionalCheckFailed"})
+            if any(reason["Code"] != "None" for reason in reasons):
+                error = {"Error": {"Code": "TransactionCanceledException"}, "CancellationReasons": reasons}
+                raise ClientError(error, "TransactWriteItems")  # type: ignore
+            for action in TransactItems:
+                if "Put" in action: self.put(action["Put"]["Item"])
+                else: self.update(**{k: v for k, v in action["Update"].items() if k != "ConditionExpression"})
+        return {}
+
+    def check(
+            self,
+            condition: str,
+            key: Dict[str, Any],
+            names: Optional[Dict[str, str]],
+            values: Optional[Dict[str, Any]],
+    ) -> None:
+        """Check the condition (a disjunction of conjunctions of the clauses used by the batch job) holds."""
+        if not condition: return
+        stored = self.table.items.get((key["statistic_id"]["S"], key["date"]["S"]))
+        values = {k: _deserializer.deserialize(v) for k, v in (values or {}).items()}
+        if not any(self.holds(clause, stored, names or {}, values) for clause in condition.split(" OR ")):
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "ConditionCheck")
+
+    def put(self, item: Dict[str, Any]) -> None:
+        """Put the (serialised) item in the table."""
+        item = {k: _deserializer.deserialize(v) for k, v in item.items()}
+        self.table.items[item["statistic_id"], item["date"]] = item
+
+    def update(
+            self,
+            Key: Dict[str, Any],
+            UpdateExpression: str,
+            ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+            ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+            **kwargs: Any,
+    ) -> None:
+        """Add the values to or set the values of the (nested) attributes of the item with the (serialised) key."""
+        names = ExpressionAttributeNames or {}
+        values = {k: _deserializer.deserialize(v) for k, v in (ExpressionAttributeValues or {}).items()}
+        key = (Key["statistic_id"]["S"], Key["date"]["S"])
+        item = self.table.items.setdefault(key, {"statistic_id": key[0], "date": key[1]})
+        for keyword, actions in re.findall(r"(ADD|SET) (.+?)(?= ADD | SET |$)", UpdateExpression):
+            for action in actions.split(", "):
+                path, value = action.split(" = " if keyword == "SET" else " ")
+                *parents, attribute = [names.get(p, p) for p in path.split(".")]
+                target = item
+                for parent in parents:
+                    if not isinstance(target.get(parent), dict):
+                        raise ClientError(
+                                {"Error": {"Code": "ValidationException", "Message": "Invalid document path"}},
+                                "UpdateItem",
+                        )
+                    target = target[parent]
+                value = values[value]
+                if keyword == "SET": target[attribute] = value
+                elif isinstance(value, set): target[attribute] = target.get(attribute, set()) | value
+                else: target[attribute] = target.get(attribute, 0) + value
@@ -0,0 +1,96 @@
+"""Benchmark the nightly batch job end-to-end, offline, against fake Twitter, S3, DynamoDB and model."""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+from sentiment_flanders.batch import dynamodb
+from sentiment_flanders.batch import main as batch_main
+from sentiment_flanders.batch import rollup, twitter_api
+from sentiment_flanders.batch.checkpoint import Checkpoint
+from sentiment_flanders.batch.metrics import Metrics
+from sentiment_flanders.batch.prediction_cache import PredictionCache
+from tests.benchmarks.aws import FakeBoto3, FakeClient, FakeS3, FakeTable
+from tests.benchmarks.fakes import FakeTwitter, StubBackend
+
+
+def run(
+        n: int,
+        seconds_per_text: float = 0.0,
+        overlap: bool = True,
+        twitter: Optional[FakeTwitter] = None,
+        latency: float = 0.0,
+        unprocessed: float = 0.0,
+        verbose: bool = False,
+) -> Dict[str, Any]:
+    """
+    Run `fetch_and_process` once on n fake tweets, without any network access.
+
+    :param n: Number of tweets created on the fetched day
+    :param seconds_per_text: Number of seconds the stub model takes to predict a single text
+    :param overlap: Overlap inference with fetching, see `fetch_and_process`
+    :param twitter: Fake Twitter API to fetch from, created if not provided
+    :param latency: Number of seconds every DynamoDB request takes
+    :param unprocessed: Fraction of the items DynamoDB leaves unprocessed on their first attempt (throttling)
+    :param verbose: Show the output of the job
+    :return: Wall time of the complete run, metrics of every stage, and the fake S3 and DynamoDB table written to
+    """
+    twitter = twitter or FakeTwitter(n, day=datetime.today() - timedelta(days=twitter_api.DAY_DELAY))
+    s3, table = FakeS3(), FakeTable(latency=latency)
+    client = FakeClient(table, unprocessed=unprocessed)
+    metrics = Metrics("fetch_and_process", path=None)
+    with tempfile.TemporaryDirectory() as directory, contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.dict(os.environ, {"MODEL_ID": "stub"}))
+        stack.enter_context(mock.patch.object(twitter_api, "fetch", twitter.fetch))
+        stack.enter_context(mock.patch.object(dynamodb, "get_table", lambda: table))
+        stack.enter_context(mock.patch.object(dynamodb, "get_client", lambda: client))
+        stack.enter_context(mock.patch.object(rollup, "get_client", lambda: client))
+        stack.enter_context(mock.patch.object(batch_main, "boto3", FakeBoto3(s3)))
+        stack.enter_context(mock.patch.object(batch_main, "get_backend", lambda: StubBackend(seconds_per_text)))
+        stack.enter_context(mock.patch.object(batch_main, "Checkpoint", partial(Checkpoint, root=directory)))
+        stack.enter_context(mock.patch.object(
+                batch_main, "PredictionCache", partial(PredictionCache, path=Path(directory) / "predictions.sqlite"),
+        ))
+        stack.enter_context(mock.patch.object(batch_main, "Metrics", lambda job: metrics))
+        if not verbose: stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        start = time.perf_counter()
+        batch_main.fetch_and_process(load_local_credentials=False, overlap=overlap)
+        wall = time.perf_counter() - start
+    return {"wall_seconds": wall, "stages": metrics.stages, "s3": s3, "table": table}
+
+
+def report(n: int, result: Dict[str, Any]) -> None:
+    """Print the end-to-end and per-stage throughput of a single run."""
+    print(f"{n:>9,} tweets: {result['wall_seconds']:8.2f}s end-to-end ({n / result['wall_seconds']:>9,.0f} tweets/s)")
+    for stage in result["stages"]:
+        throughput = f"{stage['items_per_second']:>12,.0f} items/s" if "items_per_second" in stage else ""
+        print(f"  {stage['stage']:<18} {stage['wall_seconds']:8.2f}s wall {stage['cpu_seconds']:8.2f}s cpu "
+              f"{stage.get('items', ''):>8} items {throughput}")
+
+
+def main(volumes: List[int], seconds_per_text: float, overlap: bool, min_throughput: float) -> None:
+    """Run the benchmark for every volume, fail if the end-to-end throughput drops below the minimum."""
+    for n in volumes:
+        twitter = FakeTwitter(n, day=datetime.today() - timedelta(days=twitter_api.DAY_DELAY))
+        result = run(n, seconds_per_text=seconds_per_text, overlap=overlap, twitter=twitter)
+        report(n, result)
+        throughput = n / result["wall_seconds"]
+        assert throughput >= min_throughput, f"Throughput {throughput:,.0f} tweets/s is below {min_throughput:,.0f}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--volumes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="numbers of tweets")
+    parser.add_argument("--seconds-per-text", type=float, default=0.0, help="latency of the stub model per text")
+    parser.add_argument("--sequential", action="store_true", help="do not overlap inference with fetching")
+    parser.add_argument("--min-throughput", type=float, default=0.0, help="minimal end-to-end tweets/s")
+    args = parser.parse_args()
+    main(args.volumes, args.seconds_per_text, overlap=not args.sequential, min_throughput=args.min_throughput)
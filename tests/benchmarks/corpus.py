@@ -0,0 +1,42 @@
+"""Synthetic corpus of Dutch tweets."""
+
+import random
+from typing import List
+
+from emoji import unicode_codes
+
+WORDS = (
+    "de het een en van ik je dat is niet op te zijn met voor wat er maar ook als bij nog aan om dan zo "
+    "vandaag morgen gisteren goed slecht mooi weer regen zon Vlaanderen Antwerpen Gent Brussel Leuven "
+    "corona maatregelen lockdown vaccin regering minister premier verkiezingen stemmen partij "
+    "voetbal Rode Duivels wedstrijd gewonnen verloren fantastisch schandalig eindelijk weekend koffie"
+).split()
+SYMBOLS = ["“", "”", "‘", "’", "•", "›", "‹", "&gt", "&lt", "--", "---", "-", "️", "...", "!", "?", ","]
+EMOJIS = sorted(unicode_codes.EMOJI_UNICODE.values())
+
+
+def create_token(rng: random.Random) -> str:
+    """Create a single random token of a tweet."""
+    kind = rng.random()
+    if kind < 0.70: return rng.choice(WORDS)
+    if kind < 0.78: return rng.choice(EMOJIS) * rng.randint(1, 3)
+    if kind < 0.88: return rng.choice(SYMBOLS)
+    if kind < 0.92: return f"http{rng.choice(['', 's'])}://t.co/{rng.getrandbits(40):x}"
+    if kind < 0.96: return f"#{rng.choice(WORDS)}"
+    return f"@{rng.choice(WORDS)}{rng.randint(0, 99)}"
+
+
+def create_tweet(rng: random.Random) -> str:
+    """Create a single random tweet."""
+    tokens = [create_token(rng) for _ in range(rng.randint(3, 45))]
+    separators = [rng.choice([" ", " ", " ", "", "  ", "\n", "\t"]) for _ in tokens]
+    tweet = "".join(token + separator for token, separator in zip(tokens, separators))
+    if rng.random() < 0.1: tweet = "RT " + tweet
+    if rng.random() < 0.1: tweet = " " + tweet
+    return tweet
+
+
+def create_corpus(n: int, seed: int = 42) -> List[str]:
+    """Create a reproducible corpus of n synthetic Dutch tweets."""
+    rng = random.Random(seed)
+    return [create_tweet(rng) for _ in range(n)]
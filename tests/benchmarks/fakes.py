@@ -0,0 +1,86 @@
+"""In-process stand-ins for the Twitter API and the sentiment model."""
+
+import random
+import time
+import zlib
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Any, List
+
+import tweepy
+
+from sentiment_flanders.batch.backends import InferenceBackend
+from tests.benchmarks.corpus import WORDS, create_tweet
+
+TWITTER_FORMAT = "%a %b %d %H:%M:%S +0000 %Y"
+
+
+def create_status(rng: random.Random, id: int, created_at: datetime) -> Any:
+    """Create a random tweepy Status, as returned by the premium search API."""
+    text = create_tweet(rng)
+    return tweepy.models.Status.parse(None, {
+        "id":                    id,
+        "id_str":                str(id),
+        "created_at":            created_at.strftime(TWITTER_FORMAT),
+        "text":                  text,
+        "truncated":             False,
+        "is_quote_status":       False,
+        "lang":                  "nl",
+        "quote_count":           rng.randrange(5),
+        "reply_count":           rng.randrange(10),
+        "retweet_count":         rng.randrange(20),
+        "favorite_count":        rng.randrange(50),
+        "in_reply_to_status_id": None,
+        "entities":              {"hashtags": [{"text": word} for word in rng.sample(WORDS, rng.randrange(3))]},
+        "user":                  {
+            "id":              rng.randrange(10 ** 6),
+            "followers_count": rng.randrange(100_000),
+            "friends_count":   rng.randrange(1_000),
+            "verified":        rng.random() < 0.01,
+            "statuses_count":  rng.randrange(10_000),
+            "created_at":      datetime(2012, 1, 1).strftime(TWITTER_FORMAT),
+        },
+    })
+
+
+class FakeTwitter:
+    """Twitter API serving a fixed number of random tweets spread over a single day."""
+
+    def __init__(self, n: int, day: datetime, seed: int = 42) -> None:
+        """
+        Create the tweets of the day.
+
+        :param n: Number of tweets created during the day
+        :param day: Day the tweets are created on
+        :param seed: Seed of the random generator
+        """
+        rng = random.Random(seed)
+        start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+        times = sorted(start + timedelta(seconds=rng.randrange(86400)) for _ in range(n))
+        self.statuses = [create_status(rng, id=i, created_at=t) for i, t in enumerate(times)]
+        self.times = times
+        self.window_size = max(int(1.2 * n / 16), 1)  # Windows overlap, like the ending timestamps of the job do
+
+    def fetch(self, enddate: datetime, **kwargs: Any) -> List[Any]:
+        """Get the latest tweets created before the ending timestamp, like `twitter_api.fetch`."""
+        end = bisect_right(self.times, enddate)
+        return self.statuses[max(end - self.window_size, 0):end]
+
+
+class StubBackend(InferenceBackend):
+    """Inference backend predicting a fixed sentiment for every text, without loading any model."""
+
+    name = "stub"
+
+    def __init__(self, seconds_per_text: float = 0.0) -> None:
+        """
+        Initialise the stub.
+
+        :param seconds_per_text: Number of seconds predicting a single text takes, to emulate the model
+        """
+        self.seconds_per_text = seconds_per_text
+
+    def predict(self, texts: List[str]) -> List[str]:
+        """Predict the sentiment of every text, derived from its checksum."""
+        if self.seconds_per_text: time.sleep(self.seconds_per_text * len(texts))
+        return [("POSITIVE", "NEUTRAL", "NEGATIVE")[zlib.crc32(text.encode()) % 3] for text in texts]
@@ -0,0 +1,59 @@
+"""Profile the import time (a large part of a Lambda's cold start) of the API, with and without the cold start budget."""
+
+import argparse
+import os
+import statistics
+import subprocess  # noqa: S404
+import sys
+from typing import Dict, List, Tuple
+
+
+def profile(module: str, budget: bool) -> Tuple[float, List[Tuple[float, float, str]]]:
+    """
+    Import the module in a fresh interpreter with `-X importtime`.
+
+    :param module: Module to import
+    :param budget: Run in cold start budget mode
+    :return: Import time of the module in milliseconds, and the self and cumulative milliseconds of every import
+    """
+    env = {**os.environ, "COLD_START_BUDGET": "1" if budget else "0"}
+    process = subprocess.run(  # noqa: S603
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            env=env, stderr=subprocess.PIPE, universal_newlines=True, check=True,
+    )
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(own) / 1000, int(cumulative) / 1000, name.rstrip()))
+    total = next(cumulative for _, cumulative, name in imports if name.strip() == module)
+    return total, imports
+
+
+def run(module: str, repeat: int) -> Dict[bool, Tuple[float, List[Tuple[float, float, str]]]]:
+    """Get the median import time of both modes, and the imports of the run closest to the median."""
+    results = {}
+    for budget in (False, True):
+        runs = sorted((profile(module, budget) for _ in range(repeat)), key=lambda r: r[0])
+        results[budget] = (statistics.median(total for total, _ in runs), runs[len(runs) // 2][1])
+    return results
+
+
+def main(module: str, repeat: int, top: int, max_ms: float) -> None:
+    """Report the import time of both modes and the slowest imports, fail if the budget mode exceeds the maximum."""
+    results = run(module, repeat)
+    for budget, (total, imports) in results.items():
+        print(f"{'Cold start budget' if budget else 'Default'}: {total:8.1f}ms to import {module}")
+        for own, cumulative, name in sorted(imports, key=lambda i: -i[1])[:top]:
+            print(f"  {cumulative:8.1f}ms cumulative {own:8.1f}ms self  {name}")
+    if max_ms: assert results[True][0] <= max_ms, f"Import time {results[True][0]:.1f}ms exceeds {max_ms}ms"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="sentiment_flanders.api", help="module to import")
+    parser.add_argument("--repeat", type=int, default=5, help="number of fresh imports of every mode")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to show")
+    parser.add_argument("--max-ms", type=float, default=0.0, help="maximal import time in cold start budget mode")
+    args = parser.parse_args()
+    main(args.module, args.repeat, args.top, args.max_ms)
@@ -0,0 +1,57 @@
+"""Benchmark the text normalisation of tweets against the original implementation."""
+
+import argparse
+import re
+import time
+from typing import Callable, List
+
+import emoji
+
+from sentiment_flanders.batch.twitter_process import process
+from tests.benchmarks.corpus import create_corpus
+
+
+def process_reference(tweet: str) -> str:
+    """Process a tweet's text (body) as originally implemented, used as reference for correctness and speed."""
+    tweet = emoji.demojize(tweet)
+    tweet = re.sub(r"^RT", "", tweet)
+    tweet = re.sub(r"http(s|)://[^ ]+", "", tweet)
+    tweet = re.sub(r"[“”]", '"', tweet)
+    tweet = re.sub(r"[‘’]", "'", tweet)
+    tweet = re.sub(r"•", "-", tweet)
+    tweet = re.sub(r"(›|&gt)", ">", tweet)
+    tweet = re.sub(r"(‹|&lt)", "<", tweet)
+    tweet = re.sub(r"-[\-]+", "-", tweet)
+    tweet = tweet.strip()
+    tweet = " ".join(tweet.split())
+    return tweet
+
+
+def measure(function: Callable[[List[str]], List[str]], corpus: List[str], repeat: int) -> float:
+    """Measure the best throughput (tweets per second) of the given function over the corpus."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(corpus)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main(n: int, repeat: int, min_speedup: float) -> None:
+    """Run the benchmark, fail if the output differs from the reference or the speedup is below the minimum."""
+    corpus = create_corpus(n)
+    assert [process(t) for t in corpus] == [process_reference(t) for t in corpus], "Output differs from reference"
+    reference = measure(lambda c: [process_reference(t) for t in c], corpus, repeat)
+    single = measure(lambda c: [process(t) for t in c], corpus, repeat)
+    print(f"reference: {reference:>10,.0f} tweets/s")
+    print(f"process:   {single:>10,.0f} tweets/s ({single / reference:.1f}x)")
+    assert single / reference >= min_speedup, f"Speedup {single / reference:.1f}x is below {min_speedup:.1f}x"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=20_000, help="number of synthetic tweets")
+    parser.add_argument("--repeat", type=int, default=3, help="number of repetitions, the best is reported")
+    parser.add_argument("--min-speedup", type=float, default=5.0, help="minimal speedup over the reference")
+    args = parser.parse_args()
+    main(n=args.n, repeat=args.repeat, min_speedup=args.min_speedup)
@@ -0,0 +1,66 @@
+"""Test aggregation of predicted tweets."""
+
+import random
+from datetime import datetime, timedelta
+from math import log10
+from typing import Dict, List
+
+from sentiment_flanders.batch.aggregate import HourlyBuckets, bucket_by_hour, sum_statistics
+from sentiment_flanders.batch.tweet import Tweet
+
+
+def create_tweets(n: int) -> List[Tweet]:
+    """Create random processed tweets within a single day."""
+    rng = random.Random(42)
+    day = datetime(2020, 11, 14)
+    return [
+        Tweet(
+            id=i,
+            created_at=day + timedelta(seconds=rng.randrange(86400)),
+            text="",
+            favorite_count=rng.randrange(50),
+            reply_count=rng.randrange(10),
+            retweet_count=rng.randrange(20),
+            user_followers=rng.choice([0, rng.randrange(1, 100_000)]),
+        )
+        for i in range(n)
+    ]
+
+
+def test_bucket_by_hour() -> None:
+    """Test that the vectorised buckets equal the per-tweet computation."""
+    tweets = create_tweets(1000)
+    predictions = [random.Random(i).choice(["POSITIVE", "NEUTRAL", "NEGATIVE"]) for i in range(len(tweets))]
+    weights = {"adder_favorites": 0.1, "adder_replies": 0.05, "adder_retweets": 0.2, "followers_log": 0.5}
+
+    expected: Dict[datetime, Dict[str, int]] = {}
+    for tweet, pred in zip(tweets, predictions):
+        key = datetime.utcfromtimestamp(tweet.created_at).replace(minute=0, second=0)
+        points = 1 + weights["adder_favorites"] * tweet.favorite_count
+        points += weights["adder_replies"] * tweet.reply_count
+        points += weights["adder_retweets"] * tweet.retweet_count
+        if tweet.user_followers: points += weights["followers_log"] * log10(tweet.user_followers)
+        bucket = expected.setdefault(key, {"positive": 0, "neutral": 0, "negative": 0})
+        bucket[pred.lower()] += round(points)
+
+    buckets = bucket_by_hour(tweets, predictions, **weights)
+    assert buckets == expected
+    assert all(type(v) is int for statistic in buckets.values() for v in statistic.values())
+    assert sum_statistics(buckets.values()) == sum_statistics(expected.values())
+
+
+def test_bucket_by_hour_empty() -> None:
+    """Test that no buckets are created without tweets."""
+    assert bucket_by_hour([], [], 0.1, 0.05, 0.2, 0.0) == {}
+
+
+def test_hourly_buckets() -> None:
+    """Test that buckets updated chunk by chunk equal the buckets of all tweets at once."""
+    tweets = create_tweets(1000)
+    predictions = [random.Random(i).choice(["POSITIVE", "NEUTRAL", "NEGATIVE"]) for i in range(len(tweets))]
+    weights = {"adder_favorites": 0.1, "adder_replies": 0.05, "adder_retweets": 0.2, "followers_log": 0.5}
+    buckets = HourlyBuckets(**weights)
+    for start in range(0, len(tweets), 128):
+        buckets.add(tweets[start:start + 128], predictions[start:start + 128])
+    assert buckets.get() == bucket_by_hour(tweets, predictions, **weights)
+    assert list(buckets.get()) == sorted(buckets.get())
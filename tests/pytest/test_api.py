@@ -16,3 +16,10 @@ def test_config(client: TestClient) -> None:
     """Test that the API responds to a GET request."""
     response = client.get("/")
     assert response.status_code == 200
+
+
+def test_cache_stats(client: TestClient) -> None:
+    """Test that the hit rate of the query cache is exposed."""
+    response = client.get("/api/v1/cache/")
+    assert response.status_code == 200
+    assert "hit_rate" in response.json()
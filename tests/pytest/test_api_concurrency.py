@@ -0,0 +1,9 @@
+"""Test that concurrent API requests do not block each other on DynamoDB."""
+
+from tests.benchmarks.api import run
+
+
+def test_concurrent_queries() -> None:
+    """Test that the queries of simultaneous requests are in flight at the same time, the latency is benchmarked."""
+    assert run(concurrency=16, requests=32, latency=0.05)["max_in_flight"] > 16 // 2
+    assert run(concurrency=16, requests=16, latency=0.0, blocking=True)["max_in_flight"] == 1
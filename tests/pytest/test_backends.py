@@ -0,0 +1,74 @@
+"""Test the selection and comparison of the inference backends."""
+
+from types import SimpleNamespace
+from typing import Any, List
+
+import pytest
+
+pytest.importorskip("twitter_sentiment_classifier")
+
+from sentiment_flanders.batch import backends  # noqa: E402
+from sentiment_flanders.batch.backends import InferenceBackend  # noqa: E402
+
+
+class PositiveBackend(InferenceBackend):
+    """Backend predicting every text to be positive."""
+
+    name = "reference"
+
+    def predict(self, texts: List[str]) -> List[str]:
+        """Predict the sentiment of every text."""
+        return ["POSITIVE"] * len(texts)
+
+
+class AlternatingBackend(InferenceBackend):
+    """Backend predicting every other text to be positive."""
+
+    name = "alternating"
+
+    def predict(self, texts: List[str]) -> List[str]:
+        """Predict the sentiment of every text."""
+        return [("POSITIVE", "NEGATIVE")[i % 2] for i in range(len(texts))]
+
+
+@pytest.fixture(autouse=True)
+def fake_backends(monkeypatch: Any) -> None:
+    """Replace the backends by fakes that load no model."""
+    monkeypatch.setattr(backends, "BACKENDS", {b.name: b for b in (PositiveBackend, AlternatingBackend)})
+
+
+def test_inference_backend_abstract() -> None:
+    """Test that a backend must implement predict."""
+    with pytest.raises(TypeError):
+        InferenceBackend()  # type: ignore
+
+
+def test_get_backend() -> None:
+    """Test that backends are loaded by name, and that unknown names are rejected."""
+    assert isinstance(backends.get_backend("alternating"), AlternatingBackend)
+    assert backends.get_backend("reference")(["a", "b"]) == ["POSITIVE", "POSITIVE"]
+    with pytest.raises(ValueError):
+        backends.get_backend("unknown")
+
+
+def test_get_backend_model_id(monkeypatch: Any) -> None:
+    """Test that only the predictions of the reference backend are keyed by the plain model identifier."""
+    monkeypatch.setattr(backends, "get_model_id", lambda: "model")
+    assert backends.get_backend_model_id("reference") == "model"
+    assert backends.get_backend_model_id("int8") == "model+int8"
+
+
+def test_compare_backends() -> None:
+    """Test that every backend is compared against the reference, which is always included."""
+    results = backends.compare_backends(["tweet"] * 100, names=["alternating"])
+    assert list(results) == ["reference", "alternating"]
+    assert results["reference"]["agreement"] == 1.0 and results["alternating"]["agreement"] == 0.5
+    assert all(result["tweets_per_second"] > 0 for result in results.values())
+
+
+def test_quantized_backend_without_modules(monkeypatch: Any) -> None:
+    """Test that quantising a model without any torch module fails, rather than reporting an fp32 model as int8."""
+    pytest.importorskip("torch")
+    monkeypatch.setattr(backends, "SentimentModel", lambda: SimpleNamespace(labels=["POSITIVE"]))
+    with pytest.raises(AttributeError):
+        backends.QuantizedBackend()
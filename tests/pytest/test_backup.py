@@ -0,0 +1,40 @@
+"""Test the columnar backup format."""
+
+import pickle
+from calendar import timegm
+from datetime import datetime
+
+import pytest
+
+from sentiment_flanders.batch.backup import read_backup, read_columns, write_backup
+from sentiment_flanders.batch.tweet import Tweet
+
+PROCESSED = [
+    {"id": 1, "created_at": "2020-11-14 10:04:59", "text": "Goeiemorgen Vlaanderen! :sun:", "hashtags": ["zon"]},
+    {"id": 2, "created_at": "2020-11-14 23:59:00", "text": "Slaapwel", "hashtags": []},
+]
+
+
+def test_tweet() -> None:
+    """Test that a tweet record converts from and to the legacy dictionary format."""
+    tweet = Tweet.from_dict(PROCESSED[0])
+    assert tweet.created_at == timegm((2020, 11, 14, 10, 4, 59))
+    assert tweet.hashtags == ("zon",)
+    assert {k: v for k, v in tweet.to_dict().items() if k in PROCESSED[0]} == PROCESSED[0]
+    assert Tweet.from_dict(tweet.to_dict()) == tweet
+
+
+def test_roundtrip() -> None:
+    """Test that a backup contains all processed tweets, and that single columns can be read."""
+    tweets = [Tweet.from_dict(p) for p in PROCESSED]
+    backup = write_backup(tweets)
+    assert read_backup(backup) == tweets
+    assert read_columns(backup, columns=["text"]) == {"text": ["Goeiemorgen Vlaanderen! :sun:", "Slaapwel"]}
+    assert read_backup(write_backup([])) == []
+
+
+def test_legacy() -> None:
+    """Test that legacy pickle backups can be read, but only when they contain no globals."""
+    assert read_backup(pickle.dumps(PROCESSED)) == [Tweet.from_dict(p) for p in PROCESSED]
+    with pytest.raises(pickle.UnpicklingError):
+        read_backup(pickle.dumps([{"id": 1, "created_at": datetime(2020, 11, 14), "text": ""}]))
@@ -0,0 +1,26 @@
+"""Test the nightly batch job end-to-end, against fake Twitter, S3, DynamoDB and model."""
+
+import pytest
+
+pytest.importorskip("tweepy")
+pytest.importorskip("twitter_sentiment_classifier")
+
+from sentiment_flanders.batch.aggregate import sum_statistics  # noqa: E402
+from sentiment_flanders.batch.granularity import INCREMENTAL  # noqa: E402
+from tests.benchmarks.batch import run  # noqa: E402
+
+
+@pytest.mark.parametrize("overlap", [True, False])
+def test_fetch_and_process(overlap: bool) -> None:
+    """Test that a run backs up the tweets and writes consistent hourly and daily statistics."""
+    result = run(500, overlap=overlap)
+    items = result["table"].items
+    hourly = [item["statistic"] for (statistic_id, _), item in items.items() if statistic_id.endswith("hourly")]
+    daily = [item["statistic"] for (statistic_id, _), item in items.items() if statistic_id.endswith("daily")]
+    assert hourly and len(daily) == 1
+    assert sum_statistics(hourly) == daily[0]
+    incremental = {granularity.statistic_id for granularity in INCREMENTAL}
+    rollups = [item["statistic"] for (statistic_id, _), item in items.items() if statistic_id in incremental]
+    assert len(rollups) == 3 and all(sum_statistics([r]) == daily[0] for r in rollups)
+    assert any(key.startswith("backup/") for key in result["s3"].buckets["default-twittersentiment-data"])
+    assert [stage["stage"] for stage in result["stages"]][-1] == "manifest"
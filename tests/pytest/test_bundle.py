@@ -0,0 +1,88 @@
+"""Test the bundle of impressions of several granularities, requested at once."""
+
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from starlette.testclient import TestClient
+
+from sentiment_flanders import dynamodb
+from sentiment_flanders.api import app
+from sentiment_flanders.api.utils import cache, dynamodb_get
+from tests.benchmarks.aws import FakeClient, FakeTable
+
+BUNDLE = "/api/v1/impressions/bundle"
+
+
+@pytest.fixture
+def table(monkeypatch: Any) -> FakeTable:
+    """Replace DynamoDB by a fake table with 30 daily and 12 monthly statistics of 2020, bypassing the cache."""
+    table = FakeTable()
+    dates = [("daily", f"{datetime(2020, 1, 1) + timedelta(days=i):%Y-%m-%d}") for i in range(30)]
+    dates += [("monthly", f"2020-{i:02d}") for i in range(1, 13)]
+    for i, (granularity, date) in enumerate(dates):
+        table.items[f"sentiment_impressions_{granularity}", date] = {
+            "statistic_id": f"sentiment_impressions_{granularity}",
+            "date":         date,
+            "statistic":    {"positive": i, "neutral": 0, "negative": 1},
+        }
+    monkeypatch.setattr(dynamodb_get, "get_table", lambda: table)
+    monkeypatch.setattr(dynamodb_get, "get_client", lambda: FakeClient(table, unprocessed=0.3))
+    monkeypatch.setattr(dynamodb, "BATCH_GET_BACKOFF", 0)
+    monkeypatch.setattr(cache, "query_cache", cache.TTLCache(maxsize=0))
+    return table
+
+
+def test_query_dates(table: FakeTable) -> None:
+    """Test that the existing dates are fetched in batches, also when keys are left unprocessed."""
+    keys = [("daily", f"2020-01-{i:02d}") for i in range(1, 32)] * 5 + [("monthly", "2020-03")]
+    statistics = dynamodb_get.query_dates(keys)
+    assert len(statistics) == 31 and ("daily", "2020-01-31") not in statistics
+    assert statistics["monthly", "2020-03"]["statistic"]["positive"] == 32
+
+
+def test_bundle_unprocessed(table: FakeTable, monkeypatch: Any) -> None:
+    """Test that the bundle is unavailable, rather than failing, when keys remain unprocessed after all retries."""
+    client = FakeClient(table, unprocessed=1.0, attempts=dynamodb_get.BATCH_GET_RETRIES + 1)
+    monkeypatch.setattr(dynamodb_get, "get_client", lambda: client)
+    specs = {"day": {"granularity": "daily", "date": "2020-01-02"}}
+    assert TestClient(app).post(BUNDLE, json={"specs": specs}).status_code == 503
+
+
+def test_bundle(table: FakeTable) -> None:
+    """Test that dates, periods and recent periods of several granularities are combined in a single response."""
+    specs = {
+        "day":     {"granularity": "daily", "date": "2020-01-02"},
+        "missing": {"granularity": "weekly", "date": "2020-W01"},
+        "month":   {"granularity": "daily", "start": "2020-01-10", "end": "2020-01-19"},
+        "months":  {"granularity": "monthly", "start": "2020-06"},
+        "recent":  {"granularity": "yearly", "recent": 1},
+    }
+    response = TestClient(app).post(BUNDLE, json={"specs": specs})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert list(results) == list(specs)
+    assert results["day"]["series"] == [
+        {"date": "2020-01-02", "statistic": {"positive": 1, "neutral": 0, "negative": 1}},
+    ]
+    assert results["missing"]["series"] == [] and results["recent"]["series"] == []
+    assert [s["date"] for s in results["month"]["series"]] == [f"2020-01-{i}" for i in range(10, 20)]
+    assert len(results["months"]["series"]) == 7
+
+
+@pytest.mark.parametrize("spec", [
+    {"granularity": "daily"},
+    {"granularity": "daily", "date": "2020-01-01", "recent": 7},
+    {"granularity": "daily", "end": "2020-01-01", "recent": 7},
+    {"granularity": "daily", "recent": 0},
+    {"granularity": "minutely", "date": "2020-01-01"},
+])
+def test_bundle_invalid_spec(table: FakeTable, spec: Any) -> None:
+    """Test that a spec must select exactly one of a date, a period or recent periods of a known granularity."""
+    assert TestClient(app).post(BUNDLE, json={"specs": {"spec": spec}}).status_code == 422
+
+
+def test_bundle_bad_date(table: FakeTable) -> None:
+    """Test that dates in the wrong format are rejected."""
+    for spec in ({"granularity": "daily", "date": "2020-01"}, {"granularity": "monthly", "start": "2020-01-01"}):
+        assert TestClient(app).post(BUNDLE, json={"specs": {"spec": spec}}).status_code == 400
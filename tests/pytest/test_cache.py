@@ -0,0 +1,93 @@
+"""Test the in-process cache of the DynamoDB query results."""
+
+from datetime import datetime, timezone
+from typing import Any, List
+
+import pytest
+from fastapi import HTTPException
+
+from sentiment_flanders.api.utils import cache, dynamodb_get
+
+
+class Clock:
+    """Clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        """Start at zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Get the current time."""
+        return self.now
+
+
+def test_get_last_update() -> None:
+    """Test that the last update is the end of the latest batch run."""
+    assert cache.get_last_update(datetime(2020, 11, 18, 12, tzinfo=timezone.utc)) == datetime(
+            2020, 11, 18, 11, 15, tzinfo=timezone.utc)
+    assert cache.get_last_update(datetime(2020, 11, 18, 9, tzinfo=timezone.utc)) == datetime(
+            2020, 11, 17, 11, 15, tzinfo=timezone.utc)
+
+
+def test_is_settled() -> None:
+    """Test that only periods of which the last day was written by a finished batch run are settled."""
+    now = datetime(2020, 11, 18, 12, tzinfo=timezone.utc)  # The run of November 18th wrote November 16th
+    assert cache.is_settled("2020-11-16", now) and not cache.is_settled("2020-11-17", now)
+    assert cache.is_settled("2020-11-16:23", now) and not cache.is_settled("2020-11-17:00", now)
+    assert cache.is_settled("2020-W46", now) and not cache.is_settled("2020-W47", now)
+    assert cache.is_settled("2020-10", now) and not cache.is_settled("2020-11", now)
+    assert cache.is_settled("2019", now) and not cache.is_settled("2020", now)
+    assert not cache.is_settled(None, now)
+
+
+@pytest.mark.parametrize("hour, minute", [(1, 0), (10, 30)])
+def test_is_settled_before_batch(hour: int, minute: int) -> None:
+    """Test that the day written by today's batch run is not settled before the run has finished."""
+    now = datetime(2020, 11, 18, hour, minute, tzinfo=timezone.utc)
+    assert not cache.is_settled("2020-11-16:00", now) and not cache.is_settled("2020-11-16", now)
+    assert cache.is_settled("2020-11-15:23", now) and cache.is_settled("2020-11-15", now)
+
+
+def test_ttl_cache() -> None:
+    """Test that entries expire after their time-to-live and the least recently used entry is evicted."""
+    clock = Clock()
+    ttl_cache = cache.TTLCache(maxsize=2, clock=clock)
+    ttl_cache.set("a", 1, ttl=10)
+    ttl_cache.set("b", 2, ttl=100)
+    assert ttl_cache.get("a") == (True, 1)
+    ttl_cache.set("c", 3, ttl=100)  # Evicts b, as a was used more recently
+    assert ttl_cache.get("b") == (False, None)
+    clock.now = 10
+    assert ttl_cache.get("a") == (False, None) and ttl_cache.get("c") == (True, 3)
+    assert ttl_cache.stats() == {
+        "size":        1,
+        "maxsize":     2,
+        "hits":        2,
+        "misses":      2,
+        "hit_rate":    0.5,
+        "evictions":   1,
+        "expirations": 1,
+    }
+
+
+def test_cached_queries(monkeypatch: Any) -> None:
+    """Test that repeated queries are served from the cache, with a short time-to-live for open-ended ranges."""
+    clock, queries = Clock(), []  # type: Clock, List[Any]
+    monkeypatch.setattr(cache, "query_cache", cache.TTLCache(clock=clock))
+
+    def query(expression: Any) -> List[Any]:
+        queries.append(expression)
+        return [{"date": "2020-11-14", "statistic": {"positive": 1, "neutral": 2, "negative": 3}}]
+
+    monkeypatch.setattr(dynamodb_get, "query", query)
+    for _ in range(3):
+        dynamodb_get.query_daily("2020-11-01", "2020-11-14")
+        dynamodb_get.query_daily(date_from="2020-11-01")
+        dynamodb_get.query_day("2020-11-14")
+    assert len(queries) == 3
+    clock.now = cache.TTL_RECENT
+    dynamodb_get.query_daily("2020-11-01", date_to="2020-11-14")
+    dynamodb_get.query_daily("2020-11-01")
+    assert len(queries) == 4  # Only the open-ended range expired
+    with pytest.raises(HTTPException):
+        dynamodb_get.query_day("2020-11")
@@ -0,0 +1,33 @@
+"""Test the checkpoints of the stages of a run."""
+
+from pathlib import Path
+
+from sentiment_flanders.batch.backup import read_backup, write_backup
+from sentiment_flanders.batch.checkpoint import Checkpoint
+from sentiment_flanders.batch.tweet import Tweet
+
+
+def test_resume(tmp_path: Path) -> None:
+    """Test that a completed stage is never computed again, not even by a new attempt of the same run."""
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return ["POSITIVE", "NEGATIVE"]
+
+    assert Checkpoint("2020-11-14", root=str(tmp_path)).read("predictions") is None
+    assert Checkpoint("2020-11-14", root=str(tmp_path)).stage("predictions", compute) == ["POSITIVE", "NEGATIVE"]
+    assert Checkpoint("2020-11-14", root=str(tmp_path)).stage("predictions", compute) == ["POSITIVE", "NEGATIVE"]
+    assert len(calls) == 1
+    assert Checkpoint("2020-11-15", root=str(tmp_path)).read("predictions") is None
+
+
+def test_custom_format(tmp_path: Path) -> None:
+    """Test that stages can be stored in a custom format, and that clearing removes all stages of the run."""
+    checkpoint = Checkpoint("2020-11-14", root=str(tmp_path))
+    tweets = [Tweet(id=1, created_at="2020-11-14 10:04:59", text="Goeiemorgen")]
+    checkpoint.stage("processed", lambda: tweets, dump=write_backup, load=read_backup)
+    assert checkpoint.stage("processed", lambda: [], dump=write_backup, load=read_backup) == tweets
+    checkpoint.clear()
+    assert checkpoint.read("processed") is None
+    assert not (tmp_path / "2020-11-14").exists()
@@ -0,0 +1,39 @@
+"""Test the cold start budget mode, which defers import-time work until first use."""
+
+import os
+import subprocess  # noqa: S404
+import sys
+import textwrap
+
+import wrapt
+
+SCRIPT = textwrap.dedent("""
+    import sys
+    import sentiment_flanders.api
+    deferred = ["dynaconf", "coloredlogs", "sentiment_flanders.api.routers.impressions_daily"]
+    assert not [name for name in deferred if name in sys.modules], [name for name in deferred if name in sys.modules]
+    from starlette.testclient import TestClient
+    response = TestClient(sentiment_flanders.api.app).get("/api/v1/impressions/daily/recent/", params={"n": "x"})
+    assert response.status_code == 422, response.status_code  # Routed, only the parameter is invalid
+    assert "sentiment_flanders.api.routers.impressions_daily" in sys.modules
+    assert "sentiment_flanders.api.routers.impressions_hourly" not in sys.modules
+    from sentiment_flanders.config import config
+    assert "dynaconf" in sys.modules and config.ENV_FOR_DYNACONF
+""")
+
+
+def test_cold_start_budget() -> None:
+    """Test that the config, logging and routers are only loaded once used."""
+    env = {**os.environ, "COLD_START_BUDGET": "1", "PYTHONPATH": os.pathsep.join(sys.path)}
+    process = subprocess.run(  # noqa: S603
+            [sys.executable, "-c", SCRIPT], env=env, stderr=subprocess.PIPE, universal_newlines=True,
+    )
+    assert process.returncode == 0, process.stderr
+
+
+def test_log_module_with_sentry() -> None:
+    """Test that the functions defined in a module are wrapped, without parsing its source."""
+    from sentiment_flanders.api import cron
+
+    assert isinstance(cron.cron_handler, wrapt.FunctionWrapper)
+    assert not isinstance(cron.Any, wrapt.FunctionWrapper)
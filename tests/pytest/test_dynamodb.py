@@ -0,0 +1,63 @@
+"""Test the DynamoDB writer of the batch job."""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import pytest
+
+from sentiment_flanders.batch import dynamodb
+from tests.benchmarks.aws import FakeClient, FakeTable
+
+
+def create_hourly(n: int) -> List[Dict[str, Any]]:
+    """Create n hourly statistics."""
+    start = datetime(2020, 1, 1)
+    return [
+        {"date": f"{start + timedelta(hours=i):%Y-%m-%d:%H}", "statistic": {"positive": i, "neutral": 0, "negative": 1}}
+        for i in range(n)
+    ]
+
+
+def test_put_batch(monkeypatch: Any) -> None:
+    """Test that a year of hourly statistics is written in batches of 25, retrying unprocessed items."""
+    table = FakeTable()
+    client = FakeClient(table, unprocessed=0.3)
+    monkeypatch.setattr(dynamodb, "get_client", lambda: client)
+    monkeypatch.setattr(dynamodb, "sleep", lambda seconds: None)
+    items = create_hourly(24 * 365)
+    assert dynamodb.put_batch(items + items[:10]) == len(items)  # Duplicated dates are only written once
+    assert len(table.items) == len(items) and len(client.throttled) > 0
+    assert max(client.batch_sizes) == dynamodb.BATCH_SIZE
+    assert table.items["sentiment_impressions_hourly", "2020-01-01:05"]["statistic"]["positive"] == 5
+
+
+def test_put_batch_unprocessed(monkeypatch: Any) -> None:
+    """Test that an error is raised when items remain unprocessed after all retries."""
+    client = FakeClient(FakeTable(), unprocessed=1.0, attempts=dynamodb.WRITE_RETRIES + 1)
+    monkeypatch.setattr(dynamodb, "get_client", lambda: client)
+    monkeypatch.setattr(dynamodb, "sleep", lambda seconds: None)
+    with pytest.raises(RuntimeError):
+        dynamodb.put_batch(create_hourly(10))
+
+
+def test_put_changed(monkeypatch: Any) -> None:
+    """Test that new statistics are written in batches, and only the changed ones of the stored statistics."""
+    table = FakeTable()
+    client = FakeClient(table)
+    monkeypatch.setattr(dynamodb, "get_client", lambda: client)
+    items = create_hourly(48)
+    assert dynamodb.put_changed(items) == {"written": 48, "skipped": 0, "capacity_units": 48.0}
+    assert sorted(client.batch_sizes) == [23, 25]
+    assert dynamodb.put_changed(items) == {"written": 0, "skipped": 48, "capacity_units": 0.0}
+    items[5] = {"date": items[5]["date"], "statistic": {"positive": 0, "neutral": 0, "negative": 0}}
+    assert dynamodb.put_changed(items) == {"written": 1, "skipped": 47, "capacity_units": 1.0}
+    assert table.items["sentiment_impressions_hourly", items[5]["date"]]["statistic"]["positive"] == 0
+
+
+def test_put_if_changed(monkeypatch: Any) -> None:
+    """Test that the conditional write is skipped when the same statistic was stored concurrently."""
+    table = FakeTable()
+    monkeypatch.setattr(dynamodb, "get_client", lambda: FakeClient(table))
+    item = create_hourly(1)[0]
+    assert dynamodb.put_if_changed(item) == 1.0
+    assert dynamodb.put_if_changed(item) is None
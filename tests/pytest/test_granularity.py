@@ -0,0 +1,41 @@
+"""Test the rollup of hourly buckets into every granularity."""
+
+from datetime import datetime
+
+import pytest
+
+from sentiment_flanders.batch.granularity import STORED, get_granularity, rollup
+
+
+def test_get_granularity() -> None:
+    """Test that every date format is mapped on its granularity."""
+    dates = {
+        "2020-12-31:23": "hourly",
+        "2020-12-31":    "daily",
+        "2020-W53":      "weekly",
+        "2020-12":       "monthly",
+        "2020":          "yearly",
+    }
+    assert {date: get_granularity(date).name for date in dates} == dates
+    with pytest.raises(FileNotFoundError):
+        get_granularity("2020-12-31T23")
+
+
+def test_rollup() -> None:
+    """Test that the buckets are summed into every granularity, ISO weeks spanning the turn of the year."""
+    buckets = {
+        datetime(2020, 12, 31, 22): {"positive": 1, "neutral": 2, "negative": 3},
+        datetime(2020, 12, 31, 23): {"positive": 1, "neutral": 0, "negative": 0},
+        datetime(2021, 1, 1, 0):    {"positive": 0, "neutral": 1, "negative": 0},
+        datetime(2021, 1, 4, 0):    {"positive": 0, "neutral": 0, "negative": 1},
+    }
+    statistics = rollup(buckets)
+    assert [s["date"] for s in statistics["hourly"]] == [f"{h:%Y-%m-%d:%H}" for h in buckets]
+    assert statistics["daily"][0] == {"date": "2020-12-31", "statistic": {"positive": 2, "neutral": 2, "negative": 3}}
+    assert statistics["weekly"] == [
+        {"date": "2020-W53", "statistic": {"positive": 2, "neutral": 3, "negative": 3}},
+        {"date": "2021-W01", "statistic": {"positive": 0, "neutral": 0, "negative": 1}},
+    ]
+    assert [s["date"] for s in statistics["monthly"]] == ["2020-12", "2021-01"]
+    assert [s["date"] for s in statistics["yearly"]] == ["2020", "2021"]
+    assert set(rollup(buckets, granularities=STORED)) == {"hourly", "daily"}
@@ -0,0 +1,43 @@
+"""Test the HTTP caching headers of the impressions routes."""
+
+from typing import Any
+
+import pytest
+from starlette.testclient import TestClient
+
+from sentiment_flanders.api import app
+from sentiment_flanders.api.routers import impressions_daily
+from sentiment_flanders.api.utils import http_cache
+
+STATISTIC = {"date": "2020-11-14", "statistic": {"positive": 1, "neutral": 2, "negative": 3}}
+
+
+@pytest.fixture
+def client(monkeypatch: Any) -> TestClient:
+    """Create a client of the API, of which the daily queries return a fixed statistic."""
+    monkeypatch.setattr(impressions_daily, "query_day", lambda date: {**STATISTIC, "date": date})
+    monkeypatch.setattr(impressions_daily, "query_daily", lambda date_from, date_to=None: [STATISTIC])
+    return TestClient(app)
+
+
+def test_settled(client: TestClient) -> None:
+    """Test that settled dates are immutable, and a conditional request with the same entity tag gets a 304."""
+    response = client.get("/api/v1/impressions/daily/date/2020-11-14")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == f"public, max-age={http_cache.MAX_AGE_SETTLED}, immutable"
+    assert "last-modified" in response.headers
+    etag = response.headers["etag"]
+    response = client.get("/api/v1/impressions/daily/date/2020-11-14", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.headers["etag"] == etag and not response.content
+    response = client.get("/api/v1/impressions/daily/date/2020-11-13", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag
+
+
+def test_recent(client: TestClient) -> None:
+    """Test that recent windows expire at the next batch run, and are revalidated by their modification date."""
+    response = client.get("/api/v1/impressions/daily/last_week/", params={"date": "2020-11-18"})
+    assert response.status_code == 200 and response.json() == {"series": [STATISTIC]}
+    max_age = int(response.headers["cache-control"].split("max-age=")[1].split(",")[0])
+    assert 0 < max_age <= 24 * 60 * 60
+    headers = {"If-Modified-Since": response.headers["last-modified"]}
+    assert client.get("/api/v1/impressions/daily/recent/", headers=headers).status_code == 304
@@ -0,0 +1,20 @@
+"""Test the length-bucketed inference scheduler."""
+
+from typing import List
+
+from sentiment_flanders.batch.inference import InferenceScheduler
+
+
+def test_scheduler() -> None:
+    """Test that batches hold similarly sized texts within budget, and that the original order is restored."""
+    texts = [" ".join(["woord"] * n) for n in (30, 1, 12, 2, 29, 3, 11, 1)]
+    batches: List[List[str]] = []
+
+    def predict(batch: List[str]) -> List[str]:
+        batches.append(batch)
+        return [str(len(text.split())) for text in batch]
+
+    scheduler = InferenceScheduler(predict, token_budget=30, latency_budget=float("inf"), max_batch_size=3)
+    assert scheduler(texts) == ["30", "1", "12", "2", "29", "3", "11", "1"]
+    assert [[len(text.split()) for text in batch] for batch in batches] == [[1, 1, 2], [3, 11], [12], [29], [30]]
+    assert all(b["padded_tokens"] <= 30 for b in scheduler.batches)
@@ -0,0 +1,36 @@
+"""Test the instrumentation of batch stages."""
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from sentiment_flanders.batch.metrics import Metrics
+
+
+def test_stage(tmp_path: Path, capsys: Any) -> None:
+    """Test that every stage is measured and printed as JSON, also when it fails, and that the run is saved."""
+    metrics = Metrics("test", path=str(tmp_path))
+    with metrics.stage("sum") as record:
+        record["items"] = len([sum(range(1000)) for _ in range(1000)])
+    with pytest.raises(ValueError):
+        with metrics.stage("fail"):
+            raise ValueError("Twitter is down")
+
+    printed = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [p["stage"] for p in printed] == ["sum", "fail"]
+    assert printed[0]["items"] == 1000 and printed[0]["items_per_second"] > 0
+    assert printed[0]["wall_seconds"] >= 0 and printed[0]["cpu_seconds"] >= 0 and printed[0]["rss_mib"] > 0
+    assert "ValueError" in printed[1]["error"]
+
+    with metrics.stage("allocate") as record:
+        data = bytearray(64 * 1024 * 1024)
+        data[::4096] = b"x" * len(data[::4096])  # Touch every page
+    assert metrics.stages[-1]["rss_delta_mib"] >= 48  # Measured during the stage, not the lifetime of the process
+    del data
+    printed += [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    metrics.save()
+    saved = json.loads(next(tmp_path.iterdir()).read_text())
+    assert saved["job"] == "test" and saved["stages"] == printed
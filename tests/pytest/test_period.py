@@ -0,0 +1,104 @@
+"""Test the paginated and streamed responses of long periods."""
+
+import json
+import sys
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from fastapi import HTTPException
+from starlette.testclient import TestClient
+
+from sentiment_flanders.api import app
+from sentiment_flanders.api.utils import cache, dynamodb_get, period
+from sentiment_flanders.batch import dynamodb, rollup
+from tests.benchmarks.aws import FakeClient, FakeTable
+
+PERIOD = "/api/v1/impressions/hourly/period/"
+PARAMS = {"start": "2020-01-01:00", "end": "2020-01-03:23"}
+
+
+@pytest.fixture
+def table(monkeypatch: Any) -> FakeTable:
+    """Replace DynamoDB by a fake table with 100 hourly statistics, from January 1st 2020 on, bypassing the cache."""
+    table = FakeTable()
+    for i in range(100):
+        date = f"{datetime(2020, 1, 1) + timedelta(hours=i):%Y-%m-%d:%H}"
+        table.items["sentiment_impressions_hourly", date] = {
+            "statistic_id": "sentiment_impressions_hourly",
+            "date":         date,
+            "statistic":    {"positive": i, "neutral": 0, "negative": 1},
+        }
+    monkeypatch.setattr(dynamodb_get, "get_table", lambda: table)
+    monkeypatch.setattr(cache, "query_cache", cache.TTLCache(maxsize=0))
+    return table
+
+
+def test_query_pages(table: FakeTable) -> None:
+    """Test that all pages are queried."""
+    expression = dynamodb_get.get_range_expression("hourly", "2020-01-01:00")
+    pages = list(dynamodb_get.query_pages(expression, page_size=30))
+    assert [len(items) for items, _ in pages] == [30, 30, 30, 10] and pages[-1][1] is None
+    assert len(dynamodb_get.query(expression)) == 100
+
+
+def test_cursor(table: FakeTable) -> None:
+    """Test that following the cursors returns every statistic of the period exactly once."""
+    client, dates, cursor = TestClient(app), [], None
+    while True:
+        response = client.get(PERIOD, params={**PARAMS, "limit": 10, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        dates += [item["date"] for item in response.json()["series"]]
+        cursor = response.json()["next_cursor"]
+        if not cursor: break
+    assert dates == [item["date"] for item in client.get(PERIOD, params=PARAMS).json()["series"]]
+    assert len(dates) == 72
+    assert client.get(PERIOD, params={**PARAMS, "cursor": "invalid"}).status_code == 400
+
+
+@pytest.mark.parametrize("key", [
+    ["sentiment_impressions_hourly", "2020-01-01:00"],
+    {"statistic_id": "sentiment_impressions_daily", "date": "2020-01-01:00"},
+    {"statistic_id": "sentiment_impressions_hourly", "date": "2020-01-01"},
+    {"statistic_id": "sentiment_impressions_hourly", "date": "2020-01-01:00", "other": 1},
+])
+def test_decode_cursor_invalid(key: Any) -> None:
+    """Test that a well-formed cursor of a key that is not one of the granularity's statistics is rejected."""
+    cursor = dynamodb_get.encode_cursor(key)
+    assert cursor is not None
+    with pytest.raises(HTTPException) as e: dynamodb_get.decode_cursor(cursor, "hourly")
+    assert e.value.status_code == 400
+
+
+def test_stream_json(table: FakeTable) -> None:
+    """Test that the streamed series and NDJSON contain the same statistics as the complete series."""
+    expected = dynamodb_get.query_range("hourly", PARAMS["start"], PARAMS["end"])
+    series = json.loads("".join(period.stream_json("hourly", PARAMS["start"], PARAMS["end"], ndjson=False)))
+    lines = "".join(period.stream_json("hourly", PARAMS["start"], PARAMS["end"], ndjson=True)).splitlines()
+    assert series == {"series": json.loads(json.dumps(expected, default=int))}
+    assert [json.loads(line) for line in lines] == series["series"]
+
+
+def test_stream_rollup(table: FakeTable, monkeypatch: Any) -> None:
+    """Test that streamed rollups only contain their date and statistic, not their key or applied tokens."""
+    client = FakeClient(table)
+    monkeypatch.setattr(dynamodb, "get_client", lambda: client)
+    monkeypatch.setattr(rollup, "get_client", lambda: client)
+    rollup.update_rollups([{"date": "2020-11-14", "statistic": {"positive": 1, "neutral": 2, "negative": 3}}])
+    expected = {"date": "2020-11", "statistic": {"positive": 1, "neutral": 2, "negative": 3}}
+    series = json.loads("".join(period.stream_json("monthly", "2020-01", None, ndjson=False)))
+    lines = "".join(period.stream_json("monthly", "2020-01", None, ndjson=True)).splitlines()
+    assert series == {"series": [expected]}
+    assert [json.loads(line) for line in lines] == [expected]
+
+
+@pytest.mark.skipif(sys.version_info >= (3, 11), reason="StreamingResponse of starlette 0.13 requires Python < 3.11")
+def test_stream(table: FakeTable) -> None:
+    """Test that the streamed responses contain the same statistics as the complete series."""
+    client = TestClient(app)
+    expected = client.get(PERIOD, params=PARAMS).json()["series"]
+    assert client.get(PERIOD, params={**PARAMS, "stream": True}).json() == {"series": expected}
+    response = client.get(PERIOD, params={**PARAMS, "format": "ndjson"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in response.text.splitlines()] == expected
+    assert client.get(PERIOD, params={**PARAMS, "format": "ndjson", "end": "2020-01"}).status_code == 400
@@ -0,0 +1,40 @@
+"""Test the producer/consumer pipeline."""
+
+from typing import Any, Iterator
+
+import pytest
+
+pytest.importorskip("tweepy")
+
+from sentiment_flanders.batch import pipeline  # noqa: E402
+from sentiment_flanders.batch.tweet import Tweet  # noqa: E402
+
+
+def test_stream_processed(monkeypatch: Any) -> None:
+    """Test that all tweets are streamed in chunks, in order."""
+    tweets = [Tweet(id=i, created_at=i, text=str(i)) for i in range(1000)]
+    monkeypatch.setattr(pipeline, "iter_processed", lambda timestamps, checkpoint: iter(tweets))
+    chunks = list(pipeline.stream_processed([], chunk_size=64, queue_size=2))
+    assert [len(c) for c in chunks] == [64] * 15 + [40]
+    assert [t for c in chunks for t in c] == tweets
+
+
+def test_stream_processed_error(monkeypatch: Any) -> None:
+    """Test that an error of the producer is raised by the consumer."""
+    def failing(timestamps: Any, checkpoint: Any) -> Iterator[Tweet]:
+        yield Tweet(id=1, created_at=1, text="1")
+        raise ConnectionError("Twitter is down")
+
+    monkeypatch.setattr(pipeline, "iter_processed", failing)
+    with pytest.raises(ConnectionError):
+        list(pipeline.stream_processed([], chunk_size=64))
+
+
+def test_stream_processed_stop(monkeypatch: Any) -> None:
+    """Test that the producer stops once the consumer stops."""
+    monkeypatch.setattr(pipeline, "iter_processed", lambda timestamps, checkpoint: (
+        Tweet(id=i, created_at=i, text="") for i in range(10 ** 9)
+    ))
+    stream = pipeline.stream_processed([], chunk_size=1, queue_size=1)
+    next(stream)
+    stream.close()  # Joins the producer, which would hang if it did not stop
@@ -0,0 +1,37 @@
+"""Test the persistent prediction cache."""
+
+from pathlib import Path
+from typing import List
+
+from sentiment_flanders.batch.prediction_cache import PredictionCache, cached_predict
+
+
+def test_cached_predict(tmp_path: Path) -> None:
+    """Test that only cache misses are sent to the model."""
+    requested: List[List[str]] = []
+
+    def predict(texts: List[str]) -> List[str]:
+        requested.append(texts)
+        return ["POSITIVE" if "goed" in text else "NEGATIVE" for text in texts]
+
+    with PredictionCache(path=tmp_path / "cache.sqlite", model_id="test") as cache:
+        assert cached_predict(["goed", "slecht", "goed"], predict=predict, cache=cache) == [
+            "POSITIVE",
+            "NEGATIVE",
+            "POSITIVE",
+        ]
+        assert cached_predict(["slecht ", "heel goed"], predict=predict, cache=cache) == ["NEGATIVE", "POSITIVE"]
+        assert requested == [["goed", "slecht"], ["heel goed"]]
+        assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_cache_eviction(tmp_path: Path) -> None:
+    """Test that the least recently used predictions are evicted and other models do not share predictions."""
+    with PredictionCache(path=tmp_path / "cache.sqlite", model_id="test", max_size=2) as cache:
+        cache.put({"a": "POSITIVE", "b": "NEUTRAL"})
+        cache.get(["a"])
+        cache.put({"c": "NEGATIVE"})
+        assert len(cache) == 2
+        assert cache.get(["a", "b", "c"]) == {"a": "POSITIVE", "c": "NEGATIVE"}
+    with PredictionCache(path=tmp_path / "cache.sqlite", model_id="other") as cache:
+        assert cache.get(["a"]) == {}
@@ -0,0 +1,109 @@
+"""Test the incremental weekly, monthly and yearly statistics."""
+
+from typing import Any
+
+import pytest
+
+from sentiment_flanders.batch import dynamodb, rollup
+from tests.benchmarks.aws import FakeClient, FakeTable
+
+
+@pytest.fixture
+def table(monkeypatch: Any) -> FakeTable:
+    """Replace DynamoDB by a fake table."""
+    table = FakeTable()
+    client = FakeClient(table)
+    monkeypatch.setattr(dynamodb, "get_table", lambda: table)
+    monkeypatch.setattr(dynamodb, "get_client", lambda: client)
+    monkeypatch.setattr(rollup, "get_client", lambda: client)
+    return table
+
+
+def write_days(days: Any) -> None:
+    """Write the daily statistics the way the batch jobs do, updating the rollups first."""
+    statistics = [{"date": day, "statistic": dict(zip(("positive", "neutral", "negative"), s))} for day, s in days]
+    rollup.update_rollups(statistics)
+    dynamodb.put_batch(statistics)
+
+
+def get(table: FakeTable, date: str) -> Any:
+    """Get the statistic of the given date as integers."""
+    statistic = table.items[dynamodb.get_statistic_id(date), date]["statistic"]
+    return {label: int(value) for label, value in statistic.items()}
+
+
+def test_update_rollups(table: FakeTable) -> None:
+    """Test that weeks, months and years always equal the sum of their days, also when days are rewritten."""
+    write_days([("2020-11-14", (1, 2, 3)), ("2020-11-15", (10, 20, 30)), ("2020-12-01", (5, 5, 5))])
+    assert get(table, "2020-W46") == {"positive": 11, "neutral": 22, "negative": 33}
+    assert get(table, "2020-11") == {"positive": 11, "neutral": 22, "negative": 33}
+    assert get(table, "2020-12") == {"positive": 5, "neutral": 5, "negative": 5}
+    assert get(table, "2020") == {"positive": 16, "neutral": 27, "negative": 38}
+
+    write_days([("2020-11-14", (2, 2, 2))])  # Reprocessed day
+    write_days([("2020-11-14", (2, 2, 2))])  # Unchanged day
+    assert get(table, "2020-11") == {"positive": 12, "neutral": 22, "negative": 32}
+    assert get(table, "2020") == {"positive": 17, "neutral": 27, "negative": 37}
+
+
+def test_update_rollups_idempotent(table: FakeTable) -> None:
+    """Test that a rerun after a failure in between updating the rollups and writing the days counts nothing twice."""
+    statistics = [{"date": "2020-11-14", "statistic": {"positive": 1, "neutral": 2, "negative": 3}}]
+    assert rollup.update_rollups(statistics) == 3
+    assert rollup.update_rollups(statistics) == 0  # Retried run, the day was never written
+    dynamodb.put_batch(statistics)
+    assert get(table, "2020-11") == get(table, "2020") == {"positive": 1, "neutral": 2, "negative": 3}
+
+
+def test_update_rollups_diverged_rerun(table: FakeTable) -> None:
+    """Test that a rerun producing another statistic than the failed run replaces the change of the failed run."""
+    write_days([("2020-11-14", (1, 1, 1))])
+    rollup.update_rollups([{"date": "2020-11-14", "statistic": {"positive": 2, "neutral": 2, "negative": 2}}])
+    write_days([("2020-11-14", (3, 3, 3))])  # Rerun after a failure before the day was written, e.g. by a new model
+    assert get(table, "2020-W46") == get(table, "2020-11") == get(table, "2020") == {
+        "positive": 3, "neutral": 3, "negative": 3,
+    }
+
+
+def test_update_rollups_bounded(table: FakeTable) -> None:
+    """Test that the applied statistic of every day is kept once in an item of its own, outside the rollups."""
+    for i in range(10): write_days([("2020-11-14", (i, 0, 0)), ("2020-11-15", (0, i, 0))])
+    assert get(table, "2020") == {"positive": 9, "neutral": 9, "negative": 0}
+    assert set(table.items["sentiment_impressions_yearly", "2020"]) == {"statistic_id", "date", "statistic", "tracked"}
+    applied = [key for key in table.items if key[0] == "sentiment_impressions_yearly#applied"]
+    assert sorted(applied) == [("sentiment_impressions_yearly#applied", d) for d in ("2020-11-14", "2020-11-15")]
+
+
+@pytest.mark.parametrize("legacy", [{}, {"applied": {"2020-11-14:x>y"}}])
+def test_update_rollups_untracked(table: FakeTable, legacy: Any) -> None:
+    """Test that rollups written before their days were tracked are rebuilt from the stored days first."""
+    dynamodb.put_batch([
+        {"date": "2020-11-14", "statistic": {"positive": 1, "neutral": 2, "negative": 3}},
+        {"date": "2020-11-15", "statistic": {"positive": 1, "neutral": 1, "negative": 1}},
+    ])
+    table.items["sentiment_impressions_monthly", "2020-11"] = {
+        "statistic_id": "sentiment_impressions_monthly",
+        "date":         "2020-11",
+        "statistic":    {"positive": 2, "neutral": 3, "negative": 4},
+        **legacy,
+    }
+    write_days([("2020-11-14", (2, 2, 2)), ("2020-11-16", (5, 5, 5))])
+    assert get(table, "2020-11") == get(table, "2020") == {"positive": 8, "neutral": 8, "negative": 8}
+    assert "applied" not in table.items["sentiment_impressions_monthly", "2020-11"]
+
+
+def test_rebuild_rollups(table: FakeTable) -> None:
+    """Test that rebuilding the rollups of a year sums its days, also an ISO week ending in the next year."""
+    dynamodb.put_batch([
+        {"date": "2020-11-14", "statistic": {"positive": 1, "neutral": 2, "negative": 3}},
+        {"date": "2020-12-01", "statistic": {"positive": 5, "neutral": 5, "negative": 5}},
+        {"date": "2021-01-02", "statistic": {"positive": 1, "neutral": 1, "negative": 1}},
+    ])
+    rollup.rebuild_rollups(2020)
+    assert get(table, "2020-W53") == {"positive": 1, "neutral": 1, "negative": 1}
+    assert get(table, "2020-11") == {"positive": 1, "neutral": 2, "negative": 3}
+    assert get(table, "2020") == {"positive": 6, "neutral": 7, "negative": 8}
+
+    write_days([("2020-11-14", (2, 2, 3))])  # The applied days are rebuilt as well
+    assert get(table, "2020-11") == {"positive": 2, "neutral": 2, "negative": 3}
+    assert get(table, "2020") == {"positive": 7, "neutral": 7, "negative": 8}
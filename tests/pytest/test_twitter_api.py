@@ -0,0 +1,112 @@
+"""Test the rate limiting and the retries of the Twitter API fetches."""
+
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+import pytest
+
+tweepy = pytest.importorskip("tweepy")
+
+from sentiment_flanders.batch import twitter_api  # noqa: E402
+from sentiment_flanders.batch.twitter_api import RateLimiter  # noqa: E402
+
+
+class Clock:
+    """Clock that only moves when slept on."""
+
+    def __init__(self) -> None:
+        """Start at zero."""
+        self.now = 0.0
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> float:
+        """Get the current time."""
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Move the clock."""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeAPI:
+    """Twitter API failing with the given status codes before it returns its tweets."""
+
+    def __init__(self, statuses: List[Optional[int]]) -> None:
+        """Fail with every status in turn, None fails without a response."""
+        self.statuses = list(statuses)
+        self.requests = 0
+
+    def search(self, api: Any, query: str, enddate: datetime) -> List[Any]:
+        """Search the tweets, like `twitter_api.search`."""
+        self.requests += 1
+        if not self.statuses: return ["tweet"]
+        status = self.statuses.pop(0)
+        raise create_error(status)
+
+
+def create_error(status: Optional[int]) -> Exception:
+    """Create the exception tweepy raises for a response with the given status code."""
+    error = tweepy.TweepyException(f"status {status}")
+    if status is not None: error.response = SimpleNamespace(status_code=status)
+    return error
+
+
+@pytest.fixture
+def clock(monkeypatch: Any) -> Clock:
+    """Replace the clock and sleep of the Twitter API module."""
+    clock = Clock()
+    monkeypatch.setattr(twitter_api, "monotonic", clock)
+    monkeypatch.setattr(twitter_api, "sleep", clock.sleep)
+    return clock
+
+
+def fake_api(monkeypatch: Any, statuses: List[Optional[int]]) -> FakeAPI:
+    """Replace the Twitter API by a fake one."""
+    api = FakeAPI(statuses)
+    monkeypatch.setattr(twitter_api, "connect", lambda: api)
+    monkeypatch.setattr(twitter_api, "search", api.search)
+    return api
+
+
+def test_rate_limiter(clock: Clock) -> None:
+    """Test that a burst is sent at once, after which the requests are spaced at the rate."""
+    limiter = RateLimiter(rate=2, burst=3)
+    for _ in range(7): limiter.acquire()
+    assert clock.sleeps[:1] == [0.5] and clock.now == pytest.approx(2.0)
+
+    clock.now += 60  # The bucket never holds more than a burst
+    clock.sleeps.clear()
+    for _ in range(4): limiter.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_is_retryable() -> None:
+    """Test that only rate limiting and server errors are retried."""
+    assert twitter_api.is_retryable(create_error(429)) and twitter_api.is_retryable(create_error(503))
+    assert not twitter_api.is_retryable(create_error(401)) and not twitter_api.is_retryable(create_error(None))
+
+
+def test_build_query() -> None:
+    """Test the default query of the job."""
+    assert twitter_api.build_query() == "profile_country:be lang:nl -is:retweet -is:reply -has:images -has:videos"
+
+
+def test_fetch_backoff(clock: Clock, monkeypatch: Any) -> None:
+    """Test that rate limiting and server errors are retried with exponential backoff."""
+    api = fake_api(monkeypatch, [429, 503])
+    assert twitter_api.fetch(datetime(2020, 11, 14, 12)) == ["tweet"]
+    assert api.requests == 3
+    assert len(clock.sleeps) == 2
+    assert twitter_api.FETCH_BACKOFF <= clock.sleeps[0] < 1.5 * twitter_api.FETCH_BACKOFF
+    assert 2 * twitter_api.FETCH_BACKOFF <= clock.sleeps[1] < 3 * twitter_api.FETCH_BACKOFF
+
+
+@pytest.mark.parametrize("statuses, requests", [([429] * 3, 3), ([401], 1), ([None], 1)])
+def test_fetch_fails(clock: Clock, monkeypatch: Any, statuses: List[Optional[int]], requests: int) -> None:
+    """Test that the error is raised once the retries are exhausted, or when it is not worth retrying."""
+    api = fake_api(monkeypatch, statuses)
+    with pytest.raises(tweepy.TweepyException):
+        twitter_api.fetch(datetime(2020, 11, 14, 12), retries=2)
+    assert api.requests == requests
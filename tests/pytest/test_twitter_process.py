@@ -0,0 +1,30 @@
+"""Test processing of tweets."""
+
+import pytest
+
+from sentiment_flanders.batch.twitter_process import process
+from tests.benchmarks.corpus import create_corpus
+from tests.benchmarks.normalise import process_reference
+
+
+@pytest.mark.parametrize(
+    "tweet",
+    [
+        "",
+        "RT @vrt: Goeiemorgen!",
+        "️RT gevolgd door een selector",
+        "Mooi weer vandaag ☀️☀ #zon https://t.co/abc?x=1 en “meer” ‘info’",
+        "1️⃣ keycap, #️⃣ hashtag, 👨‍👩‍👧 familie en 🇧🇪 vlag",
+        "a -•- b --- c &gt;&lt; d › ‹ e",
+        "-http://t.co/x -- \t\n  tabs en enters  ",
+    ],
+)
+def test_process(tweet: str) -> None:
+    """Test that the processed text is identical to the original implementation."""
+    assert process(tweet) == process_reference(tweet)
+
+
+def test_process_corpus() -> None:
+    """Test that the processed synthetic corpus is identical to the original implementation."""
+    corpus = create_corpus(2000)
+    assert [process(tweet) for tweet in corpus] == [process_reference(tweet) for tweet in corpus]
@@ -0,0 +1,51 @@
+"""Test reprocessing the historical backups."""
+
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+pytest.importorskip("twitter_sentiment_classifier")
+
+from sentiment_flanders.batch import update_historical  # noqa: E402
+
+
+def test_process_historical_writes_every_few_days(monkeypatch: Any) -> None:
+    """Test that the days processed before a failure are written and recorded in the manifest."""
+    keys = [f"backup/2/2020-01-{i:02d}.parquet" for i in range(1, 21)]
+    written: List[List[str]] = []
+    manifest: Dict[str, Any] = {}
+
+    def iter_processed(keys: List[str], process: Any, workers: int = 1) -> Iterator[Any]:
+        """Process the first ten days, fail on the eleventh."""
+        for key in keys[:10]: yield [], [{"date": update_historical.get_day(key), "statistic": {}}]
+        raise RuntimeError("Processing failed")
+
+    def write_days(bucket: Any, results: Dict[str, Any], entries: Dict[str, Any], metrics: Any) -> None:
+        """Record the written days in the manifest."""
+        written.append([update_historical.get_day(key) for key in results])
+        manifest.update({update_historical.get_day(key): entries[key] for key in results})
+
+    monkeypatch.setattr(update_historical.boto3, "resource", lambda service: SimpleNamespace(Bucket=lambda name: None))
+    monkeypatch.setattr(update_historical, "list_backups", lambda bucket, **kwargs: {key: key for key in keys})
+    monkeypatch.setattr(update_historical, "load_manifest", lambda bucket: dict(manifest))
+    monkeypatch.setattr(update_historical, "get_backend_model_id", lambda: "model")
+    monkeypatch.setattr(update_historical, "iter_processed", iter_processed)
+    monkeypatch.setattr(update_historical, "write_days", write_days)
+    with pytest.raises(RuntimeError):
+        update_historical.process_historical()
+    assert written == [[f"2020-01-{i:02d}" for i in range(1, update_historical.WRITE_DAYS + 1)]]
+    assert sorted(manifest) == written[0]
+
+    # A rerun skips the days that were written, only processing the remaining ones
+    processed: List[str] = []
+
+    def iter_remaining(keys: List[str], process: Any, workers: int = 1) -> Iterator[Any]:
+        """Process every day without statistics."""
+        processed.extend(keys)
+        for _ in keys: yield [], []
+
+    monkeypatch.setattr(update_historical, "iter_processed", iter_remaining)
+    update_historical.process_historical()
+    assert processed == keys[update_historical.WRITE_DAYS:]
+    assert sorted(manifest) == [update_historical.get_day(key) for key in keys]